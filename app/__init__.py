@@ -1,30 +1,66 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
-from config import Config
+from config import config_profiles
+from app.replicas import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
+    # A config class, a profile name, or the APP_CONFIG profile
+    if config_class is None:
+        config_class = os.environ.get('APP_CONFIG') or 'development'
+    if isinstance(config_class, str):
+        config_class = config_profiles[config_class]
+    
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions with app
+    from app.database import configure_engine_options, init_engines
+    from app.replicas import ReplicaRouter
+    configure_engine_options(app)
+    ReplicaRouter(app)
     db.init_app(app)
+    init_engines(app)
     migrate.init_app(app, db)
     CORS(app)
     
+    from app.notifications import NotificationQueue
+    from app.cache import LocationCache
+    from app.events import init_slot_events
+    from app.expiry import BookingExpiryScheduler
+    from app.sensors import OccupancyIngestor
+    from app.allocator import SlotAllocator
+    from app.instrumentation import Instrumentation
+    from app.tokens import TokenAuth
+    from app.passwords import PasswordHasher
+    from app.compression import ResponseCompression
+    NotificationQueue(app)
+    LocationCache(app)
+    init_slot_events(app)
+    BookingExpiryScheduler(app)
+    OccupancyIngestor(app)
+    SlotAllocator(app)
+    Instrumentation(app)
+    TokenAuth(app)
+    PasswordHasher(app)
+    ResponseCompression(app)
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.parking import parking_bp
     from app.routes.bookings import bookings_bp
+    from app.routes.notifications import notifications_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(parking_bp, url_prefix='/api/parking')
     app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
+    app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
     
     # Register error handlers
     @app.errorhandler(404)
@@ -0,0 +1,172 @@
+import re
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import ParkingSlot
+from app.reservations import MAX_CLAIM_ATTEMPTS, free_slots, reserve_slot
+
+# 'nearest-entrance' fills the lowest-numbered free slot first,
+# 'spread' hands out slots round-robin across the lot
+POLICIES = ['nearest-entrance', 'spread']
+
+def _natural_key(slot_number):
+    # Order 'A2' before 'A10'
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', slot_number or '')]
+
+class _SlotPool:
+    """
+    Free slots of one vehicle type at one location as a bitmap over the
+    slots in slot-number order, so picking a slot is a couple of integer
+    operations
+    """
+
+    def __init__(self, slots):
+        slots = sorted(slots, key=lambda slot: (_natural_key(slot[1]), slot[0]))
+        self.slot_ids = [slot_id for slot_id, _, _ in slots]
+        self.ordinals = {slot_id: ordinal for ordinal, slot_id in enumerate(self.slot_ids)}
+        self.free = 0
+        for ordinal, (_, _, is_available) in enumerate(slots):
+            if is_available:
+                self.free |= 1 << ordinal
+        self.cursor = 0
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def pick(self, policy, skip=()):
+        free = self.free
+        for slot_id in skip:
+            ordinal = self.ordinals.get(slot_id)
+            if ordinal is not None:
+                free &= ~(1 << ordinal)
+        if not free:
+            return None
+        offset = 0
+        if policy == 'spread' and free >> self.cursor:
+            free >>= self.cursor
+            offset = self.cursor
+        ordinal = offset + (free & -free).bit_length() - 1
+        self.cursor = ordinal + 1
+        return self.slot_ids[ordinal]
+
+    def order(self, slot_ids, policy):
+        # Sort candidate ids by the policy, for windows the bitmap does not cover
+        # Slots newer than the bitmap go last
+        ordinals = sorted(self.ordinals[slot_id] for slot_id in slot_ids if slot_id in self.ordinals)
+        if policy == 'spread':
+            ordinals = ([o for o in ordinals if o >= self.cursor]
+                        + [o for o in ordinals if o < self.cursor])
+        return ([self.slot_ids[ordinal] for ordinal in ordinals]
+                + [slot_id for slot_id in slot_ids if slot_id not in self.ordinals])
+
+    def set(self, slot_id, is_available):
+        ordinal = self.ordinals.get(slot_id)
+        if ordinal is None:
+            return False
+        if is_available:
+            self.free |= 1 << ordinal
+        else:
+            self.free &= ~(1 << ordinal)
+        return True
+
+class SlotAllocator:
+    """
+    Picks and claims a free slot for a booking. Keeps an in-process free-slot
+    bitmap per (location, vehicle type), updated from slot events and
+    reloaded after SLOT_POOL_MAX_AGE seconds. The database claim stays the
+    source of truth: when the bitmap has no slot that can be claimed, the
+    free slots are looked up in the database before giving up.
+    """
+
+    def __init__(self, app=None):
+        self._pools = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOT_POOL_MAX_AGE', 30)
+
+        self.max_age = app.config['SLOT_POOL_MAX_AGE']
+        app.extensions['slot_allocator'] = self
+        app.extensions['slot_events'].add_listener(self.observe)
+
+    def _pool(self, location_id, vehicle_type):
+        key = (location_id, vehicle_type)
+        pool = self._pools.get(key)
+        if pool is None or time.monotonic() - pool.loaded_at > self.max_age:
+            slots = db.session.query(
+                ParkingSlot.id,
+                ParkingSlot.slot_number,
+                ParkingSlot.is_available
+            ).filter(
+                ParkingSlot.location_id == location_id,
+                ParkingSlot.vehicle_type == vehicle_type
+            ).all()
+            pool = _SlotPool(slots)
+            self._pools[key] = pool
+        return pool
+
+    def allocate(self, location_id, vehicle_type, start, end, now=None, policy='nearest-entrance', exclude=()):
+        """
+        Reserve a slot for [start, end) in the current transaction following
+        `policy`. Returns the slot id, or None if no slot is free.
+        """
+        now = now or datetime.utcnow()
+
+        with self._lock:
+            pool = self._pool(location_id, vehicle_type)
+
+        with pool.lock:
+            # Excluded slots were found taken by the caller
+            tried = set(exclude)
+
+            # Immediate bookings try the bitmap first. A failed claim is only
+            # skipped for this call: the slot may just have a later booking
+            # that overlaps this window.
+            if start <= now:
+                for _ in range(MAX_CLAIM_ATTEMPTS):
+                    slot_id = pool.pick(policy, tried)
+                    if slot_id is None:
+                        break
+                    tried.add(slot_id)
+                    if reserve_slot(slot_id, start, end, now):
+                        pool.set(slot_id, False)
+                        return slot_id
+
+            # Advance bookings, or a bitmap that missed other workers' and
+            # new slots: ask the database which slots are free
+            candidates = pool.order(free_slots(location_id, vehicle_type, start, end, now, tried), policy)
+            for slot_id in candidates[:MAX_CLAIM_ATTEMPTS]:
+                if reserve_slot(slot_id, start, end, now):
+                    if slot_id not in pool.ordinals:
+                        self.invalidate(location_id)
+                        return slot_id
+                    if start <= now:
+                        pool.set(slot_id, False)
+                    pool.cursor = pool.ordinals[slot_id] + 1
+                    return slot_id
+
+            return None
+
+    def observe(self, event):
+        """Apply a slot event to the bitmap of its pool, if loaded."""
+        key = (event['locationId'], event['vehicleType'])
+        pool = self._pools.get(key)
+        if pool is None:
+            return
+        with pool.lock:
+            known = pool.set(event['id'], event['isAvailable'])
+        if not known:
+            # New slot: reload the pool on next use
+            self._pools.pop(key, None)
+
+    def invalidate(self, location_id):
+        """Reload the pools of a location on next use, e.g. after slots are added."""
+        with self._lock:
+            for key in [key for key in self._pools if key[0] == location_id]:
+                del self._pools[key]
+
+def slot_allocator():
+    return current_app.extensions['slot_allocator']
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import re
+from flask import Response, abort, jsonify, request
+from sqlalchemy import make_url, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app import create_app
+from app.availability import collect_counts, slot_counts_statement, slot_revision_statement
+from app.cache import location_cache
+from app.conditional import matching_etag, not_modified
+from app.database import apply_pragmas, sqlite_pragmas
+from app.distance import location_index
+from app.events import Subscription, slot_events
+from app.models import Booking, ParkingLocation, ParkingSlot
+from app.pagination import keyset, page_args, split_page
+from app.routes.auth import login_required
+from app.routes.bookings import HISTORY_STATUSES
+from app.routes.parking import build_nearby, location_etag, location_response, nearby_args, stream_filters
+from app.serializers import booking_select, serialize_bookings
+from app.tokens import current_user_id
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # pragma: no cover - asgiref is optional
+    WsgiToAsgi = None
+
+# Async drivers used when ASYNC_DATABASE_URI is not set
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+def async_database_uri(uri):
+    """Swap the driver of a database URI for its async counterpart."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver known for {backend}; set ASYNC_DATABASE_URI")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+class AsyncSubscription(Subscription):
+    """Subscription whose events are awaited on an event loop."""
+
+    def __init__(self, loop, location_ids=None, bbox=None, maxsize=1000):
+        super().__init__(location_ids, bbox, maxsize)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        # Publishers run on other threads
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # Loop closed, the stream is gone
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class AsgiApp:
+    """
+    ASGI entry point. The read-heavy and long-lived endpoints (nearby,
+    location detail, booking history and the slot event stream) run on the
+    event loop with async SQLAlchemy; every other route of the auth,
+    parking and bookings blueprints is served by the Flask app in a thread
+    pool. Native views run inside a Flask request context, so sessions,
+    before/after request hooks and error handlers behave as under WSGI.
+    """
+
+    def __init__(self, flask_app):
+        if WsgiToAsgi is None:
+            raise RuntimeError("The asgiref package is required for ASGI serving")
+
+        flask_app.config.setdefault('ASYNC_DATABASE_URI', None)
+
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+        uri = flask_app.config['ASYNC_DATABASE_URI'] or async_database_uri(
+            flask_app.config['SQLALCHEMY_DATABASE_URI']
+        )
+        self.engine = create_async_engine(uri, **flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        apply_pragmas(self.engine.sync_engine, sqlite_pragmas(flask_app.config))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        # Count the native views' queries in the request's SQL accounting too
+        instrumentation = flask_app.extensions.get('instrumentation')
+        if instrumentation is not None:
+            instrumentation.instrument(self.engine.sync_engine)
+
+        self.routes = [
+            (re.compile(r'/api/parking/nearby'), self.nearby),
+            (re.compile(r'/api/parking/locations/(?P<location_id>\d+)'), self.location),
+            (re.compile(r'/api/parking/slots/stream'), self.slot_stream),
+            (re.compile(r'/api/bookings/history'), self.booking_history),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for pattern, view in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    kwargs = {key: int(value) for key, value in match.groupdict().items()}
+                    return await self._dispatch(scope, receive, send, view, kwargs)
+
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _dispatch(self, scope, receive, send, view, kwargs):
+        app = self.flask_app
+        headers = [(key.decode('latin-1'), value.decode('latin-1')) for key, value in scope['headers']]
+        client = scope.get('client') or ('', 0)
+
+        with app.test_request_context(
+            scope['path'],
+            method=scope['method'],
+            # ASGI servers send the query string as bytes
+            query_string=scope['query_string'].decode('latin-1'),
+            headers=headers,
+            environ_base={'REMOTE_ADDR': client[0]}
+        ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**kwargs)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+            except Exception as e:
+                rv = app.handle_exception(e)
+
+            response = app.process_response(app.make_response(rv))
+            await self._send(scope, receive, send, response)
+
+    async def _send(self, scope, receive, send, response):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [
+                (key.lower().encode('latin-1'), value.encode('latin-1'))
+                for key, value in response.headers.items()
+            ]
+        })
+
+        if scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        # Streaming views return a Response around an async generator
+        if not hasattr(response.response, '__anext__'):
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+            return
+
+        chunks = response.response
+        disconnected = asyncio.ensure_future(self._disconnect(receive))
+        try:
+            async for chunk in chunks:
+                if disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        finally:
+            disconnected.cancel()
+            await chunks.aclose()
+
+    async def _disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def _nearest(self, lat, lng, radius, limit):
+        # The index only queries the database when it reloads
+        with self.flask_app.app_context():
+            return location_index.nearest(lat, lng, radius, limit)
+
+    async def nearby(self):
+        lat, lng, radius, limit, error = nearby_args(request.args)
+        if error:
+            return jsonify({"message": error}), 400
+
+        nearest = await asyncio.to_thread(self._nearest, lat, lng, radius, limit)
+
+        async with self.sessions() as db_session:
+            locations = (await db_session.scalars(select(ParkingLocation).where(
+                ParkingLocation.id.in_([location_id for location_id, _ in nearest])
+            ))).all()
+
+            location_ids = [location.id for location in locations]
+            rows = []
+            if location_ids:
+                rows = (await db_session.execute(slot_counts_statement(location_ids))).all()
+
+        return jsonify({
+            "locations": build_nearby(nearest, locations, collect_counts(location_ids, rows))
+        }), 200
+
+    async def location(self, location_id):
+        async with self.sessions() as db_session:
+            location = await location_cache().get_async(location_id, db_session)
+            if location is None:
+                abort(404)
+
+            revision = await db_session.scalar(slot_revision_statement(location_id))
+            etag = location_etag(location, revision)
+            matched = matching_etag(etag)
+            if matched is not None:
+                return not_modified(matched)
+
+            slots = (await db_session.scalars(
+                select(ParkingSlot).where(ParkingSlot.location_id == location_id)
+            )).all()
+
+        response = self.flask_app.make_response(location_response(location, slots))
+        response.set_etag(etag)
+        return response
+
+    @login_required
+    async def booking_history(self):
+        try:
+            limit, after = page_args()
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+        statement = keyset(booking_select().where(
+            Booking.user_id == current_user_id(),
+            Booking.status.in_(HISTORY_STATUSES)
+        ), Booking, limit, after)
+
+        async with self.sessions() as db_session:
+            rows = (await db_session.execute(statement)).all()
+        bookings, next_cursor = split_page(rows, limit)
+
+        return jsonify({
+            "bookings": serialize_bookings(bookings),
+            "nextCursor": next_cursor
+        }), 200
+
+    async def slot_stream(self):
+        location_ids, bbox, error = stream_filters(request.args)
+        if error:
+            return jsonify({"message": error}), 400
+
+        broker = slot_events()
+        loop = asyncio.get_running_loop()
+        keepalive = self.flask_app.config['SLOT_EVENTS_KEEPALIVE']
+
+        async def stream():
+            # Subscribe on first iteration, so a response that is never sent leaks nothing
+            subscription = broker.attach(AsyncSubscription(loop, location_ids, bbox))
+            try:
+                yield "retry: 5000\n\n"
+                while True:
+                    event = await subscription.get(timeout=keepalive)
+                    if event is None:
+                        yield ": keepalive\n\n"
+                    else:
+                        yield f"event: slot\ndata: {json.dumps(event)}\n\n"
+            finally:
+                broker.unsubscribe(subscription)
+
+        return Response(stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+def create_asgi_app(config_class=None):
+    return AsgiApp(create_app(config_class))
@@ -0,0 +1,90 @@
+from app import db
+from app.models import ParkingSlot, SlotRevision, mark_slot_revisions
+
+VEHICLE_TYPES = ['two-wheeler', 'four-wheeler']
+
+def _empty_counts():
+    return {
+        'availableSlots': 0,
+        'totalSlots': 0,
+        'byVehicleType': {
+            vehicle_type: {'availableSlots': 0, 'totalSlots': 0}
+            for vehicle_type in VEHICLE_TYPES
+        }
+    }
+
+def _add(counts, vehicle_type, available, total):
+    counts['availableSlots'] += available
+    counts['totalSlots'] += total
+    by_type = counts['byVehicleType'].setdefault(
+        vehicle_type, {'availableSlots': 0, 'totalSlots': 0}
+    )
+    by_type['availableSlots'] += available
+    by_type['totalSlots'] += total
+
+def slot_counts_statement(location_ids):
+    """Grouped (location_id, vehicle_type, available, total) rows for count_slots."""
+    return db.select(
+        ParkingSlot.location_id,
+        ParkingSlot.vehicle_type,
+        db.func.sum(db.case((ParkingSlot.is_available == True, 1), else_=0)),
+        db.func.count(ParkingSlot.id)
+    ).where(
+        ParkingSlot.location_id.in_(location_ids)
+    ).group_by(
+        ParkingSlot.location_id,
+        ParkingSlot.vehicle_type
+    )
+
+def slot_revision_statement(location_id):
+    """
+    The location's slot revision, which every committed transaction writing
+    one of its slots bumps, so it changes whenever a slot does
+    """
+    return db.select(SlotRevision.revision).where(SlotRevision.location_id == location_id)
+
+def slot_revision(location_id):
+    return db.session.execute(slot_revision_statement(location_id)).scalar()
+
+def bump_slot_revisions(slot_ids):
+    """
+    Bump the slot revision of every location owning one of slot_ids when the
+    current transaction commits. Core statements writing parking_slots call
+    this; ORM flushes are covered by a listener in app.models.
+    """
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return
+
+    location_ids = db.session.execute(
+        db.select(ParkingSlot.location_id).where(ParkingSlot.id.in_(slot_ids)).distinct()
+    ).scalars()
+    mark_slot_revisions(db.session, location_ids)
+
+def collect_counts(location_ids, rows):
+    """Build the count_slots result from rows of slot_counts_statement."""
+    counts = {location_id: _empty_counts() for location_id in location_ids}
+    for location_id, vehicle_type, available, total in rows:
+        _add(counts[location_id], vehicle_type, int(available or 0), total)
+    return counts
+
+def count_slots(location_ids):
+    """
+    Return available/total slot counts for each location id, split by
+    vehicle type, using a single grouped query
+    """
+    location_ids = list(location_ids)
+    if not location_ids:
+        return {}
+
+    rows = db.session.execute(slot_counts_statement(location_ids)).all()
+    return collect_counts(location_ids, rows)
+
+def summarize_slots(slots):
+    """
+    Return the same counts as count_slots for slots that are already loaded
+    """
+    counts = _empty_counts()
+    for slot in slots:
+        _add(counts, slot.vehicle_type, 1 if slot.is_available else 0, 1)
+    return counts
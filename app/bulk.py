@@ -0,0 +1,92 @@
+from datetime import datetime
+from app import db
+from app.availability import VEHICLE_TYPES, bump_slot_revisions
+from app.models import ParkingSlot
+
+# Column each JSON field of a slot maps to
+SLOT_FIELDS = {
+    'slotNumber': 'slot_number',
+    'isAvailable': 'is_available',
+    'vehicleType': 'vehicle_type'
+}
+
+def _slot_error(row, require_id, require_number):
+    if not isinstance(row, dict):
+        return "Slot must be an object"
+    if require_id and (not isinstance(row.get('id'), int) or isinstance(row.get('id'), bool)):
+        return "Missing or invalid id"
+    if require_number and 'slotNumber' not in row:
+        return "Missing required field: slotNumber"
+    if 'slotNumber' in row and not (isinstance(row['slotNumber'], str) and 0 < len(row['slotNumber']) <= 10):
+        return "slotNumber must be 1 to 10 characters"
+    if 'isAvailable' in row and not isinstance(row['isAvailable'], bool):
+        return "isAvailable must be true or false"
+    if 'vehicleType' in row and row['vehicleType'] not in VEHICLE_TYPES:
+        return "Invalid vehicle type"
+    return None
+
+def validate_slots(rows, require_id=False, require_number=False):
+    """
+    Validate every row in one pass. Returns a list of
+    {"index": i, "message": ...} for the rows that are invalid.
+    """
+    errors = []
+    for index, row in enumerate(rows):
+        message = _slot_error(row, require_id, require_number)
+        if message:
+            errors.append({"index": index, "message": message})
+    return errors
+
+def create_slots(location_id, rows):
+    """Insert validated slot rows with a single executemany. Returns their ids."""
+    now = datetime.utcnow()
+    slot_ids = db.session.execute(db.insert(ParkingSlot).returning(ParkingSlot.id), [{
+        'location_id': location_id,
+        'slot_number': row['slotNumber'],
+        'is_available': row.get('isAvailable', True),
+        'vehicle_type': row.get('vehicleType', 'four-wheeler'),
+        'last_updated': now
+    } for row in rows]).scalars().all()
+    bump_slot_revisions(slot_ids)
+    return slot_ids
+
+def update_slots(rows):
+    """
+    Apply validated {"id": ..., field: value} rows as one bulk UPDATE by
+    primary key. Returns the indexes of rows whose slot does not exist.
+    """
+    ids = [row['id'] for row in rows]
+    existing = {slot_id for (slot_id,) in db.session.query(ParkingSlot.id).filter(ParkingSlot.id.in_(ids))}
+    missing = [index for index, row in enumerate(rows) if row['id'] not in existing]
+    if missing:
+        return missing
+
+    # executemany groups rows by the set of columns they change
+    now = datetime.utcnow()
+    db.session.execute(db.update(ParkingSlot), [
+        dict({column: row[field] for field, column in SLOT_FIELDS.items() if field in row},
+             id=row['id'], last_updated=now)
+        for row in rows
+    ])
+    bump_slot_revisions(ids)
+    return []
+
+def set_availability(available_ids=(), occupied_ids=(), now=None):
+    """
+    Flip is_available for many slots with one UPDATE per direction, only
+    touching slots whose state actually changes. Returns the changed ids.
+    """
+    now = now or datetime.utcnow()
+    changed = []
+
+    for ids, is_available in ((available_ids, True), (occupied_ids, False)):
+        if ids:
+            changed.extend(db.session.execute(
+                db.update(ParkingSlot)
+                .where(ParkingSlot.id.in_(list(ids)), ParkingSlot.is_available != is_available)
+                .values(is_available=is_available, last_updated=now)
+                .returning(ParkingSlot.id)
+            ).scalars())
+
+    bump_slot_revisions(changed)
+    return changed
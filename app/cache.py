@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, abort
+from app.conditional import strong_etag
+from app.models import ParkingLocation
+from app.replicas import primary_reads
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+class LocalCache:
+    """
+    In-process LRU cache whose entries expire after `ttl` seconds
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def size(self):
+        return len(self._entries)
+
+class RedisCache:
+    """
+    Cache shared between workers, stored in Redis as JSON. Eviction is left
+    to the server's maxmemory policy.
+    """
+
+    def __init__(self, url, ttl=300, prefix='findmyslot:'):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the redis cache backend")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self._client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def size(self):
+        return None
+
+class LocationCache:
+    """
+    Read-through cache of location dicts, including their pricing. Entries
+    are invalidated by the admin location endpoints and otherwise expire
+    after LOCATION_CACHE_TTL seconds.
+    """
+
+    ALL_KEY = 'locations:all'
+    ALL_ETAG_KEY = 'locations:all:etag'
+
+    def __init__(self, app=None):
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOCATION_CACHE_BACKEND', 'local')
+        app.config.setdefault('LOCATION_CACHE_URL', None)
+        app.config.setdefault('LOCATION_CACHE_TTL', 300)
+        app.config.setdefault('LOCATION_CACHE_SIZE', 1024)
+
+        if app.config['LOCATION_CACHE_BACKEND'] == 'redis':
+            self.backend = RedisCache(app.config['LOCATION_CACHE_URL'], app.config['LOCATION_CACHE_TTL'])
+        else:
+            self.backend = LocalCache(app.config['LOCATION_CACHE_SIZE'], app.config['LOCATION_CACHE_TTL'])
+
+        app.extensions['location_cache'] = self
+
+    def _key(self, location_id):
+        return f'location:{location_id}'
+
+    def _lookup(self, key, load):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        with primary_reads():
+            value = load()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def get(self, location_id):
+        def load():
+            location = ParkingLocation.query.get(location_id)
+            return location.to_dict() if location else None
+        return self._lookup(self._key(location_id), load)
+
+    async def get_async(self, location_id, session):
+        """get() for async views, loading misses through an AsyncSession."""
+        key = self._key(location_id)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        location = await session.get(ParkingLocation, location_id)
+        if location is None:
+            return None
+        value = location.to_dict()
+        self.backend.set(key, value)
+        return value
+
+    def get_all(self):
+        return self._lookup(self.ALL_KEY, lambda: [
+            location.to_dict() for location in ParkingLocation.query.all()
+        ])
+
+    def get_all_etag(self):
+        """ETag of get_all(), from the id and revision of every location."""
+        return self._lookup(self.ALL_ETAG_KEY, lambda: strong_etag('locations', *(
+            (location['id'], location.get('revision')) for location in self.get_all()
+        )))
+
+    def invalidate(self, location_id=None):
+        keys = [self.ALL_KEY, self.ALL_ETAG_KEY]
+        if location_id is not None:
+            keys.append(self._key(location_id))
+        self.backend.delete(*keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else None,
+            'size': self.backend.size()
+        }
+
+def location_cache():
+    return current_app.extensions['location_cache']
+
+def get_location_or_404(location_id):
+    """Return the cached dict of a location, aborting with 404 if missing."""
+    location = location_cache().get(location_id)
+    if location is None:
+        abort(404)
+    return location
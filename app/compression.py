@@ -0,0 +1,71 @@
+import gzip
+from flask import request
+from app.cache import LocalCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+class ResponseCompression:
+    """
+    Compresses response bodies of COMPRESS_MIMETYPES larger than
+    COMPRESS_MIN_SIZE with the best of brotli (when installed) and gzip the
+    client accepts. A strong ETag gets the coding as a suffix, since the
+    compressed body is a different representation, and compressed bodies of
+    ETagged responses are cached so unchanged payloads are compressed once.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)  # Bytes
+        app.config.setdefault('COMPRESS_MIMETYPES', ['application/json', 'text/html', 'text/css',
+                                                     'text/javascript', 'application/javascript'])
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 5)
+        app.config.setdefault('COMPRESS_CACHE_SIZE', 256)
+
+        self.app = app
+        self.encodings = (['br'] if brotli is not None else []) + ['gzip']
+        self.cache = LocalCache(app.config['COMPRESS_CACHE_SIZE'], ttl=3600)
+        app.extensions['compression'] = self
+
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if response.mimetype not in self.app.config['COMPRESS_MIMETYPES']:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None or (response.content_length or 0) < self.app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        etag, weak = response.get_etag()
+        key = f'{etag}-{encoding}' if etag and not weak else None
+        body = self.cache.get(key) if key else None
+        if body is None:
+            body = self.compress(response.get_data(), encoding)
+            if key:
+                self.cache.set(key, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if key:
+            response.set_etag(key)
+        return response
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.app.config['COMPRESS_BROTLI_QUALITY'])
+        # A fixed mtime keeps the output byte-identical for the same body
+        return gzip.compress(data, compresslevel=self.app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
@@ -0,0 +1,42 @@
+import hashlib
+from flask import current_app, request
+
+# Content codings a strong ETag may carry as a suffix, see app.compression
+ENCODED_SUFFIXES = ('-br', '-gzip')
+
+def strong_etag(*parts):
+    """A strong ETag value (unquoted) from the version stamps of a response."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def matching_etag(etag):
+    """
+    The tag in the request's If-None-Match that matches `etag`, or one of
+    its compressed variants, else None.
+    """
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    if if_none_match.star_tag:
+        return etag
+    for candidate in (etag,) + tuple(etag + suffix for suffix in ENCODED_SUFFIXES):
+        if if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def conditional_response(etag, build):
+    """
+    Answer 304 if the client already has `etag`, otherwise return build()
+    with the ETag set. build() is only called when the client's copy is stale.
+    """
+    matched = matching_etag(etag)
+    if matched is not None:
+        return not_modified(matched)
+
+    response = current_app.make_response(build())
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,69 @@
+from sqlalchemy import event, make_url
+from app import db
+
+# Engine options that only apply to queue pools
+POOL_SIZING_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+def configure_engine_options(app):
+    """
+    Drop pool sizing options an in-memory SQLite database cannot take, as
+    it runs on a single shared connection. Call before db.init_app.
+    """
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            key: value for key, value in options.items() if key not in POOL_SIZING_OPTIONS
+        }
+
+def sqlite_pragmas(config):
+    """PRAGMA statements for the SQLITE_* settings of a config."""
+    pragmas = []
+    if config['SQLITE_JOURNAL_MODE']:
+        pragmas.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config['SQLITE_SYNCHRONOUS']:
+        pragmas.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    if config['SQLITE_BUSY_TIMEOUT'] is not None:
+        pragmas.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+    return pragmas
+
+def apply_pragmas(engine, pragmas):
+    """Run `pragmas` on every new connection of a SQLite engine."""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    event.listen(engine, 'connect', set_pragmas)
+
+def init_engines(app):
+    """Apply the SQLite pragmas configured in SQLITE_* to every engine."""
+    app.config.setdefault('SQLITE_JOURNAL_MODE', None)
+    app.config.setdefault('SQLITE_SYNCHRONOUS', None)
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT', None)
+
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_pragmas(engine, pragmas)
+
+def pool_stats():
+    """Connection pool usage of every engine of the current app, by bind."""
+    stats = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__}
+        # Only queue pools track sizes
+        if hasattr(pool, 'checkedout'):
+            entry.update({
+                'size': pool.size(),
+                'checkedIn': pool.checkedin(),
+                'checkedOut': pool.checkedout(),
+                'overflow': pool.overflow()
+            })
+        stats[bind or 'default'] = entry
+    return stats
@@ -0,0 +1,143 @@
+import heapq
+import math
+import threading
+import time
+from array import array
+
+from app.replicas import primary_reads
+from app.spatial import EARTH_RADIUS_KM, bounding_box, cells_for_box, grid_cell
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+def haversine_distances(lat, lng, lats, lngs, cos_lats):
+    """
+    Compute Haversine distances in km from (lat, lng) in degrees to every
+    point of the given arrays, which hold latitudes and longitudes in
+    radians and the cosine of each latitude
+    """
+    lat = math.radians(lat)
+    lng = math.radians(lng)
+    cos_lat = math.cos(lat)
+
+    if np is not None:
+        a = (np.sin((lats - lat) / 2) ** 2
+             + cos_lat * cos_lats * np.sin((lngs - lng) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    distances = array('d', bytes(8 * len(lats)))
+    for i in range(len(lats)):
+        a = (math.sin((lats[i] - lat) / 2) ** 2
+             + cos_lat * cos_lats[i] * math.sin((lngs[i] - lng) / 2) ** 2)
+        distances[i] = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+    return distances
+
+class LocationIndex:
+    """
+    In-process copy of every parking location's coordinates, held in
+    contiguous arrays grouped by grid cell so radius searches only touch the
+    cells around the search point
+    """
+
+    def __init__(self, max_age=60):
+        # Other workers' admin writes are picked up after max_age seconds
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _load(self):
+        from app import db
+        from app.models import ParkingLocation
+
+        rows = db.session.query(
+            ParkingLocation.id,
+            ParkingLocation.latitude,
+            ParkingLocation.longitude,
+            ParkingLocation.grid_cell
+        ).all()
+
+        # Sort by grid cell so each cell is a contiguous slice
+        rows = sorted(
+            ((cell if cell is not None else grid_cell(lat, lng), location_id, lat, lng)
+             for location_id, lat, lng, cell in rows)
+        )
+
+        ids = array('q', (row[1] for row in rows))
+        lats = array('d', (math.radians(row[2]) for row in rows))
+        lngs = array('d', (math.radians(row[3]) for row in rows))
+        cos_lats = array('d', (math.cos(value) for value in lats))
+
+        cells = {}
+        for i, row in enumerate(rows):
+            start, _ = cells.get(row[0], (i, i))
+            cells[row[0]] = (start, i + 1)
+
+        if np is not None:
+            ids, lats, lngs, cos_lats = (np.frombuffer(values, dtype=values.typecode)
+                                         for values in (ids, lats, lngs, cos_lats))
+
+        return ids, lats, lngs, cos_lats, cells
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.max_age:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or time.monotonic() - self._loaded_at > self.max_age:
+                    # From the primary, so an invalidation is not undone by a lagging replica
+                    with primary_reads():
+                        snapshot = self._load()
+                    self._snapshot = snapshot
+                    self._loaded_at = time.monotonic()
+        return snapshot
+
+    def nearest(self, lat, lng, radius, limit=None):
+        """
+        Return (location_id, distance) pairs within `radius` km of the point,
+        nearest first, keeping only the first `limit` if given
+        """
+        ids, lats, lngs, cos_lats, cells = self._get_snapshot()
+
+        # Pick the slices of the cells covering the search circle
+        box_cells = cells_for_box(*bounding_box(lat, lng, radius))
+        if box_cells is None:
+            slices = [(0, len(ids))]
+        else:
+            slices = sorted(cells[cell] for cell in box_cells if cell in cells)
+
+        if np is not None:
+            if not slices:
+                return []
+            index = np.concatenate([np.arange(start, end) for start, end in slices])
+            distances = haversine_distances(lat, lng, lats[index], lngs[index], cos_lats[index])
+            in_range = distances <= radius
+            index, distances = index[in_range], distances[in_range]
+
+            if limit is not None and limit < len(index):
+                nearest = np.argpartition(distances, limit - 1)[:limit]
+                index, distances = index[nearest], distances[nearest]
+
+            order = np.lexsort((ids[index], distances))
+            return list(zip(ids[index[order]].tolist(), distances[order].tolist()))
+
+        results = []
+        for start, end in slices:
+            distances = haversine_distances(lat, lng, lats[start:end], lngs[start:end], cos_lats[start:end])
+            results.extend(
+                (distance, ids[start + i]) for i, distance in enumerate(distances)
+                if distance <= radius
+            )
+
+        if limit is not None:
+            results = heapq.nsmallest(limit, results)
+        else:
+            results.sort()
+        return [(location_id, distance) for distance, location_id in results]
+
+location_index = LocationIndex()
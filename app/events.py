@@ -0,0 +1,198 @@
+import json
+import queue
+import threading
+from flask import current_app
+from app.spatial import grid_cell, cells_for_box
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+class Subscription:
+    """
+    A subscriber's queue of slot events, filtered to a set of locations
+    and/or a bounding box (min_lat, min_lng, max_lat, max_lng)
+    """
+
+    def __init__(self, location_ids=None, bbox=None, maxsize=1000):
+        self.location_ids = set(location_ids or [])
+        self.bbox = bbox
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def matches(self, event):
+        if event['locationId'] in self.location_ids:
+            return True
+        if self.bbox is None or event.get('latitude') is None:
+            return False
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return (min_lat <= event['latitude'] <= max_lat
+                and min_lng <= event['longitude'] <= max_lng)
+
+    def put(self, event):
+        # Slow consumers lose events rather than blocking publishers
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class SlotEventBroker:
+    """
+    In-process fan-out of slot availability events. Subscribers are indexed
+    by location id and by grid cell, so publishing an event only visits the
+    subscribers that can match it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_location = {}
+        self._by_cell = {}
+        self._everywhere = set()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call `callback(event)` for every event delivered in this process."""
+        self._listeners.append(callback)
+
+    def subscribe(self, location_ids=None, bbox=None, maxsize=1000):
+        return self.attach(Subscription(location_ids, bbox, maxsize))
+
+    def attach(self, subscription):
+        """Start delivering events to a Subscription, or a subclass of it."""
+        with self._lock:
+            for location_id in subscription.location_ids:
+                self._by_location.setdefault(location_id, set()).add(subscription)
+            if subscription.bbox is not None:
+                cells = self._cells(subscription.bbox)
+                if cells is None:
+                    self._everywhere.add(subscription)
+                else:
+                    for cell in cells:
+                        self._by_cell.setdefault(cell, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for location_id in subscription.location_ids:
+                self._discard(self._by_location, location_id, subscription)
+            if subscription.bbox is not None:
+                self._everywhere.discard(subscription)
+                for cell in self._cells(subscription.bbox) or []:
+                    self._discard(self._by_cell, cell, subscription)
+
+    def publish(self, event):
+        with self._lock:
+            candidates = set(self._by_location.get(event['locationId'], ()))
+            if event.get('latitude') is not None:
+                cell = grid_cell(event['latitude'], event['longitude'])
+                candidates.update(self._by_cell.get(cell, ()))
+                candidates.update(self._everywhere)
+
+        for listener in self._listeners:
+            listener(event)
+
+        for subscription in candidates:
+            if subscription.matches(event):
+                subscription.put(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            subscriptions = set(self._everywhere)
+            for subscribers in list(self._by_location.values()) + list(self._by_cell.values()):
+                subscriptions.update(subscribers)
+            return len(subscriptions)
+
+    def _cells(self, bbox):
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return cells_for_box(min_lat, max_lat, min_lng, max_lng)
+
+    def _discard(self, index, key, subscription):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del index[key]
+
+class RedisSlotEventBroker(SlotEventBroker):
+    """
+    Relays events through Redis pub/sub so subscribers connected to any
+    worker see every worker's slot changes
+    """
+
+    CHANNEL = 'findmyslot:slot-events'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the redis event backend")
+        super().__init__()
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self._ensure_listener()
+        super().add_listener(callback)
+
+    def attach(self, subscription):
+        self._ensure_listener()
+        return super().attach(subscription)
+
+    def publish(self, event):
+        self._client.publish(self.CHANNEL, json.dumps(event))
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='slot-event-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.CHANNEL)
+        for message in pubsub.listen():
+            super().publish(json.loads(message['data']))
+
+def init_slot_events(app):
+    app.config.setdefault('SLOT_EVENTS_BACKEND', 'local')
+    app.config.setdefault('SLOT_EVENTS_URL', None)
+
+    if app.config['SLOT_EVENTS_BACKEND'] == 'redis':
+        broker = RedisSlotEventBroker(app.config['SLOT_EVENTS_URL'])
+    else:
+        broker = SlotEventBroker()
+
+    app.extensions['slot_events'] = broker
+    return broker
+
+def slot_events():
+    return current_app.extensions['slot_events']
+
+def publish_slot_change(slot):
+    """Publish the current state of a slot to its subscribers."""
+    from app.cache import location_cache
+
+    event = slot.to_dict()
+    location = location_cache().get(slot.location_id)
+    if location is not None:
+        event['latitude'] = location['latitude']
+        event['longitude'] = location['longitude']
+
+    slot_events().publish(event)
+
+def publish_slot_changes(slot_ids):
+    """Publish the current state of many slots, loaded in one query."""
+    from app.models import ParkingSlot
+
+    slot_ids = list(slot_ids)
+    if slot_ids:
+        for slot in ParkingSlot.query.filter(ParkingSlot.id.in_(slot_ids)):
+            publish_slot_change(slot)
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from datetime import datetime
+from app import db
+from app.availability import bump_slot_revisions
+from app.models import Booking, ParkingSlot
+from app.reservations import OPEN_STATUSES
+
+def expire_bookings(now=None, batch_size=500):
+    """
+    Complete every open booking whose end_date has passed and free its
+    slot, one batch per transaction. Returns the (booking_id, user_id,
+    slot_id) of each booking completed by this call.
+
+    Safe to run concurrently: rows locked by another worker are skipped
+    where the database supports it, and the status check in the UPDATE
+    means each booking is only completed once.
+    """
+    now = now or datetime.utcnow()
+    expired = []
+
+    while True:
+        ids = [booking_id for (booking_id,) in db.session.query(Booking.id).filter(
+            Booking.status.in_(OPEN_STATUSES),
+            Booking.end_date <= now
+        ).order_by(Booking.end_date).limit(batch_size).with_for_update(skip_locked=True)]
+
+        if not ids:
+            db.session.rollback()
+            break
+
+        completed = db.session.execute(
+            db.update(Booking)
+            .where(Booking.id.in_(ids), Booking.status.in_(OPEN_STATUSES))
+            .values(status='completed')
+            .returning(Booking.id, Booking.user_id, Booking.slot_id)
+        ).all()
+
+        slot_ids = [slot_id for _, _, slot_id in completed]
+        if slot_ids:
+            db.session.execute(
+                db.update(ParkingSlot)
+                .where(ParkingSlot.id.in_(slot_ids))
+                .values(is_available=True, last_updated=now)
+            )
+            bump_slot_revisions(slot_ids)
+
+        db.session.commit()
+        expired.extend(tuple(row) for row in completed)
+
+        if len(ids) < batch_size:
+            break
+
+    return expired
+
+def occupy_started_bookings(now=None):
+    """
+    Mark the slots of open bookings whose window has started as taken, so
+    advance reservations show up in current availability. Returns the ids
+    of the slots changed by this call.
+    """
+    now = now or datetime.utcnow()
+
+    started = db.session.query(Booking.slot_id).filter(
+        Booking.status.in_(OPEN_STATUSES),
+        Booking.start_date <= now,
+        Booking.end_date > now
+    )
+
+    occupied = db.session.execute(
+        db.update(ParkingSlot)
+        .where(ParkingSlot.id.in_(started.scalar_subquery()), ParkingSlot.is_available == True)
+        .values(is_available=False, last_updated=now)
+        .returning(ParkingSlot.id)
+    ).scalars().all()
+    bump_slot_revisions(occupied)
+
+    db.session.commit()
+    return occupied
+
+class BookingExpiryScheduler:
+    """
+    Runs expire_bookings and occupy_started_bookings every EXPIRY_INTERVAL
+    seconds in a background thread of each worker process, then notifies
+    users and publishes the changed slots
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EXPIRY_SCHEDULER_ENABLED', False)
+        app.config.setdefault('EXPIRY_INTERVAL', 30)
+        app.config.setdefault('EXPIRY_BATCH_SIZE', 500)
+
+        self.app = app
+        app.extensions['expiry_scheduler'] = self
+
+        # Start lazily so each forked worker gets its own thread
+        if app.config['EXPIRY_SCHEDULER_ENABLED']:
+            app.before_request(self._ensure_worker)
+
+    def run_once(self):
+        from app.events import publish_slot_changes
+        from app.notifications import notify
+
+        with self.app.app_context():
+            expired = expire_bookings(batch_size=self.app.config['EXPIRY_BATCH_SIZE'])
+
+            for _, user_id, _ in expired:
+                notify(
+                    user_id=user_id,
+                    title="Booking Completed",
+                    message="Your parking booking has ended and has been completed.",
+                    type="info"
+                )
+
+            slot_ids = [slot_id for _, _, slot_id in expired]
+            slot_ids.extend(occupy_started_bookings())
+            publish_slot_changes(slot_ids)
+
+        return expired
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='booking-expiry', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                self.app.logger.exception("Booking expiry run failed")
+            time.sleep(self.app.config['EXPIRY_INTERVAL'])
@@ -0,0 +1,226 @@
+import sys
+import threading
+import time
+from collections import Counter
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from app import db
+from app.database import pool_stats
+
+# Histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Cumulative Prometheus-style histogram with one series per label set."""
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in self._series.items():
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+                lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every other thread every PROFILER_INTERVAL seconds
+    and aggregates them in the folded format flame graph tools read
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self.stacks = Counter()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.folded()
+
+    def folded(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while self._running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+            time.sleep(self.interval)
+
+class Instrumentation:
+    """
+    Opt-in (INSTRUMENTATION_ENABLED) request timing and SQL statement
+    accounting. Exposes Prometheus metrics at /metrics, adds a Server-Timing
+    header and logs requests that repeat a statement N1_THRESHOLD or more
+    times, the usual sign of an N+1 query pattern.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+        app.config.setdefault('N1_THRESHOLD', 5)
+        app.config.setdefault('PROFILER_INTERVAL', 0.005)
+
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+
+        self.app = app
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Request wall time.', LATENCY_BUCKETS
+        )
+        self.sql_latency = Histogram(
+            'sql_duration_seconds_per_request', 'Total SQL time per request.', LATENCY_BUCKETS
+        )
+        self.sql_count = Histogram(
+            'sql_statements_per_request', 'SQL statements executed per request.', QUERY_COUNT_BUCKETS
+        )
+        self.n_plus_one = Counter()
+        self.profiler = SamplingProfiler(app.config['PROFILER_INTERVAL'])
+        app.extensions['instrumentation'] = self
+
+        # The primary and every replica bind
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument(engine)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics)
+
+        from app.routes.auth import admin_required
+        app.add_url_rule('/api/debug/profiler', 'profiler', admin_required(self.toggle_profiler),
+                         methods=['POST'])
+
+    def instrument(self, engine):
+        """Record the statements of an engine in the request's SQL accounting."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        if has_request_context() and 'sql_statements' in g:
+            g.sql_statements.append((statement, time.perf_counter() - started))
+
+    def _after_request(self, response):
+        if 'request_started' not in g:
+            return response
+
+        elapsed = time.perf_counter() - g.request_started
+        statements = g.sql_statements
+        sql_time = sum(duration for _, duration in statements)
+
+        labels = (
+            ('method', request.method),
+            ('route', request.url_rule.rule if request.url_rule else 'unmatched'),
+            ('status', str(response.status_code))
+        )
+        self.request_latency.observe(labels, elapsed)
+        self.sql_latency.observe(labels[:2], sql_time)
+        self.sql_count.observe(labels[:2], len(statements))
+
+        # Flag statements repeated often enough to look like N+1 loads
+        threshold = self.app.config['N1_THRESHOLD']
+        for statement, count in Counter(statement for statement, _ in statements).items():
+            if count >= threshold:
+                self.n_plus_one[(labels[1][1], statement)] += 1
+                self.app.logger.warning(
+                    "Possible N+1: %s ran %d times in %s %s", statement, count, request.method, request.path
+                )
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={sql_time * 1000:.1f};desc="{len(statements)} queries"'
+        )
+        return response
+
+    def metrics(self):
+        lines = []
+        for histogram in (self.request_latency, self.sql_latency, self.sql_count):
+            lines.extend(histogram.render())
+
+        lines.append("# HELP n_plus_one_requests_total Requests that repeated a statement N1_THRESHOLD times.")
+        lines.append("# TYPE n_plus_one_requests_total counter")
+        for (route, statement), count in self.n_plus_one.items():
+            statement = ' '.join(statement.split()).replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'n_plus_one_requests_total{{route="{route}",statement="{statement}"}} {count}')
+
+        lines.append("# HELP db_pool_connections Connections of each engine's pool by state.")
+        lines.append("# TYPE db_pool_connections gauge")
+        for bind, stats in pool_stats().items():
+            for state in ('checkedIn', 'checkedOut', 'overflow'):
+                if state in stats:
+                    lines.append(f'db_pool_connections{{bind="{bind}",state="{state}"}} {stats[state]}')
+
+        hasher = self.app.extensions.get('password_hasher')
+        if hasher is not None:
+            stats = hasher.stats()
+            lines.append("# HELP password_hashes_pending Password hashes queued or running.")
+            lines.append("# TYPE password_hashes_pending gauge")
+            lines.append(f"password_hashes_pending {stats['pending']}")
+            lines.append("# HELP password_hashes_rejected_total Password hashes rejected with 503.")
+            lines.append("# TYPE password_hashes_rejected_total counter")
+            lines.append(f"password_hashes_rejected_total {stats['rejected']}")
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+    def toggle_profiler(self):
+        """
+        Start the sampling profiler, or stop it and return the collected
+        stacks in folded format when it is already running
+        """
+        if self.profiler.running:
+            return Response(self.profiler.stop(), mimetype='text/plain')
+        self.profiler.start()
+        return {"message": "Profiler started"}, 200
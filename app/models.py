@@ -1,6 +1,8 @@
 from datetime import datetime
+from sqlalchemy.orm import object_session
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.spatial import grid_cell
+from app.passwords import hash_password, verify_password
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -10,16 +12,18 @@ class User(db.Model):
     username = db.Column(db.String(64), index=True, unique=True)
     password_hash = db.Column(db.String(128))
     is_admin = db.Column(db.Boolean, default=False)
+    # Maintained by app.notifications; rebuilt with `flask recount-notifications`
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     bookings = db.relationship('Booking', backref='user', lazy='dynamic')
     payments = db.relationship('Payment', backref='user', lazy='dynamic')
     notifications = db.relationship('Notification', backref='user', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -29,6 +33,13 @@ class User(db.Model):
             'isAdmin': self.is_admin
         }
 
+class BootstrapFlag(db.Model):
+    """One-time setup steps, claimed by inserting their name."""
+    __tablename__ = 'bootstrap_flags'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class ParkingLocation(db.Model):
     __tablename__ = 'parking_locations'
     
@@ -40,10 +51,12 @@ class ParkingLocation(db.Model):
     price_per_hour = db.Column(db.Integer, nullable=False)  # Stored in cents
     image_url = db.Column(db.String(255))
     facilities = db.Column(db.Text)  # Stored as comma-separated values
+    grid_cell = db.Column(db.Integer, index=True)  # See app.spatial.grid_cell
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     slots = db.relationship('ParkingSlot', backref='location', lazy='dynamic')
     
-    def to_dict(self, include_slots=False):
+    def to_dict(self, include_slots=False, slots=None):
         data = {
             'id': self.id,
             'name': self.name,
@@ -52,16 +65,31 @@ class ParkingLocation(db.Model):
             'longitude': self.longitude,
             'pricePerHour': self.price_per_hour,
             'imageUrl': self.image_url,
-            'facilities': self.facilities.split(',') if self.facilities else []
+            'facilities': self.facilities.split(',') if self.facilities else [],
+            'revision': self.revision
         }
         
         if include_slots:
-            data['slots'] = [slot.to_dict() for slot in self.slots]
-            data['availableSlots'] = sum(1 for slot in self.slots if slot.is_available)
-            data['totalSlots'] = self.slots.count()
+            # Load the slots once unless the caller already has them
+            if slots is None:
+                slots = self.slots.all()
+            data['slots'] = [slot.to_dict() for slot in slots]
+            data['availableSlots'] = sum(1 for slot in slots if slot.is_available)
+            data['totalSlots'] = len(slots)
             
         return data
 
+@db.event.listens_for(ParkingLocation, 'before_insert')
+@db.event.listens_for(ParkingLocation, 'before_update')
+def update_grid_cell(mapper, connection, location):
+    # Keep the spatial grid cell in sync with the coordinates
+    location.grid_cell = grid_cell(location.latitude, location.longitude)
+
+@db.event.listens_for(ParkingLocation, 'before_update')
+def bump_revision(mapper, connection, location):
+    # Part of the location's ETag, see app.routes.parking
+    location.revision = (location.revision or 0) + 1
+
 class ParkingSlot(db.Model):
     __tablename__ = 'parking_slots'
     
@@ -84,8 +112,77 @@ class ParkingSlot(db.Model):
             'lastUpdated': self.last_updated.isoformat()
         }
 
+class SlotRevision(db.Model):
+    """
+    Counts the committed transactions that wrote one of a location's slots,
+    for its ETags. Kept off parking_locations so slot writes never lock the
+    location row, and bumped when the transaction commits so its own lock is
+    only held briefly; see bump_slot_revisions_on_commit.
+    """
+    __tablename__ = 'slot_revisions'
+    
+    location_id = db.Column(db.Integer, db.ForeignKey('parking_locations.id'), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
+def mark_slot_revisions(session, location_ids):
+    """Bump the slot revision of each of location_ids when `session` commits."""
+    session.info.setdefault('slot_revision_locations', set()).update(location_ids)
+
+@db.event.listens_for(ParkingLocation, 'after_insert')
+def create_slot_revision(mapper, connection, location):
+    connection.execute(SlotRevision.__table__.insert().values(location_id=location.id, revision=0))
+
+@db.event.listens_for(ParkingLocation, 'before_delete')
+def delete_slot_revision(mapper, connection, location):
+    revisions = SlotRevision.__table__
+    connection.execute(revisions.delete().where(revisions.c.location_id == location.id))
+
+@db.event.listens_for(ParkingSlot, 'after_insert')
+@db.event.listens_for(ParkingSlot, 'after_update')
+@db.event.listens_for(ParkingSlot, 'after_delete')
+def mark_slot_revision(mapper, connection, slot):
+    # Slot writes through the ORM are marked as they flush; Core writes call
+    # app.availability.bump_slot_revisions
+    mark_slot_revisions(object_session(slot), [slot.location_id])
+
+@db.event.listens_for(db.session, 'before_commit')
+def bump_slot_revisions_on_commit(session):
+    # Flush first, so the ORM slot writes of this commit are marked
+    session.flush()
+    location_ids = session.info.pop('slot_revision_locations', None)
+    if not location_ids:
+        return
+    
+    revisions = SlotRevision.__table__
+    locations = ParkingLocation.__table__
+    # One row at a time in id order, so two commits cannot deadlock
+    for location_id in sorted(location_ids):
+        bumped = session.execute(
+            revisions.update()
+            .where(revisions.c.location_id == location_id)
+            .values(revision=revisions.c.revision + 1)
+        ).rowcount
+        if not bumped:
+            # Locations created before slot_revisions existed; skips deleted ones
+            session.execute(revisions.insert().from_select(
+                ['location_id', 'revision'],
+                db.select(locations.c.id, db.literal(1)).where(locations.c.id == location_id)
+            ))
+
+@db.event.listens_for(db.session, 'after_transaction_end')
+def forget_slot_revisions(session, transaction):
+    # Marks of a rolled back transaction die with it
+    if transaction.parent is None:
+        session.info.pop('slot_revision_locations', None)
+
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_bookings_status_created', 'status', 'created_at'),
+        db.Index('ix_bookings_status_end', 'status', 'end_date'),
+        db.Index('ix_bookings_slot_status_window', 'slot_id', 'status', 'start_date', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -107,21 +204,26 @@ class Booking(db.Model):
         location_name = self.location.name if self.location else None
         slot_number = self.parking_slot.slot_number if self.parking_slot else None
         
+        return Booking.serialize(self, location_name, slot_number)
+    
+    @staticmethod
+    def serialize(booking, location_name, slot_number):
+        # Works for Booking instances and for column rows with the same names
         return {
-            'id': self.id,
-            'userId': self.user_id,
-            'locationId': self.location_id,
+            'id': booking.id,
+            'userId': booking.user_id,
+            'locationId': booking.location_id,
             'locationName': location_name,
-            'slotId': self.slot_id,
+            'slotId': booking.slot_id,
             'slotNumber': slot_number,
-            'startDate': self.start_date.isoformat(),
-            'endDate': self.end_date.isoformat(),
-            'duration': self.duration,
-            'amount': self.amount,
-            'status': self.status,
-            'paymentStatus': self.payment_status,
-            'vehicleType': self.vehicle_type,
-            'createdAt': self.created_at.isoformat()
+            'startDate': booking.start_date.isoformat(),
+            'endDate': booking.end_date.isoformat(),
+            'duration': booking.duration,
+            'amount': booking.amount,
+            'status': booking.status,
+            'paymentStatus': booking.payment_status,
+            'vehicleType': booking.vehicle_type,
+            'createdAt': booking.created_at.isoformat()
         }
 
 class Payment(db.Model):
@@ -150,6 +252,10 @@ class Payment(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,199 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Notification, User
+from app.pagination import paginate
+
+class NotificationQueue:
+    """
+    Deferred notification writer. Notifications are queued in memory and a
+    background thread inserts them in bulk, so request latency does not
+    include notification writes. Queued rows are flushed on shutdown but are
+    lost if the process crashes.
+    """
+
+    def __init__(self, app=None):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_DEFERRED', True)
+        app.config.setdefault('NOTIFICATION_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('NOTIFICATION_BATCH_SIZE', 500)
+        app.config.setdefault('NOTIFICATION_RETENTION_DAYS', 90)
+        app.config.setdefault('NOTIFICATION_UNREAD_RETENTION_DAYS', 365)
+        app.config.setdefault('NOTIFICATION_PRUNE_BATCH_SIZE', 1000)
+
+        self.app = app
+        app.extensions['notification_queue'] = self
+        atexit.register(self.flush)
+
+    def push(self, user_id, title, message, type='info'):
+        self._queue.put({
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'type': type,
+            'is_read': False,
+            'created_at': datetime.utcnow()
+        })
+
+        if self.app.config['NOTIFICATION_DEFERRED']:
+            self._ensure_worker()
+        else:
+            self.flush()
+
+    def flush(self):
+        """Write every queued notification now."""
+        rows = self._drain()
+        while rows:
+            self._write(rows)
+            rows = self._drain()
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so start one per worker process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='notification-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _drain(self):
+        rows = []
+        try:
+            while len(rows) < self.app.config['NOTIFICATION_BATCH_SIZE']:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _run(self):
+        # Rows stay queued while the batch fills up, so a flush at exit
+        # still sees all of them
+        while True:
+            time.sleep(self.app.config['NOTIFICATION_FLUSH_INTERVAL'])
+            self.flush()
+
+    def _write(self, rows):
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(Notification), rows)
+                _adjust_unread(Counter(row['user_id'] for row in rows))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception("Failed to write %d notifications", len(rows))
+
+def notify(user_id, title, message, type='info'):
+    """Queue a notification for the current app."""
+    current_app.extensions['notification_queue'].push(user_id, title, message, type)
+
+def notification_feed(user_id, limit, after=None, unread_only=False):
+    """
+    Return one page of a user's notifications, newest first, and the cursor
+    of the next page.
+    """
+    query = Notification.query.filter_by(user_id=user_id)
+    if unread_only:
+        query = query.filter_by(is_read=False)
+    return paginate(query, Notification, limit, after)
+
+def unread_count(user_id):
+    """The user's unread notification count, for badges."""
+    return db.session.query(User.unread_notifications).filter_by(id=user_id).scalar() or 0
+
+def mark_read(user_id, ids=None):
+    """
+    Mark the user's notifications with the given ids, or all of them, as
+    read with one UPDATE and commit. Returns how many were unread.
+    """
+    query = db.update(Notification).where(
+        Notification.user_id == user_id,
+        Notification.is_read == False
+    )
+    if ids is not None:
+        if not ids:
+            return 0
+        query = query.where(Notification.id.in_(ids))
+
+    updated = db.session.execute(
+        query.values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        _adjust_unread({user_id: updated}, sign=-1)
+    db.session.commit()
+    return updated
+
+def prune_notifications(now=None, batch_size=None):
+    """
+    Delete read notifications older than NOTIFICATION_RETENTION_DAYS and
+    unread ones older than NOTIFICATION_UNREAD_RETENTION_DAYS, one batch per
+    transaction so the table is never locked for long. Returns the number
+    of rows deleted.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    batch_size = batch_size or config['NOTIFICATION_PRUNE_BATCH_SIZE']
+    expired = db.or_(
+        db.and_(Notification.is_read == True,
+                Notification.created_at < now - timedelta(days=config['NOTIFICATION_RETENTION_DAYS'])),
+        Notification.created_at < now - timedelta(days=config['NOTIFICATION_UNREAD_RETENTION_DAYS'])
+    )
+    deleted = 0
+
+    while True:
+        # Old rows have the lowest ids, so this scan stops early
+        ids = [notification_id for (notification_id,) in db.session.query(Notification.id)
+               .filter(expired).order_by(Notification.id).limit(batch_size)]
+        if not ids:
+            db.session.rollback()
+            break
+
+        rows = db.session.execute(
+            db.delete(Notification)
+            .where(Notification.id.in_(ids))
+            .returning(Notification.user_id, Notification.is_read)
+        ).all()
+        _adjust_unread(Counter(user_id for user_id, is_read in rows if not is_read), sign=-1)
+        db.session.commit()
+        deleted += len(rows)
+
+        if len(ids) < batch_size:
+            break
+
+    return deleted
+
+def recount_unread():
+    """Rebuild every user's unread counter from the notifications table."""
+    unread = db.select(db.func.count(Notification.id)).where(
+        Notification.user_id == User.id,
+        Notification.is_read == False
+    ).scalar_subquery()
+    db.session.execute(db.update(User).values(unread_notifications=unread))
+    db.session.commit()
+
+def _adjust_unread(deltas, sign=1):
+    # One executemany adding each {user_id: delta} to the users' counters
+    if not deltas:
+        return
+    users = User.__table__
+    db.session.execute(
+        users.update()
+        .where(users.c.id == db.bindparam('user_key'))
+        .values(unread_notifications=users.c.unread_notifications + db.bindparam('delta')),
+        [{'user_key': user_id, 'delta': sign * delta} for user_id, delta in deltas.items()]
+    )
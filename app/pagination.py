@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+from app import db
+
+def encode_cursor(created_at, id):
+    """Return an opaque cursor pointing just past the given row."""
+    payload = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, raising ValueError if invalid."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def page_args():
+    """
+    Read `limit` and `cursor` from the query string. The limit defaults to
+    DEFAULT_PAGE_SIZE and is capped at MAX_PAGE_SIZE.
+    """
+    limit = request.args.get('limit', current_app.config['DEFAULT_PAGE_SIZE'], type=int)
+    if limit < 1:
+        raise ValueError("Invalid limit")
+    limit = min(limit, current_app.config['MAX_PAGE_SIZE'])
+
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+def keyset(query, model, limit, after=None):
+    """
+    Order a Query or Select newest first by (created_at, id), starting after
+    the `after` cursor, with one extra row to detect a next page
+    """
+    if after is not None:
+        created_at, id = after
+        query = query.filter(db.or_(
+            model.created_at < created_at,
+            db.and_(model.created_at == created_at, model.id < id)
+        ))
+
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+def split_page(rows, limit):
+    """Return (rows, next_cursor) from the rows of a keyset query."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
+
+def paginate(query, model, limit, after=None):
+    """
+    Return one page of `query`, newest first, ordered by (created_at, id),
+    and the cursor of the next page (None on the last page)
+    """
+    return split_page(keyset(query, model, limit, after).all(), limit)
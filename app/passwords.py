@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class PasswordHasherBusy(Exception):
+    """Raised when PASSWORD_MAX_PENDING hashes are already queued."""
+
+class PasswordHasher:
+    """
+    Runs the deliberately slow password KDF in a pool of PASSWORD_WORKERS
+    processes, so a login burst cannot tie up every request thread on CPU.
+    Calls beyond PASSWORD_MAX_PENDING in flight are rejected at once with
+    PasswordHasherBusy. With PASSWORD_WORKERS = 0 hashing runs inline.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        app.config.setdefault('PASSWORD_MAX_PENDING', 32)
+        app.config.setdefault('PASSWORD_TIMEOUT', 10)  # Seconds
+
+        self.method = app.config['PASSWORD_METHOD']
+        self.workers = app.config['PASSWORD_WORKERS']
+        self.max_pending = app.config['PASSWORD_MAX_PENDING']
+        self.timeout = app.config['PASSWORD_TIMEOUT']
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if a hash was made with other cost parameters than PASSWORD_METHOD."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+
+        try:
+            future = self._pool().submit(func, *args)
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drop the hash if no worker has picked it up yet
+            future.cancel()
+            raise PasswordHasherBusy()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self._executor = None
+            raise PasswordHasherBusy()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _pool(self):
+        # Pools do not survive a fork, so start one per worker process
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=_mp_context())
+        return self._executor
+
+def _mp_context():
+    # A fork server that only preloads werkzeug keeps the app out of the workers
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['werkzeug.security'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def password_hasher():
+    return current_app.extensions['password_hasher']
+
+def hash_password(password):
+    """Hash with the app's pool when there is one, inline otherwise."""
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return password_hasher().hash(password)
+    return generate_password_hash(password)
+
+def verify_password(password_hash, password):
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return password_hasher().verify(password_hash, password)
+    return check_password_hash(password_hash, password)
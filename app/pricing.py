@@ -0,0 +1,69 @@
+import threading
+from app.availability import VEHICLE_TYPES
+
+# Booking durations constants
+BOOKING_DURATIONS = {
+    'THIRTY_MIN': 30,
+    'ONE_HOUR': 60,
+    'TWO_HOURS': 120
+}
+
+# Share of the hourly price paid per vehicle type, as (numerator, denominator)
+VEHICLE_RATES = {
+    'two-wheeler': (3, 5),  # 60% of the price for two-wheelers
+    'four-wheeler': (1, 1)
+}
+
+def hourly_price(price_per_hour, vehicle_type):
+    """Hourly price in cents for a vehicle type."""
+    numerator, denominator = VEHICLE_RATES[vehicle_type]
+    return price_per_hour * numerator // denominator
+
+def quote(price_per_hour, vehicle_type, duration):
+    """Price in cents of `duration` minutes, using integer arithmetic."""
+    return hourly_price(price_per_hour, vehicle_type) * duration // 60
+
+class QuoteTables:
+    """
+    Per-location tables of quotes for every vehicle type and standard
+    duration: {vehicle_type: {minutes: cents}}. A table is rebuilt when it
+    is invalidated or the location's price no longer matches.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, location):
+        """Return the quote table of a location dict."""
+        entry = self._tables.get(location['id'])
+        if entry is not None and entry[0] == location['pricePerHour']:
+            return entry[1]
+
+        table = {
+            vehicle_type: {
+                minutes: quote(location['pricePerHour'], vehicle_type, minutes)
+                for minutes in BOOKING_DURATIONS.values()
+            }
+            for vehicle_type in VEHICLE_TYPES
+        }
+        with self._lock:
+            self._tables[location['id']] = (location['pricePerHour'], table)
+        return table
+
+    def get_many(self, locations):
+        """Return {location_id: table} for many location dicts."""
+        return {location['id']: self.get(location) for location in locations}
+
+    def quote(self, location, vehicle_type, duration):
+        """Quote from the table when the duration is standard."""
+        table = self.get(location)[vehicle_type]
+        if duration in table:
+            return table[duration]
+        return quote(location['pricePerHour'], vehicle_type, duration)
+
+    def invalidate(self, location_id):
+        with self._lock:
+            self._tables.pop(location_id, None)
+
+quote_tables = QuoteTables()
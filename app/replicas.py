@@ -0,0 +1,120 @@
+import random
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Requests served from a replica
+READ_METHODS = ('GET', 'HEAD')
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of a replica-routed request (see
+    ReplicaRouter) to that request's replica bind. Writes, flushes and
+    SELECT ... FOR UPDATE always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('replica_bind') if has_app_context() else None
+        if bind is None and replica is not None:
+            if (self._flushing or isinstance(clause, UpdateBase)
+                    or getattr(clause, '_for_update_arg', None) is not None):
+                g.wrote_primary = True
+            else:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads made inside the block to the primary. Caches shared by
+    every client are filled this way, so a lagging replica cannot put data
+    older than an invalidation back into them.
+    """
+    replica = g.get('replica_bind') if has_app_context() else None
+    if replica is None:
+        yield
+        return
+
+    g.replica_bind = None
+    try:
+        yield
+    finally:
+        g.replica_bind = replica
+
+class ReplicaRouter:
+    """
+    Serves GET and HEAD requests from the read replicas in
+    SQLALCHEMY_REPLICA_URIS. A client that wrote to the primary in the last
+    REPLICA_STALENESS seconds keeps reading from the primary so it sees its
+    own writes; replicas are expected to lag by no more than that.
+
+    Clients are recognized by the session cookie and, for bearer tokens, by
+    the token's user. User pins are kept per process unless
+    REPLICA_PIN_BACKEND is 'redis', so with several workers and bearer
+    tokens use 'redis'.
+    Must be initialized before db.init_app, which creates the replica binds.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        app.config.setdefault('REPLICA_STALENESS', 5)
+        app.config.setdefault('REPLICA_PIN_BACKEND', 'local')
+        app.config.setdefault('REPLICA_PIN_URL', None)
+
+        self.binds = []
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for i, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+            key = f'replica_{i}'
+            binds[key] = uri
+            self.binds.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+        self.app = app
+        app.extensions['replica_router'] = self
+        if self.binds:
+            from app.cache import LocalCache, RedisCache
+
+            # Pins expire with the staleness window
+            staleness = app.config['REPLICA_STALENESS']
+            if app.config['REPLICA_PIN_BACKEND'] == 'redis':
+                self.pins = RedisCache(app.config['REPLICA_PIN_URL'], staleness, prefix='findmyslot:pin:')
+            else:
+                self.pins = LocalCache(100000, staleness)
+
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def _before_request(self):
+        from app.tokens import current_claims
+
+        g.replica_bind = None
+        if request.method not in READ_METHODS:
+            return
+
+        last_write = session.get('last_write')
+        if last_write is not None and time.time() - last_write < self.app.config['REPLICA_STALENESS']:
+            return
+
+        # Bearer clients have no cookie, so they are pinned by user
+        # Without renewal, so no user is loaded here (and no event loop blocked under ASGI)
+        claims = current_claims(renew=False)
+        if claims is not None and self.pins.get(f"user:{claims['sub']}") is not None:
+            return
+
+        g.replica_bind = random.choice(self.binds)
+
+    def _after_request(self, response):
+        # Pin the client to the primary for the staleness window after a write
+        wrote = request.method not in READ_METHODS or g.get('wrote_primary')
+        if wrote and response.status_code < 400:
+            session['last_write'] = time.time()
+            claims = g.get('claims')
+            if claims is not None:
+                self.pins.set(f"user:{claims['sub']}", True)
+        return response
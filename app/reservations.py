@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+from app import db
+from app.availability import bump_slot_revisions
+from app.models import Booking, ParkingSlot
+
+# How many free slots to try before giving up on auto-assignment
+MAX_CLAIM_ATTEMPTS = 5
+
+# Bookings in these states hold their slot for their whole time window
+OPEN_STATUSES = ['pending', 'active']
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp into a naive UTC datetime, raising
+    ValueError if it is invalid
+    """
+    if not isinstance(value, str):
+        raise ValueError("Timestamp must be a string")
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def claim_slot(slot_id):
+    """
+    Atomically mark a slot as taken. Returns True if this call claimed it,
+    False if it was already taken. The change is part of the current
+    transaction and is released again on rollback.
+    """
+    claimed = ParkingSlot.query.filter(
+        ParkingSlot.id == slot_id,
+        ParkingSlot.is_available == True
+    ).update({
+        ParkingSlot.is_available: False,
+        ParkingSlot.last_updated: datetime.utcnow()
+    })
+
+    if claimed == 1:
+        bump_slot_revisions([slot_id])
+        return True
+    return False
+
+def lock_slot(slot_id):
+    """
+    Take the slot row's write lock for the rest of the transaction, so
+    overlapping reservations of the same slot are checked one at a time
+    """
+    ParkingSlot.query.filter(ParkingSlot.id == slot_id).update(
+        {ParkingSlot.id: ParkingSlot.id}, synchronize_session=False
+    )
+
+def has_overlap(slot_id, start, end):
+    """
+    Return True if an open booking of the slot overlaps [start, end).
+
+    Open bookings of a slot never overlap each other, so an overlapping
+    booking either starts inside the window or is the last one starting
+    before it. Both are seeks on (slot_id, status, start_date), which only
+    visit the slot's open bookings, so closed ones do not slow the check.
+    """
+    starts_inside = db.select(Booking.id).where(
+        Booking.slot_id == slot_id,
+        Booking.status.in_(OPEN_STATUSES),
+        Booking.start_date >= start,
+        Booking.start_date < end
+    ).exists()
+
+    previous_end = db.select(Booking.end_date).where(
+        Booking.slot_id == slot_id,
+        Booking.status.in_(OPEN_STATUSES),
+        Booking.start_date < start
+    ).order_by(Booking.start_date.desc()).limit(1).scalar_subquery()
+
+    # One round trip; a missing previous booking compares as NULL
+    return bool(db.session.execute(db.select(db.or_(starts_inside, previous_end > start))).scalar())
+
+def free_slots(location_id, vehicle_type, start, end, now=None, exclude=()):
+    """
+    Return the ids of slots at a location that are free for the whole of
+    [start, end). Windows starting now also need the slot to be available
+    right now.
+    """
+    now = now or datetime.utcnow()
+
+    starts_inside = db.session.query(Booking.id).filter(
+        Booking.slot_id == ParkingSlot.id,
+        Booking.status.in_(OPEN_STATUSES),
+        Booking.start_date >= start,
+        Booking.start_date < end
+    ).exists()
+
+    previous_end = db.session.query(Booking.end_date).filter(
+        Booking.slot_id == ParkingSlot.id,
+        Booking.status.in_(OPEN_STATUSES),
+        Booking.start_date < start
+    ).order_by(Booking.start_date.desc()).limit(1).scalar_subquery()
+
+    query = db.session.query(ParkingSlot.id).filter(
+        ParkingSlot.location_id == location_id,
+        ParkingSlot.vehicle_type == vehicle_type,
+        ~starts_inside,
+        db.or_(previous_end.is_(None), previous_end <= start)
+    )
+    if start <= now:
+        query = query.filter(ParkingSlot.is_available == True)
+    if exclude:
+        query = query.filter(ParkingSlot.id.notin_(exclude))
+
+    return [slot_id for (slot_id,) in query.order_by(ParkingSlot.id)]
+
+def reserve_slot(slot_id, start, end, now=None):
+    """
+    Reserve a slot for [start, end) in the current transaction. Bookings
+    starting now also claim the slot's is_available flag. Returns False if
+    the slot is taken for any part of the window.
+    """
+    now = now or datetime.utcnow()
+
+    lock_slot(slot_id)
+    if has_overlap(slot_id, start, end):
+        return False
+
+    if start <= now:
+        return claim_slot(slot_id)
+    return True
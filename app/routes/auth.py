@@ -1,16 +1,37 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, request, jsonify, session
 from werkzeug.security import generate_password_hash, check_password_hash
-from app.models import User
+from app.models import User, BootstrapFlag
+from sqlalchemy.exc import IntegrityError
 from app import db
+from app.tokens import claims_user, current_claims, request_token, token_auth
+from app.passwords import PasswordHasherBusy, password_hasher
 from functools import wraps
+import asyncio
+import hmac
+import inspect
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    # Shed login/register load instead of queueing behind the KDF
+    return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
 # Authentication decorator
 def login_required(f):
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def async_function(*args, **kwargs):
+            # Renewing an expired session token loads the user, so that
+            # step runs in a thread instead of on the event loop
+            if current_claims(renew=False) is None and await asyncio.to_thread(current_claims) is None:
+                return jsonify({"message": "Unauthorized"}), 401
+            return await f(*args, **kwargs)
+        return async_function
+    
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_claims() is None:
             return jsonify({"message": "Unauthorized"}), 401
         return f(*args, **kwargs)
     return decorated_function
@@ -18,16 +39,52 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        claims = current_claims()
+        if claims is None:
             return jsonify({"message": "Unauthorized"}), 401
         
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_admin:
+        # The role comes from the token, so no user lookup is needed
+        if not claims['admin']:
             return jsonify({"message": "Admin privileges required"}), 403
         
         return f(*args, **kwargs)
     return decorated_function
 
+def sensor_required(f):
+    # Accepts the X-Sensor-Key header when SENSOR_API_KEY is set, or an admin session
+    admin_view = admin_required(f)
+    
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = current_app.config.get('SENSOR_API_KEY')
+        if key and hmac.compare_digest(request.headers.get('X-Sensor-Key', ''), key):
+            return f(*args, **kwargs)
+        return admin_view(*args, **kwargs)
+    return decorated_function
+
+def _claim_first_admin():
+    # Claims the 'first_admin' flag if no user exists yet. The flag's primary
+    # key lets only one registration win, and once it is known to be taken
+    # this process skips the claim entirely. The flag is written in the same
+    # transaction as the user, so a rejected registration gives it up again.
+    if current_app.extensions.get('admin_bootstrapped'):
+        return False
+    
+    claim = db.insert(BootstrapFlag).from_select(
+        ['name', 'created_at'],
+        db.select(db.literal('first_admin'), db.func.now()).where(~db.exists(db.select(User.id)))
+    )
+    try:
+        claimed = db.session.execute(claim).rowcount == 1
+    except IntegrityError:
+        # Nothing else has been written yet, so the whole transaction can go
+        db.session.rollback()
+        claimed = False
+    
+    if not claimed:
+        current_app.extensions['admin_bootstrapped'] = True
+    return claimed
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.json
@@ -36,13 +93,6 @@ def register():
     if not data or not data.get('email') or not data.get('username') or not data.get('password'):
         return jsonify({"message": "Missing required fields"}), 400
     
-    # Check if email or username already exists
-    if User.query.filter_by(email=data['email']).first():
-        return jsonify({"message": "Email already registered"}), 400
-    
-    if User.query.filter_by(username=data['username']).first():
-        return jsonify({"message": "Username already taken"}), 400
-    
     # Create new user
     user = User(
         email=data['email'],
@@ -51,18 +101,35 @@ def register():
     user.set_password(data['password'])
     
     # Set as admin if it's the first user
-    if User.query.count() == 0:
-        user.is_admin = True
+    user.is_admin = _claim_first_admin()
     
+    # The unique indexes on email and username reject duplicates
     db.session.add(user)
+    try:
+        db.session.flush()
+    except IntegrityError as e:
+        db.session.rollback()
+        if 'email' in str(e.orig):
+            return jsonify({"message": "Email already registered"}), 400
+        if 'username' in str(e.orig):
+            return jsonify({"message": "Username already taken"}), 400
+        raise
+    
+    # Serialize before the commit expires the row
+    user_data = user.to_dict()
+    token = token_auth().issue(user)
     db.session.commit()
     
+    if user_data['isAdmin']:
+        current_app.extensions['admin_bootstrapped'] = True
+    
     # Set session
-    session['user_id'] = user.id
+    session['token'] = token
     
     return jsonify({
         "message": "Registration successful",
-        "user": user.to_dict()
+        "user": user_data,
+        "token": token
     }), 201
 
 @auth_bp.route('/login', methods=['POST'])
@@ -80,25 +147,43 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({"message": "Invalid email or password"}), 401
     
+    # Upgrade hashes made with older cost parameters
+    if password_hasher().needs_rehash(user.password_hash):
+        user.set_password(data['password'])
+        db.session.commit()
+    
     # Set session
-    session['user_id'] = user.id
+    token = token_auth().issue(user)
+    session['token'] = token
     
     return jsonify({
         "message": "Login successful",
-        "user": user.to_dict()
+        "user": user.to_dict(),
+        "token": token
     }), 200
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
-    session.pop('user_id', None)
+    claims = current_claims()
+    if claims is not None:
+        token_auth().revoke(claims)
+    session.pop('token', None)
     return jsonify({"message": "Logout successful"}), 200
 
+@auth_bp.route('/token', methods=['POST'])
+def refresh_token():
+    # Exchange a current or recently expired token for a new one
+    token = request_token()
+    new_token = token_auth().renew(token) if token else None
+    if not new_token:
+        return jsonify({"message": "Unauthorized"}), 401
+    
+    if token == session.get('token'):
+        session['token'] = new_token
+    
+    return jsonify({"token": new_token}), 200
+
 @auth_bp.route('/me', methods=['GET'])
 @login_required
 def get_current_user():
-    user = User.query.get(session['user_id'])
-    if not user:
-        session.pop('user_id', None)
-        return jsonify({"message": "User not found"}), 404
-    
-    return jsonify({"user": user.to_dict()}), 200
\ No newline at end of file
+    return jsonify({"user": claims_user(current_claims())}), 200
\ No newline at end of file
@@ -1,23 +1,82 @@
-from flask import Blueprint, request, jsonify, session
-from app.models import Booking, ParkingLocation, ParkingSlot, Payment, Notification
+from flask import Blueprint, current_app, request, jsonify
+from app.models import User, Booking, ParkingLocation, ParkingSlot, Payment
 from app import db
+from app.notifications import notify
+from app.cache import get_location_or_404
+from app.events import publish_slot_change
+from app.pagination import page_args, paginate
+from app.serializers import booking_query, serialize_bookings
+from app.pricing import BOOKING_DURATIONS, quote_tables
+from app.reservations import OPEN_STATUSES, parse_timestamp, reserve_slot
+from app.allocator import POLICIES, slot_allocator
+from app.distance import location_index
+from app.spatial import valid_coordinates
 from app.routes.auth import login_required, admin_required
+from app.tokens import current_claims, current_user_id
 from datetime import datetime, timedelta
+import math
 
 bookings_bp = Blueprint('bookings', __name__)
 
-# Booking durations constants
-BOOKING_DURATIONS = {
-    'THIRTY_MIN': 30,
-    'ONE_HOUR': 60,
-    'TWO_HOURS': 120
-}
+# Statuses listed by /history
+HISTORY_STATUSES = ['completed', 'cancelled']
+
+def _booking_window(data, now):
+    # Returns (start_date, end_date, error response) for a booking request
+    duration = data['duration']
+    if not isinstance(duration, int) or isinstance(duration, bool) or duration <= 0:
+        return None, None, (jsonify({"message": "Invalid duration"}), 400)
+    
+    # Start now unless a later start is given
+    start_date = now
+    if data.get('startDate'):
+        try:
+            start_date = parse_timestamp(data['startDate'])
+        except (TypeError, ValueError):
+            return None, None, (jsonify({"message": "Invalid startDate"}), 400)
+        if start_date < now - timedelta(minutes=5):
+            return None, None, (jsonify({"message": "startDate is in the past"}), 400)
+        start_date = max(start_date, now)
+    
+    return start_date, start_date + timedelta(minutes=duration), None
+
+def _save_booking(user_id, location, slot, vehicle_type, start_date, end_date):
+    # Create the booking for a reserved slot, commit and fan out side effects
+    duration = int((end_date - start_date).total_seconds() // 60)
+    
+    booking = Booking(
+        user_id=user_id,
+        location_id=location['id'],
+        slot_id=slot.id,
+        start_date=start_date,
+        end_date=end_date,
+        duration=duration,
+        amount=quote_tables.quote(location, vehicle_type, duration),
+        vehicle_type=vehicle_type
+    )
+    
+    db.session.add(booking)
+    db.session.commit()
+    publish_slot_change(slot)
+    
+    # Queue notification
+    notify(
+        user_id=user_id,
+        title="New Booking Created",
+        message=f"Your parking booking at {location['name']} has been created successfully.",
+        type="success"
+    )
+    
+    return jsonify({
+        "message": "Booking created successfully",
+        "booking": booking.to_dict()
+    }), 201
 
 @bookings_bp.route('', methods=['POST'])
 @login_required
 def create_booking():
     data = request.json
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Basic validation
     required_fields = ['locationId', 'slotId', 'duration']
@@ -26,117 +85,138 @@ def create_booking():
             return jsonify({"message": f"Missing required field: {field}"}), 400
     
     # Verify location and slot exist
-    location = ParkingLocation.query.get_or_404(data['locationId'])
+    location = get_location_or_404(data['locationId'])
     slot = ParkingSlot.query.get_or_404(data['slotId'])
     
-    # Check if slot is available
-    if not slot.is_available:
-        return jsonify({"message": "Selected slot is not available"}), 400
-    
     # Check if slot belongs to location
-    if slot.location_id != location.id:
+    if slot.location_id != location['id']:
         return jsonify({"message": "Slot does not belong to specified location"}), 400
     
     # Check if vehicle type is valid
     vehicle_type = data.get('vehicleType', 'four-wheeler')
     if vehicle_type not in ['two-wheeler', 'four-wheeler']:
         return jsonify({"message": "Invalid vehicle type"}), 400
-        
-    # Calculate booking details
-    duration = data['duration']
-    start_date = datetime.utcnow()
-    end_date = start_date + timedelta(minutes=duration)
-    
-    # Calculate amount
-    price_per_hour = location.price_per_hour
-    if vehicle_type == 'two-wheeler':
-        price_per_hour = int(price_per_hour * 0.6)  # 60% of the price for two-wheelers
     
-    amount = int(price_per_hour * (duration / 60))
-    
-    # Create booking
-    booking = Booking(
-        user_id=user_id,
-        location_id=location.id,
-        slot_id=slot.id,
-        start_date=start_date,
-        end_date=end_date,
-        duration=duration,
-        amount=amount,
-        vehicle_type=vehicle_type
-    )
-    
-    # Update slot availability
-    slot.is_available = False
-    slot.last_updated = datetime.utcnow()
+    now = datetime.utcnow()
+    start_date, end_date, error = _booking_window(data, now)
+    if error:
+        return error
+    
+    # Reserve the slot, or another free one of the same type if requested
+    if not reserve_slot(slot.id, start_date, end_date, now):
+        slot_id = None
+        if data.get('autoAssign'):
+            slot_id = slot_allocator().allocate(
+                location['id'], slot.vehicle_type, start_date, end_date, now, exclude=[slot.id]
+            )
+        
+        if slot_id is None:
+            db.session.rollback()
+            return jsonify({"message": "Selected slot is not available"}), 409
+        
+        slot = ParkingSlot.query.get(slot_id)
     
-    db.session.add(booking)
-    db.session.commit()
+    return _save_booking(user_id, location, slot, vehicle_type, start_date, end_date)
+
+@bookings_bp.route('/auto', methods=['POST'])
+@login_required
+def create_booking_auto():
+    """
+    Book the best free slot at `locationId`, or at the nearest location
+    within `radius` km of `lat`/`lng`, without picking a slot first
+    """
+    data = request.json or {}
+    user_id = current_user_id()
     
-    # Create notification
-    notification = Notification(
-        user_id=user_id,
-        title="New Booking Created",
-        message=f"Your parking booking at {location.name} has been created successfully.",
-        type="success"
-    )
+    if 'duration' not in data:
+        return jsonify({"message": "Missing required field: duration"}), 400
     
-    db.session.add(notification)
-    db.session.commit()
+    vehicle_type = data.get('vehicleType', 'four-wheeler')
+    if vehicle_type not in ['two-wheeler', 'four-wheeler']:
+        return jsonify({"message": "Invalid vehicle type"}), 400
     
-    return jsonify({
-        "message": "Booking created successfully",
-        "booking": booking.to_dict()
-    }), 201
+    policy = data.get('policy', 'nearest-entrance')
+    if policy not in POLICIES:
+        return jsonify({"message": "Invalid policy"}), 400
+    
+    now = datetime.utcnow()
+    start_date, end_date, error = _booking_window(data, now)
+    if error:
+        return error
+    
+    # Candidate locations: the given one, or the nearest ones first
+    if 'locationId' in data:
+        location_ids = [get_location_or_404(data['locationId'])['id']]
+    else:
+        try:
+            lat = float(data['lat'])
+            lng = float(data['lng'])
+            radius = float(data.get('radius', 5))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"message": "Missing locationId or coordinates"}), 400
+        if not (valid_coordinates(lat, lng) and math.isfinite(radius) and radius >= 0):
+            return jsonify({"message": "Invalid coordinates"}), 400
+        nearest = location_index.nearest(lat, lng, radius, current_app.config['AUTO_BOOKING_MAX_LOCATIONS'])
+        location_ids = [location_id for location_id, _ in nearest]
+    
+    for location_id in location_ids:
+        slot_id = slot_allocator().allocate(location_id, vehicle_type, start_date, end_date, now, policy)
+        if slot_id is not None:
+            location = get_location_or_404(location_id)
+            return _save_booking(user_id, location, ParkingSlot.query.get(slot_id),
+                                 vehicle_type, start_date, end_date)
+    
+    db.session.rollback()
+    return jsonify({"message": "No slot available"}), 409
 
 @bookings_bp.route('/active', methods=['GET'])
 @login_required
 def get_active_booking():
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Get the most recent active booking
-    booking = Booking.query.filter_by(
-        user_id=user_id, 
-        status='active'
+    booking = booking_query().filter(
+        Booking.user_id == user_id,
+        Booking.status == 'active'
     ).order_by(Booking.created_at.desc()).first()
     
     if not booking:
         return jsonify({"booking": None}), 200
     
-    return jsonify({"booking": booking.to_dict()}), 200
+    return jsonify({"booking": serialize_bookings([booking])[0]}), 200
 
 @bookings_bp.route('/history', methods=['GET'])
 @login_required
 def get_booking_history():
-    user_id = session['user_id']
+    user_id = current_user_id()
     
-    # Get all completed/cancelled bookings for the user
-    bookings = Booking.query.filter(
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    # Get a page of completed/cancelled bookings for the user
+    query = booking_query().filter(
         Booking.user_id == user_id,
-        Booking.status.in_(['completed', 'cancelled'])
-    ).order_by(Booking.created_at.desc()).all()
+        Booking.status.in_(HISTORY_STATUSES)
+    )
+    bookings, next_cursor = paginate(query, Booking, limit, after)
     
     return jsonify({
-        "bookings": [booking.to_dict() for booking in bookings]
+        "bookings": serialize_bookings(bookings),
+        "nextCursor": next_cursor
     }), 200
 
 @bookings_bp.route('/<int:booking_id>', methods=['GET'])
 @login_required
 def get_booking(booking_id):
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Find booking
     booking = Booking.query.get_or_404(booking_id)
     
     # Check if booking belongs to user or user is admin
-    user_is_admin = db.session.query(db.exists().where(
-        db.and_(
-            db.session.query.user.id == user_id,
-            db.session.query.user.is_admin == True
-        )
-    )).scalar()
-    
-    if booking.user_id != user_id and not user_is_admin:
+    if booking.user_id != user_id and not current_claims()['admin']:
         return jsonify({"message": "Unauthorized access to booking"}), 403
     
     return jsonify({"booking": booking.to_dict()}), 200
@@ -144,7 +224,7 @@ def get_booking(booking_id):
 @bookings_bp.route('/<int:booking_id>/status', methods=['PUT'])
 @login_required
 def update_booking_status(booking_id):
-    user_id = session['user_id']
+    user_id = current_user_id()
     data = request.json
     
     # Validate request
@@ -159,39 +239,45 @@ def update_booking_status(booking_id):
     booking = Booking.query.get_or_404(booking_id)
     
     # Check if booking belongs to user or user is admin
-    user_is_admin = db.session.query(db.exists().where(
-        db.and_(
-            db.session.query.user.id == user_id,
-            db.session.query.user.is_admin == True
-        )
-    )).scalar()
-    
-    if booking.user_id != user_id and not user_is_admin:
+    if booking.user_id != user_id and not current_claims()['admin']:
         return jsonify({"message": "Unauthorized access to booking"}), 403
     
-    # Update status
-    booking.status = new_status
-    
-    # Free up slot if booking is completed or cancelled
-    if new_status in ['completed', 'cancelled']:
+    # Reopening would skip the overlap check that keeps open bookings apart
+    if new_status in OPEN_STATUSES and booking.status not in OPEN_STATUSES:
+        return jsonify({"message": f"A {booking.status} booking cannot be reopened"}), 400
+    
+    # Only an open booking changes status. Checking that in the UPDATE, as
+    # expiry does, means a booking closed since it was read is left alone.
+    updated = db.session.execute(
+        db.update(Booking)
+        .where(Booking.id == booking_id, Booking.status.in_(OPEN_STATUSES))
+        .values(status=new_status)
+    ).rowcount
+    if not updated:
+        db.session.rollback()
+        return jsonify({"message": f"A {booking.status} booking cannot be changed"}), 400
+    
+    # Free up the slot if a booking that has started is completed or
+    # cancelled. A closed booking no longer holds it, someone else may.
+    slot = None
+    if new_status in ['completed', 'cancelled'] and booking.start_date <= datetime.utcnow():
         slot = ParkingSlot.query.get(booking.slot_id)
         if slot:
             slot.is_available = True
             slot.last_updated = datetime.utcnow()
     
     db.session.commit()
+    if slot:
+        publish_slot_change(slot)
     
-    # Create notification
-    notification = Notification(
+    # Queue notification
+    notify(
         user_id=booking.user_id,
         title=f"Booking {new_status.capitalize()}",
         message=f"Your parking booking has been {new_status}.",
         type="info"
     )
     
-    db.session.add(notification)
-    db.session.commit()
-    
     return jsonify({
         "message": f"Booking status updated to {new_status}",
         "booking": booking.to_dict()
@@ -202,13 +288,19 @@ def update_booking_status(booking_id):
 def get_all_bookings():
     status = request.args.get('status')
     
-    query = Booking.query
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    query = booking_query()
     
     if status:
-        query = query.filter_by(status=status)
+        query = query.filter(Booking.status == status)
     
-    bookings = query.order_by(Booking.created_at.desc()).all()
+    bookings, next_cursor = paginate(query, Booking, limit, after)
     
     return jsonify({
-        "bookings": [booking.to_dict() for booking in bookings]
+        "bookings": serialize_bookings(bookings),
+        "nextCursor": next_cursor
     }), 200
\ No newline at end of file
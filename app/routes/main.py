@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify, flash
+from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify, flash, abort
 from app.models import User, ParkingLocation, ParkingSlot, Booking, Notification, Payment
 from app import db
+from app.availability import count_slots
+from app.cache import location_cache, get_location_or_404
+from app.notifications import mark_read, notification_feed
+from app.pagination import page_args
+from app.pricing import quote_tables
 from app.routes.auth import login_required
+from app.tokens import claims_user, current_claims, current_user_id
 from datetime import datetime, timedelta
 import math
 import os
@@ -10,7 +16,7 @@ main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 def index():
-    if 'user_id' in session:
+    if current_claims() is not None:
         return redirect(url_for('main.map'))
     return redirect(url_for('auth.login'))
 
@@ -30,7 +36,7 @@ def map():
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Get user's active booking
     active_booking = Booking.query.filter_by(
@@ -55,32 +61,37 @@ def dashboard():
 @main_bp.route('/notifications')
 @login_required
 def notifications():
-    user_id = session['user_id']
+    user_id = current_user_id()
     
-    # Get user's notifications
-    notifications = Notification.query.filter_by(
-        user_id=user_id
-    ).order_by(Notification.created_at.desc()).all()
+    try:
+        limit, after = page_args()
+    except ValueError:
+        abort(400)
     
-    # Mark notifications as read
-    for notification in notifications:
-        if not notification.is_read:
-            notification.is_read = True
+    # Get a page of the user's notifications
+    notifications, next_cursor = notification_feed(user_id, limit, after)
     
-    db.session.commit()
+    # Mark the page as read with one UPDATE. The rows are detached first so
+    # the commit does not expire them and reload each one while rendering.
+    unread_ids = [notification.id for notification in notifications if not notification.is_read]
+    for notification in notifications:
+        db.session.expunge(notification)
+        notification.is_read = True
+    mark_read(user_id, unread_ids)
     
     return render_template(
         'main/notifications.html',
         active_tab='notifications',
         show_bottom_nav=True,
-        notifications=notifications
+        notifications=notifications,
+        next_cursor=next_cursor
     )
 
 @main_bp.route('/profile')
 @login_required
 def profile():
-    user_id = session['user_id']
-    user = User.query.get(user_id)
+    # Profile fields come from the token claims
+    user = claims_user(current_claims())
     
     return render_template(
         'main/profile.html',
@@ -92,37 +103,32 @@ def profile():
 @main_bp.route('/location/<int:location_id>')
 @login_required
 def location_details(location_id):
-    location = ParkingLocation.query.get_or_404(location_id)
+    location = get_location_or_404(location_id)
     
     # Get vehicle type from query param, default to four-wheeler
     vehicle_type = request.args.get('vehicle_type', 'four-wheeler')
     if vehicle_type not in ['two-wheeler', 'four-wheeler']:
         vehicle_type = 'four-wheeler'
     
-    # Get available slots for this location
-    slots = ParkingSlot.query.filter_by(
-        location_id=location_id,
-        is_available=True,
-        vehicle_type=vehicle_type
-    ).all()
+    # Count available slots for this location and vehicle type
+    counts = count_slots([location_id])[location_id]
+    available_slots = counts['byVehicleType'][vehicle_type]['availableSlots']
     
-    # Calculate price for different durations
-    price_per_hour = location.price_per_hour
-    if vehicle_type == 'two-wheeler':
-        price_per_hour = int(price_per_hour * 0.6)  # 60% of the price for two-wheelers
+    # Price for different durations
+    prices = quote_tables.get(location)[vehicle_type]
     
     durations = {
         '30_min': {
             'minutes': 30,
-            'price': int(price_per_hour * (30 / 60))
+            'price': prices[30]
         },
         '1_hour': {
             'minutes': 60,
-            'price': price_per_hour
+            'price': prices[60]
         },
         '2_hours': {
             'minutes': 120,
-            'price': price_per_hour * 2
+            'price': prices[120]
         }
     }
     
@@ -130,16 +136,15 @@ def location_details(location_id):
         'main/location_details.html',
         show_bottom_nav=False,
         location=location,
-        slots=slots,
         vehicle_type=vehicle_type,
         durations=durations,
-        available_slots=len(slots)
+        available_slots=available_slots
     )
 
 @main_bp.route('/booking/<int:booking_id>')
 @login_required
 def booking_details(booking_id):
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Find booking
     booking = Booking.query.get_or_404(booking_id)
@@ -164,7 +169,7 @@ def booking_details(booking_id):
 @main_bp.route('/payment/<int:booking_id>')
 @login_required
 def payment(booking_id):
-    user_id = session['user_id']
+    user_id = current_user_id()
     
     # Find booking
     booking = Booking.query.get_or_404(booking_id)
@@ -180,7 +185,7 @@ def payment(booking_id):
         return redirect(url_for('main.booking_details', booking_id=booking_id))
     
     # Get location
-    location = ParkingLocation.query.get(booking.location_id)
+    location = location_cache().get(booking.location_id)
     
     return render_template(
         'main/payment.html',
@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify
+from app.notifications import mark_read, notification_feed, unread_count
+from app.pagination import page_args
+from app.routes.auth import login_required
+from app.tokens import current_user_id
+
+notifications_bp = Blueprint('notifications', __name__)
+
+@notifications_bp.route('', methods=['GET'])
+@login_required
+def get_notifications():
+    user_id = current_user_id()
+    
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    unread_only = request.args.get('unread', '').lower() in ('1', 'true')
+    notifications, next_cursor = notification_feed(user_id, limit, after, unread_only)
+    
+    return jsonify({
+        "notifications": [notification.to_dict() for notification in notifications],
+        "nextCursor": next_cursor,
+        "unreadCount": unread_count(user_id)
+    }), 200
+
+@notifications_bp.route('/unread-count', methods=['GET'])
+@login_required
+def get_unread_count():
+    return jsonify({"unreadCount": unread_count(current_user_id())}), 200
+
+@notifications_bp.route('/read', methods=['POST'])
+@login_required
+def read_notifications():
+    user_id = current_user_id()
+    data = request.get_json(silent=True) or {}
+    
+    # Without ids every notification of the user is marked read
+    ids = data.get('ids')
+    if ids is not None and (
+        not isinstance(ids, list) or
+        not all(isinstance(id, int) and not isinstance(id, bool) for id in ids)
+    ):
+        return jsonify({"message": "ids must be a list of notification ids"}), 400
+    
+    updated = mark_read(user_id, ids)
+    
+    return jsonify({
+        "updated": updated,
+        "unreadCount": unread_count(user_id)
+    }), 200
@@ -1,88 +1,131 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from app.models import ParkingLocation, ParkingSlot
 from app import db
-from app.routes.auth import login_required, admin_required
+from app.routes.auth import login_required, admin_required, sensor_required
+from app.availability import count_slots, slot_revision, summarize_slots
+from app.distance import location_index
+from app.spatial import valid_coordinates
+from app.cache import location_cache, get_location_or_404
+from app.conditional import conditional_response, strong_etag
+from app.events import slot_events, publish_slot_change, publish_slot_changes
+from app.bulk import validate_slots, create_slots, update_slots, set_availability
+from app.pricing import quote_tables
+from app.reservations import parse_timestamp, free_slots
+from app.database import pool_stats
+from datetime import datetime
+import json
 import math
+from itertools import islice
 
 parking_bp = Blueprint('parking', __name__)
 
-# Helper function to calculate distance between two coordinates
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """
-    Calculate the distance between two points on the Earth's surface
-    using the Haversine formula
-    """
-    # Convert latitude and longitude from degrees to radians
-    lat1 = math.radians(lat1)
-    lon1 = math.radians(lon1)
-    lat2 = math.radians(lat2)
-    lon2 = math.radians(lon2)
-    
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Radius of Earth in kilometers
-    
-    return c * r
-
 @parking_bp.route('/locations', methods=['GET'])
 def get_all_locations():
-    locations = ParkingLocation.query.all()
-    return jsonify({
-        "locations": [location.to_dict() for location in locations]
-    }), 200
+    return conditional_response(location_cache().get_all_etag(), lambda: jsonify({
+        "locations": location_cache().get_all()
+    }))
 
 @parking_bp.route('/locations/<int:location_id>', methods=['GET'])
 def get_location(location_id):
-    location = ParkingLocation.query.get_or_404(location_id)
-    slots = ParkingSlot.query.filter_by(location_id=location_id).all()
+    location = get_location_or_404(location_id)
+    etag = location_etag(location, slot_revision(location_id))
     
-    location_data = location.to_dict(include_slots=True)
+    # Slots are only loaded when the client's copy is stale
+    return conditional_response(etag, lambda: location_response(
+        location, ParkingSlot.query.filter_by(location_id=location_id).all()
+    ))
+
+def location_etag(location, slot_revision):
+    # Changes with the location's revision and any of its slots
+    return strong_etag('location', location['id'], location.get('revision'), slot_revision)
+
+def location_response(location, slots):
+    # Location detail response from the cached location dict and its slots
+    counts = summarize_slots(slots)
+    slot_dicts = [slot.to_dict() for slot in slots]
+    location_data = dict(
+        location,
+        slots=slot_dicts,
+        availableSlots=counts['availableSlots'],
+        totalSlots=counts['totalSlots']
+    )
     
     return jsonify({
         "location": location_data,
-        "slots": [slot.to_dict() for slot in slots],
-        "availableSlots": sum(1 for slot in slots if slot.is_available),
-        "totalSlots": len(slots)
+        "slots": slot_dicts,
+        "availableSlots": counts['availableSlots'],
+        "totalSlots": counts['totalSlots'],
+        "slotsByVehicleType": counts['byVehicleType']
     }), 200
 
-@parking_bp.route('/nearby', methods=['GET'])
-def get_nearby_locations():
-    # Get parameters from query string
+def nearby_args(args):
+    # Returns (lat, lng, radius, limit, error message) from the query string
     try:
-        lat = float(request.args.get('lat', 0))
-        lng = float(request.args.get('lng', 0))
-        radius = float(request.args.get('radius', 5))  # default 5km radius
+        lat = float(args.get('lat', 0))
+        lng = float(args.get('lng', 0))
+        radius = float(args.get('radius', 5))  # default 5km radius
     except ValueError:
-        return jsonify({"message": "Invalid coordinates"}), 400
+        return None, None, None, None, "Invalid coordinates"
     
-    # Get all locations first
-    all_locations = ParkingLocation.query.all()
+    # float() accepts 'nan' and 'inf', which the grid cannot place
+    if not (valid_coordinates(lat, lng) and math.isfinite(radius) and radius >= 0):
+        return None, None, None, None, "Invalid coordinates"
     
-    # Filter and sort by distance
-    nearby_locations = []
-    for location in all_locations:
-        distance = calculate_distance(lat, lng, location.latitude, location.longitude)
-        if distance <= radius:
-            location_dict = location.to_dict()
-            
-            # Add distance and available slots info
-            location_dict['distance'] = round(distance, 2)
-            slots = ParkingSlot.query.filter_by(location_id=location.id).all()
-            location_dict['availableSlots'] = sum(1 for slot in slots if slot.is_available)
-            location_dict['totalSlots'] = len(slots)
-            
-            nearby_locations.append(location_dict)
-    
-    # Sort by distance
-    nearby_locations.sort(key=lambda x: x['distance'])
-    
-    return jsonify({
-        "locations": nearby_locations
+    limit = args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return None, None, None, None, "Invalid limit"
+    
+    return lat, lng, radius, limit, None
+
+@parking_bp.route('/nearby', methods=['GET'])
+def get_nearby_locations():
+    lat, lng, radius, limit, error = nearby_args(request.args)
+    if error:
+        return jsonify({"message": error}), 400
+    
+    # Nearest locations from the in-process coordinate index
+    nearest = location_index.nearest(lat, lng, radius, limit)
+    
+    locations = ParkingLocation.query.filter(
+        ParkingLocation.id.in_([location_id for location_id, _ in nearest])
+    ).all()
+    
+    # Slot counts for all results in one grouped query
+    counts = count_slots(location.id for location in locations)
+    
+    return jsonify({
+        "locations": build_nearby(nearest, locations, counts)
     }), 200
 
+def build_nearby(nearest, locations, counts):
+    """
+    Response items for /nearby from (location_id, distance) pairs, their
+    locations and count_slots results, nearest first
+    """
+    locations_by_id = {location.id: location for location in locations}
+    in_range = [
+        (distance, locations_by_id[location_id])
+        for location_id, distance in nearest
+        if location_id in locations_by_id
+    ]
+    
+    location_dicts = [location.to_dict() for _, location in in_range]
+    prices = quote_tables.get_many(location_dicts)
+    
+    nearby_locations = []
+    for (distance, location), location_dict in zip(in_range, location_dicts):
+        # Add distance, available slots and price info
+        location_dict['distance'] = round(distance, 2)
+        location_counts = counts[location.id]
+        location_dict['availableSlots'] = location_counts['availableSlots']
+        location_dict['totalSlots'] = location_counts['totalSlots']
+        location_dict['slotsByVehicleType'] = location_counts['byVehicleType']
+        location_dict['prices'] = prices[location.id]
+        
+        nearby_locations.append(location_dict)
+    
+    return nearby_locations
+
 @parking_bp.route('/locations', methods=['POST'])
 @admin_required
 def create_location():
@@ -107,6 +150,8 @@ def create_location():
     
     db.session.add(location)
     db.session.commit()
+    location_index.invalidate()
+    location_cache().invalidate()
     
     return jsonify({
         "message": "Location created successfully",
@@ -136,6 +181,10 @@ def update_location(location_id):
         location.facilities = ','.join(data['facilities'])
     
     db.session.commit()
+    location_index.invalidate()
+    location_cache().invalidate(location_id)
+    if 'pricePerHour' in data:
+        quote_tables.invalidate(location_id)
     
     return jsonify({
         "message": "Location updated successfully",
@@ -152,6 +201,9 @@ def delete_location(location_id):
     
     db.session.delete(location)
     db.session.commit()
+    location_index.invalidate()
+    location_cache().invalidate(location_id)
+    quote_tables.invalidate(location_id)
     
     return jsonify({
         "message": "Location deleted successfully"
@@ -160,15 +212,45 @@ def delete_location(location_id):
 @parking_bp.route('/locations/<int:location_id>/slots', methods=['GET'])
 def get_location_slots(location_id):
     # Verify location exists
-    ParkingLocation.query.get_or_404(location_id)
+    get_location_or_404(location_id)
+    etag = strong_etag('slots', location_id, slot_revision(location_id))
+    
+    def build():
+        # Get slots for this location
+        slots = ParkingSlot.query.filter_by(location_id=location_id).all()
+        
+        return jsonify({
+            "slots": [slot.to_dict() for slot in slots],
+            "availableSlots": sum(1 for slot in slots if slot.is_available),
+            "totalSlots": len(slots)
+        }), 200
+    
+    return conditional_response(etag, build)
+
+@parking_bp.route('/locations/<int:location_id>/availability', methods=['GET'])
+def get_location_availability(location_id):
+    # Verify location exists
+    get_location_or_404(location_id)
+    
+    vehicle_type = request.args.get('vehicleType', 'four-wheeler')
+    if vehicle_type not in ['two-wheeler', 'four-wheeler']:
+        return jsonify({"message": "Invalid vehicle type"}), 400
+    
+    try:
+        start = parse_timestamp(request.args['start'])
+        end = parse_timestamp(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({"message": "Missing or invalid start/end"}), 400
     
-    # Get slots for this location
-    slots = ParkingSlot.query.filter_by(location_id=location_id).all()
+    if end <= start:
+        return jsonify({"message": "end must be after start"}), 400
+    
+    # Slots free for the whole window
+    slot_ids = free_slots(location_id, vehicle_type, max(start, datetime.utcnow()), end)
     
     return jsonify({
-        "slots": [slot.to_dict() for slot in slots],
-        "availableSlots": sum(1 for slot in slots if slot.is_available),
-        "totalSlots": len(slots)
+        "slotIds": slot_ids,
+        "availableSlots": len(slot_ids)
     }), 200
 
 @parking_bp.route('/locations/<int:location_id>/slots', methods=['POST'])
@@ -193,12 +275,98 @@ def create_slot(location_id):
     
     db.session.add(slot)
     db.session.commit()
+    publish_slot_change(slot)
     
     return jsonify({
         "message": "Slot created successfully",
         "slot": slot.to_dict()
     }), 201
 
+def _bulk_rows(data, key='slots'):
+    # Pull the list of rows out of a bulk request body
+    rows = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return None, (jsonify({"message": f"Missing required field: {key}"}), 400)
+    if len(rows) > current_app.config['BULK_MAX_ROWS']:
+        return None, (jsonify({"message": f"At most {current_app.config['BULK_MAX_ROWS']} rows per request"}), 400)
+    return rows, None
+
+@parking_bp.route('/locations/<int:location_id>/slots/bulk', methods=['POST'])
+@admin_required
+def create_slots_bulk(location_id):
+    # Verify location exists
+    ParkingLocation.query.get_or_404(location_id)
+    
+    rows, error = _bulk_rows(request.json)
+    if error:
+        return error
+    
+    # Nothing is written unless every row is valid
+    errors = validate_slots(rows, require_number=True)
+    if errors:
+        return jsonify({"message": "Invalid slots", "errors": errors}), 400
+    
+    slot_ids = create_slots(location_id, rows)
+    db.session.commit()
+    
+    # New slots reach the allocator and stream subscribers like any other change
+    publish_slot_changes(slot_ids)
+    
+    return jsonify({
+        "message": f"{len(rows)} slots created successfully",
+        "created": len(rows)
+    }), 201
+
+@parking_bp.route('/slots/bulk', methods=['PUT'])
+@admin_required
+def update_slots_bulk():
+    rows, error = _bulk_rows(request.json)
+    if error:
+        return error
+    
+    errors = validate_slots(rows, require_id=True)
+    if not errors:
+        errors = [{"index": index, "message": "Slot not found"} for index in update_slots(rows)]
+    if errors:
+        db.session.rollback()
+        return jsonify({"message": "Invalid slots", "errors": errors}), 400
+    
+    db.session.commit()
+    publish_slot_changes(row['id'] for row in rows)
+    
+    return jsonify({
+        "message": f"{len(rows)} slots updated successfully",
+        "updated": len(rows)
+    }), 200
+
+@parking_bp.route('/slots/availability', methods=['PUT'])
+@admin_required
+def update_slot_availability_bulk():
+    """
+    Sensor feed mode: {"available": [slot ids], "occupied": [slot ids]}
+    """
+    data = request.json or {}
+    available = data.get('available', [])
+    occupied = data.get('occupied', [])
+    
+    # bool is an int subclass, so true is not a slot id
+    if not all(isinstance(ids, list) and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+               for ids in (available, occupied)):
+        return jsonify({"message": "available and occupied must be lists of slot ids"}), 400
+    if len(available) + len(occupied) > current_app.config['BULK_MAX_ROWS']:
+        return jsonify({"message": f"At most {current_app.config['BULK_MAX_ROWS']} rows per request"}), 400
+    if set(available) & set(occupied):
+        return jsonify({"message": "A slot cannot be both available and occupied"}), 400
+    
+    changed = set_availability(available, occupied)
+    db.session.commit()
+    publish_slot_changes(changed)
+    
+    return jsonify({
+        "message": "Slot availability updated successfully",
+        "changed": len(changed)
+    }), 200
+
 @parking_bp.route('/slots/<int:slot_id>', methods=['PUT'])
 @admin_required
 def update_slot(slot_id):
@@ -213,14 +381,66 @@ def update_slot(slot_id):
     if 'vehicleType' in data:
         slot.vehicle_type = data['vehicleType']
     
-    slot.last_updated = db.func.now()
+    slot.last_updated = datetime.utcnow()
     db.session.commit()
+    publish_slot_change(slot)
     
     return jsonify({
         "message": "Slot updated successfully",
         "slot": slot.to_dict()
     }), 200
 
+def stream_filters(args):
+    # Returns (location_ids, bbox, error message) for a slot event stream
+    try:
+        location_ids = [int(value) for value in args.get('locations', '').split(',') if value]
+        bbox = args.get('bbox')
+        if bbox is not None:
+            bbox = tuple(float(value) for value in bbox.split(','))
+            if (len(bbox) != 4 or not valid_coordinates(bbox[0], bbox[1])
+                    or not valid_coordinates(bbox[2], bbox[3])
+                    or bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+                raise ValueError
+    except ValueError:
+        return None, None, "Invalid locations or bbox"
+    
+    if not location_ids and bbox is None:
+        return None, None, "Missing locations or bbox"
+    
+    return location_ids, bbox, None
+
+@parking_bp.route('/slots/stream', methods=['GET'])
+def stream_slot_events():
+    """
+    Server-Sent Events stream of slot changes for the locations listed in
+    `locations` (comma-separated ids) and/or inside
+    `bbox` (minLat,minLng,maxLat,maxLng)
+    """
+    location_ids, bbox, error = stream_filters(request.args)
+    if error:
+        return jsonify({"message": error}), 400
+    
+    broker = slot_events()
+    subscription = broker.subscribe(location_ids, bbox)
+    keepalive = current_app.config['SLOT_EVENTS_KEEPALIVE']
+    
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=keepalive)
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: slot\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @parking_bp.route('/slots/<int:slot_id>', methods=['DELETE'])
 @admin_required
 def delete_slot(slot_id):
@@ -231,4 +451,71 @@ def delete_slot(slot_id):
     
     return jsonify({
         "message": "Slot deleted successfully"
-    }), 200
\ No newline at end of file
+    }), 200
+
+@parking_bp.route('/sensors/readings', methods=['POST'])
+@sensor_required
+def ingest_sensor_readings():
+    """
+    Accepts {"readings": [...]} or a newline-delimited JSON stream of
+    {"slotId": ..., "occupied": ..., "observedAt": ...} readings
+    """
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    if request.mimetype == 'application/x-ndjson':
+        # Stop reading one line past the limit
+        lines = (line for line in request.stream if line.strip())
+        try:
+            readings = [json.loads(line) for line in islice(lines, max_rows + 1)]
+        except ValueError:
+            return jsonify({"message": "Invalid JSON line"}), 400
+    else:
+        readings = (request.json or {}).get('readings')
+        if not isinstance(readings, list):
+            return jsonify({"message": "Missing required field: readings"}), 400
+    
+    if len(readings) > max_rows:
+        return jsonify({"message": f"At most {max_rows} rows per request"}), 400
+    
+    now = datetime.utcnow()
+    valid = []
+    errors = []
+    for index, reading in enumerate(readings):
+        try:
+            slot_id = reading['slotId']
+            occupied = reading['occupied']
+            observed_at = parse_timestamp(reading['observedAt']) if reading.get('observedAt') else now
+            # bool is an int subclass, so true is not a slot id
+            if not isinstance(slot_id, int) or isinstance(slot_id, bool) or not isinstance(occupied, bool):
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            errors.append({"index": index, "message": "Invalid reading"})
+            continue
+        valid.append((slot_id, occupied, observed_at))
+    
+    current_app.extensions['occupancy_ingestor'].report(valid)
+    
+    return jsonify({
+        "accepted": len(valid),
+        "errors": errors
+    }), 202
+
+@parking_bp.route('/sensors/stats', methods=['GET'])
+@admin_required
+def get_sensor_stats():
+    return jsonify({
+        "sensors": current_app.extensions['occupancy_ingestor'].stats()
+    }), 200
+
+@parking_bp.route('/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    return jsonify({
+        "locationCache": location_cache().stats()
+    }), 200
+
+@parking_bp.route('/db/stats', methods=['GET'])
+@admin_required
+def get_db_stats():
+    return jsonify({
+        "pools": pool_stats()
+    }), 200
@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from app import db
+from app.bulk import set_availability
+
+class OccupancyIngestor:
+    """
+    Coalesces bay sensor readings in memory, keeping only the latest state
+    per slot, and writes them every SENSOR_FLUSH_INTERVAL seconds with one
+    bulk UPDATE per direction
+    """
+
+    def __init__(self, app=None):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.received = 0
+        self.written = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SENSOR_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('SENSOR_API_KEY', None)
+
+        self.app = app
+        app.extensions['occupancy_ingestor'] = self
+
+    def report(self, readings):
+        """
+        Queue (slot_id, occupied, observed_at) readings. A reading older than
+        the one already pending for its slot is ignored.
+        """
+        with self._lock:
+            for slot_id, occupied, observed_at in readings:
+                self.received += 1
+                pending = self._pending.get(slot_id)
+                if pending is None or pending[1] <= observed_at:
+                    self._pending[slot_id] = (occupied, observed_at)
+
+        self._ensure_worker()
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write every pending reading now. Returns the ids of changed slots."""
+        from app.events import publish_slot_changes
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return []
+
+        available = [slot_id for slot_id, (occupied, _) in pending.items() if not occupied]
+        occupied = [slot_id for slot_id, (occupied, _) in pending.items() if occupied]
+
+        with self.app.app_context():
+            try:
+                changed = set_availability(available, occupied)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception("Failed to write %d sensor readings", len(pending))
+                self._requeue(pending)
+                return []
+
+            self.written += len(pending)
+            publish_slot_changes(changed)
+
+        return changed
+
+    def _requeue(self, readings):
+        # Retry failed readings on the next flush, unless a newer reading of
+        # the slot has arrived since
+        with self._lock:
+            for slot_id, (occupied, observed_at) in readings.items():
+                pending = self._pending.get(slot_id)
+                if pending is None or pending[1] < observed_at:
+                    self._pending[slot_id] = (occupied, observed_at)
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'written': self.written,
+            'pending': self.pending_count()
+        }
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so start one per worker process, and
+        # replace one that died
+        if self._worker_running():
+            return
+        with self._lock:
+            if not self._worker_running():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='occupancy-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _worker_running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config['SENSOR_FLUSH_INTERVAL'])
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception("Sensor flush failed")
+
+def fake_readings(slot_ids, flip_probability=0.1, seed=None):
+    """
+    Endless stream of sensor readings for load testing. Each slot starts
+    free and flips state with `flip_probability` per reading.
+    """
+    rng = random.Random(seed)
+    state = {slot_id: False for slot_id in slot_ids}
+
+    while True:
+        slot_id = rng.choice(slot_ids)
+        if rng.random() < flip_probability:
+            state[slot_id] = not state[slot_id]
+        yield {
+            'slotId': slot_id,
+            'occupied': state[slot_id],
+            'observedAt': datetime.utcnow().isoformat()
+        }
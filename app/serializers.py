@@ -0,0 +1,47 @@
+from app import db
+from app.models import Booking, ParkingLocation, ParkingSlot
+
+BOOKING_COLUMNS = (
+    Booking.id,
+    Booking.user_id,
+    Booking.location_id,
+    Booking.slot_id,
+    Booking.start_date,
+    Booking.end_date,
+    Booking.duration,
+    Booking.amount,
+    Booking.status,
+    Booking.payment_status,
+    Booking.vehicle_type,
+    Booking.created_at,
+)
+
+def _joined(query):
+    # Works for Query and Select alike
+    return query.select_from(Booking).outerjoin(
+        ParkingLocation, ParkingLocation.id == Booking.location_id
+    ).outerjoin(
+        ParkingSlot, ParkingSlot.id == Booking.slot_id
+    )
+
+def _booking_columns():
+    return (
+        *BOOKING_COLUMNS,
+        ParkingLocation.name.label('location_name'),
+        ParkingSlot.slot_number.label('slot_number')
+    )
+
+def booking_query():
+    """
+    Query the columns Booking.to_dict needs, joined with the location name
+    and slot number, as plain rows instead of ORM objects
+    """
+    return _joined(db.session.query(*_booking_columns()))
+
+def booking_select():
+    """booking_query as a Select statement, for the async engine."""
+    return _joined(db.select(*_booking_columns()))
+
+def serialize_bookings(rows):
+    """Turn rows from booking_query into the same dicts as Booking.to_dict."""
+    return [Booking.serialize(row, row.location_name, row.slot_number) for row in rows]
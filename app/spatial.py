@@ -0,0 +1,84 @@
+import math
+
+# Size of a grid cell in degrees (~5.5 km of latitude)
+GRID_CELL_DEGREES = 0.05
+GRID_ROWS = int(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = int(360 / GRID_CELL_DEGREES)
+
+# Above this many cells a search scans every location instead of
+# gathering the cells one by one
+MAX_GRID_CELLS = 64
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate the distance between two points on the Earth's surface
+    using the Haversine formula
+    """
+    # Convert latitude and longitude from degrees to radians
+    lat1 = math.radians(lat1)
+    lon1 = math.radians(lon1)
+    lat2 = math.radians(lat2)
+    lon2 = math.radians(lon2)
+
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return c * EARTH_RADIUS_KM
+
+def valid_coordinates(lat, lng):
+    """True for finite coordinates within [-90, 90] and [-180, 180]"""
+    return math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180
+
+def _grid_row(lat):
+    return min(max(int((lat + 90) // GRID_CELL_DEGREES), 0), GRID_ROWS - 1)
+
+def _grid_column(lng):
+    return int(((lng + 180) % 360) // GRID_CELL_DEGREES) % GRID_COLUMNS
+
+def grid_cell(lat, lng):
+    """
+    Return the integer grid cell key that contains the given coordinates
+    """
+    return _grid_row(lat) * GRID_COLUMNS + _grid_column(lng)
+
+def bounding_box(lat, lng, radius):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle of
+    `radius` km around the point. Longitudes are not wrapped, so a box that
+    crosses the antimeridian extends past +/-180.
+    """
+    dlat = radius / KM_PER_DEGREE
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+
+    # Near the poles every longitude is within reach
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    cos_lat = math.cos(math.radians(widest_lat))
+    if cos_lat < 1e-9 or radius / (KM_PER_DEGREE * cos_lat) >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+
+    dlng = radius / (KM_PER_DEGREE * cos_lat)
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+def cells_for_box(min_lat, max_lat, min_lng, max_lng):
+    """
+    Return the grid cells covering the bounding box, or None when the box
+    spans more than MAX_GRID_CELLS cells
+    """
+    rows = range(_grid_row(min_lat), _grid_row(max_lat) + 1)
+    if max_lng - min_lng >= 360:
+        return None
+
+    first_column = int((min_lng + 180) // GRID_CELL_DEGREES)
+    last_column = int((max_lng + 180) // GRID_CELL_DEGREES)
+    if len(rows) * (last_column - first_column + 1) > MAX_GRID_CELLS:
+        return None
+
+    columns = {column % GRID_COLUMNS for column in range(first_column, last_column + 1)}
+    return [row * GRID_COLUMNS + column for row in rows for column in columns]
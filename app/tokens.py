@@ -0,0 +1,168 @@
+import time
+import uuid
+from flask import current_app, g, request, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from app.cache import LocalCache, RedisCache
+
+class TokenAuth:
+    """
+    Signed, short-lived auth tokens carrying the user's claims, so requests
+    are authorized without loading the user. Tokens are read from an
+    `Authorization: Bearer` header or the session cookie, and verified
+    claims are cached in process.
+
+    A token is trusted for TOKEN_MAX_AGE seconds. Until TOKEN_RENEW_MAX_AGE
+    it can be renewed, which reloads the user once so role changes and
+    deleted accounts are picked up. Revoked token ids are kept for the
+    renewal window. A session token renewed in place stays renewable for
+    TOKEN_RENEW_GRACE more seconds, to the same new token, so requests
+    already in flight with the old cookie are not logged out.
+
+    With the 'local' revocation backend a logout only revokes the token in
+    the worker that served it; other workers keep accepting and renewing
+    it. Deployments with more than one worker need the shared 'redis'
+    backend.
+    """
+
+    SALT = 'findmyslot-auth'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TOKEN_MAX_AGE', 900)
+        app.config.setdefault('TOKEN_RENEW_MAX_AGE', 7 * 24 * 3600)
+        app.config.setdefault('TOKEN_CACHE_SIZE', 4096)
+        app.config.setdefault('TOKEN_REVOCATION_SIZE', 100000)
+        app.config.setdefault('TOKEN_REVOCATION_BACKEND', 'local')
+        app.config.setdefault('TOKEN_REVOCATION_URL', None)
+        app.config.setdefault('TOKEN_RENEW_GRACE', 30)
+
+        self.app = app
+        self.serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=self.SALT)
+        self.claims_cache = LocalCache(app.config['TOKEN_CACHE_SIZE'], app.config['TOKEN_MAX_AGE'])
+
+        # 'local' revocations only reach the worker that revoked; use 'redis' to share them
+        renew_max_age = app.config['TOKEN_RENEW_MAX_AGE']
+        grace = app.config['TOKEN_RENEW_GRACE']
+        if app.config['TOKEN_REVOCATION_BACKEND'] == 'redis':
+            self.revoked = RedisCache(app.config['TOKEN_REVOCATION_URL'], renew_max_age,
+                                      prefix='findmyslot:revoked:')
+            self.renewed = RedisCache(app.config['TOKEN_REVOCATION_URL'], grace,
+                                      prefix='findmyslot:renewed:')
+        else:
+            self.revoked = LocalCache(app.config['TOKEN_REVOCATION_SIZE'], renew_max_age)
+            self.renewed = LocalCache(app.config['TOKEN_REVOCATION_SIZE'], grace)
+            if not (app.debug or app.testing):
+                app.logger.warning(
+                    "TOKEN_REVOCATION_BACKEND is 'local': logouts are not seen by other workers"
+                )
+
+        app.extensions['token_auth'] = self
+
+    def issue(self, user):
+        """Return a new signed token for a User."""
+        return self.serializer.dumps({
+            'sub': user.id,
+            'username': user.username,
+            'email': user.email,
+            'admin': bool(user.is_admin),
+            'jti': uuid.uuid4().hex,
+            'iat': int(time.time())
+        })
+
+    def verify(self, token):
+        """Return the claims of a valid, unexpired, unrevoked token, else None."""
+        claims = self.claims_cache.get(token)
+        if claims is None:
+            try:
+                claims = self.serializer.loads(token, max_age=self.app.config['TOKEN_MAX_AGE'])
+            except BadSignature:
+                return None
+            self.claims_cache.set(token, claims)
+        elif time.time() - claims['iat'] > self.app.config['TOKEN_MAX_AGE']:
+            return None
+
+        if self.revoked.get(claims['jti']) is not None:
+            return None
+        return claims
+
+    def renew(self, token, grace=False):
+        """
+        Exchange a token within the renewal window for a new one issued from
+        the current user row, revoking the old one. With `grace` the old
+        token keeps renewing to the same new token for TOKEN_RENEW_GRACE
+        seconds. Returns None if the token cannot be renewed.
+        """
+        from app.models import User
+
+        try:
+            claims = self.serializer.loads(token, max_age=self.app.config['TOKEN_RENEW_MAX_AGE'])
+        except BadSignature:
+            return None
+        if grace:
+            renewed = self.renewed.get(claims['jti'])
+            if renewed is not None:
+                return renewed
+        if self.revoked.get(claims['jti']) is not None:
+            return None
+
+        user = User.query.get(claims['sub'])
+        if user is None:
+            return None
+
+        new_token = self.issue(user)
+        if grace:
+            self.renewed.set(claims['jti'], new_token)
+        self.revoke(claims)
+        return new_token
+
+    def revoke(self, claims):
+        self.revoked.set(claims['jti'], True)
+
+def token_auth():
+    return current_app.extensions['token_auth']
+
+def request_token():
+    """The token sent with the current request, from the header or session."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return session.get('token')
+
+def current_claims(renew=True):
+    """
+    Claims of the current request's token, or None if not logged in. An
+    expired session token is renewed in place, which loads the user; with
+    renew=False None is returned instead and nothing is cached, so a later
+    call can still renew.
+    """
+    if 'claims' not in g:
+        token = request_token()
+        claims = token_auth().verify(token) if token else None
+        if claims is None and token and token == session.get('token'):
+            if not renew:
+                return None
+            # Concurrent requests with the same cookie get the same new token
+            token = token_auth().renew(token, grace=True)
+            if token:
+                session['token'] = token
+                claims = token_auth().verify(token)
+            else:
+                session.pop('token', None)
+        g.claims = claims
+    return g.claims
+
+def current_user_id():
+    claims = current_claims()
+    return claims['sub'] if claims else None
+
+def claims_user(claims):
+    """The same dict as User.to_dict, built from token claims."""
+    return {
+        'id': claims['sub'],
+        'email': claims['email'],
+        'username': claims['username'],
+        'isAdmin': claims['admin']
+    }
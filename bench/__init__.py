@@ -0,0 +1,13 @@
+"""
+Load tests and micro-benchmarks for the API.
+
+    python -m bench load --users 1000 --locations 500 --clients 8 --duration 30
+    python -m bench load --baseline bench/baseline.json      # compare to a stored run
+    python -m bench load --save-baseline bench/baseline.json # store this run
+    python -m bench load --mix login=1,nearby=4              # login burst next to reads
+    python -m bench micro
+
+The load test seeds a synthetic dataset into a fresh SQLite file (or the
+database given with --database-url, e.g. a local Postgres) and drives the
+app returned by create_app from concurrent clients.
+"""
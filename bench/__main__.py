@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from config import config_profiles
+
+def _app(database_url, profile):
+    from app import create_app, db
+
+    class BenchConfig(config_profiles[profile]):
+        SQLALCHEMY_DATABASE_URI = database_url
+        EXPIRY_SCHEDULER_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+def run_load(args):
+    from app import db
+    from bench import dataset, load
+
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='findmyslot-bench-'), 'bench.db')
+        database_url = f'sqlite:///{path}'
+
+    app = _app(database_url, args.profile)
+    with app.app_context():
+        started = time.monotonic()
+        data = dataset.seed(
+            users=args.users,
+            locations=args.locations,
+            slots_per_location=args.slots,
+            bookings=args.bookings,
+            seed=args.seed
+        )
+        print(f"Seeded {args.users} users, {args.locations} locations, "
+              f"{args.locations * args.slots} slots, {args.bookings} bookings "
+              f"in {time.monotonic() - started:.1f}s into {database_url}")
+        db.session.remove()
+
+    scenarios = load.parse_mix(args.mix) if args.mix else None
+    report = load.run(app, data, clients=args.clients, duration=args.duration,
+                      warmup=args.warmup, seed=args.seed, scenarios=scenarios)
+    report['dataset'] = {
+        'users': args.users,
+        'locations': args.locations,
+        'slots': args.slots,
+        'bookings': args.bookings,
+        'database': database_url.split(':', 1)[0],
+        'profile': args.profile
+    }
+
+    baseline = load.load_baseline(args.baseline) if args.baseline else None
+    print(load.format_report(report, baseline))
+
+    if args.save_baseline:
+        load.save_baseline(report, args.save_baseline)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = load.compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+def run_micro(args):
+    from bench import micro
+
+    results = micro.run(repeat=args.repeat, points=args.points)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for name, microseconds in results.items():
+        line = f"{name:<40} {microseconds:>12.3f} us"
+        if baseline and baseline.get(name):
+            change = microseconds / baseline[name] - 1
+            line += f"  {change * 100:+.1f}% vs baseline"
+            if change > args.tolerance:
+                regressions.append(name)
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    for name in regressions:
+        print(f"REGRESSION {name}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='FindMySlot benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load_parser = commands.add_parser('load', help='Seed a dataset and load test the API')
+    load_parser.add_argument('--database-url', help='Database to seed; its tables are dropped first (default: a fresh SQLite file)')
+    load_parser.add_argument('--profile', choices=list(config_profiles), default='development',
+                             help='Config profile to run the app with')
+    load_parser.add_argument('--users', type=int, default=1000)
+    load_parser.add_argument('--locations', type=int, default=500)
+    load_parser.add_argument('--slots', type=int, default=40, help='Slots per location')
+    load_parser.add_argument('--bookings', type=int, default=20000)
+    load_parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+    load_parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    load_parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds first')
+    load_parser.add_argument('--seed', type=int, default=0)
+    load_parser.add_argument('--mix', help="Scenario weights, e.g. 'login=1,nearby=4' to measure "
+                                           "login p99 and its impact on other routes")
+    load_parser.set_defaults(handler=run_load)
+
+    micro_parser = commands.add_parser('micro', help='Time distance and serializer hot paths')
+    micro_parser.add_argument('--repeat', type=int, default=5)
+    micro_parser.add_argument('--points', type=int, default=1000, help='Points per distance batch')
+    micro_parser.set_defaults(handler=run_micro)
+
+    for command in (load_parser, micro_parser):
+        command.add_argument('--baseline', help='JSON results to compare against')
+        command.add_argument('--save-baseline', help='Write these results as JSON')
+        command.add_argument('--tolerance', type=float, default=0.1,
+                             help='Allowed slowdown before a result counts as a regression')
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User, ParkingLocation, ParkingSlot, Booking
+from app.pricing import BOOKING_DURATIONS
+from app.spatial import grid_cell
+
+# Synthetic locations are spread over a box around this point
+CENTER = (12.9716, 77.5946)
+SPREAD_DEGREES = 0.5
+
+PASSWORD = 'bench-password'
+FACILITIES = ['CCTV', 'Covered', 'EV Charging', '24x7', 'Valet']
+
+def seed(users=1000, locations=500, slots_per_location=40, bookings=20000, seed=0, batch_size=5000):
+    """
+    Insert a synthetic dataset into the current app's database with bulk
+    inserts. Every user shares one password hash so seeding stays fast.
+    Returns the ids needed to build requests.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(PASSWORD)
+
+    _insert(User, [
+        {
+            'email': f'user{i}@bench.test',
+            'username': f'user{i}',
+            'password_hash': password_hash,
+            'is_admin': i == 0
+        }
+        for i in range(users)
+    ], batch_size)
+
+    location_rows = []
+    for i in range(locations):
+        latitude = CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)
+        longitude = CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)
+        location_rows.append({
+            'name': f'Bench Parking {i}',
+            'address': f'{i} Bench Road',
+            'latitude': latitude,
+            'longitude': longitude,
+            'price_per_hour': rng.randrange(2000, 10000, 500),
+            'facilities': ','.join(rng.sample(FACILITIES, 2)),
+            'grid_cell': grid_cell(latitude, longitude)
+        })
+    _insert(ParkingLocation, location_rows, batch_size)
+
+    location_ids = [location_id for (location_id,) in db.session.query(ParkingLocation.id)]
+    _insert(ParkingSlot, [
+        {
+            'location_id': location_id,
+            'slot_number': f'A{n + 1}',
+            'is_available': True,
+            'vehicle_type': 'two-wheeler' if n % 4 == 0 else 'four-wheeler',
+            'last_updated': now
+        }
+        for location_id in location_ids
+        for n in range(slots_per_location)
+    ], batch_size)
+
+    user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+    slots = db.session.query(ParkingSlot.id, ParkingSlot.location_id, ParkingSlot.vehicle_type).all()
+
+    # Past bookings only, so every slot is still free for the load test
+    booking_rows = []
+    for _ in range(bookings):
+        slot_id, location_id, vehicle_type = rng.choice(slots)
+        duration = rng.choice(list(BOOKING_DURATIONS.values()))
+        start_date = now - timedelta(days=rng.uniform(1, 365))
+        booking_rows.append({
+            'user_id': rng.choice(user_ids),
+            'location_id': location_id,
+            'slot_id': slot_id,
+            'start_date': start_date,
+            'end_date': start_date + timedelta(minutes=duration),
+            'duration': duration,
+            'amount': rng.randrange(1000, 20000),
+            'status': rng.choice(['completed', 'completed', 'completed', 'cancelled']),
+            'payment_status': 'paid',
+            'vehicle_type': vehicle_type,
+            'created_at': start_date
+        })
+    _insert(Booking, booking_rows, batch_size)
+
+    return {
+        'user_count': users,
+        'user_ids': user_ids,
+        'location_ids': location_ids,
+        'slots': [tuple(slot) for slot in slots]
+    }
+
+def _insert(model, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(model), rows[start:start + batch_size])
+    db.session.commit()
@@ -0,0 +1,186 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from app.models import User
+from bench.dataset import CENTER, PASSWORD, SPREAD_DEGREES
+
+# Relative weight of each scenario in the request mix
+SCENARIOS = {
+    'nearby': 4,
+    'location': 4,
+    'book': 1,
+    'history': 2
+}
+
+PERCENTILES = (50, 95, 99)
+
+def _nearby(client, rng, data):
+    lat = CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)
+    lng = CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)
+    return client.get(f'/api/parking/nearby?lat={lat}&lng={lng}&radius=3&limit=20')
+
+def _location(client, rng, data):
+    return client.get(f"/api/parking/locations/{rng.choice(data['location_ids'])}")
+
+def _book(client, rng, data):
+    # Advance bookings spread over a month keep most slots bookable
+    slot_id, location_id, vehicle_type = rng.choice(data['slots'])
+    start_date = datetime.utcnow() + timedelta(minutes=rng.randrange(10, 30 * 24 * 60))
+    return client.post('/api/bookings', json={
+        'locationId': location_id,
+        'slotId': slot_id,
+        'vehicleType': vehicle_type,
+        'duration': 60,
+        'startDate': start_date.isoformat(),
+        'autoAssign': True
+    })
+
+def _history(client, rng, data):
+    return client.get('/api/bookings/history?limit=20')
+
+def _login(client, rng, data):
+    # A fresh client, so the caller's own login is kept
+    return client.application.test_client().post('/api/auth/login', json={
+        'email': f"user{rng.randrange(data['user_count'])}@bench.test",
+        'password': PASSWORD
+    })
+
+HANDLERS = {
+    'nearby': _nearby,
+    'location': _location,
+    'book': _book,
+    'history': _history,
+    'login': _login
+}
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+def run(app, data, clients=8, duration=30, warmup=2, seed=0, scenarios=None):
+    """
+    Drive `app` from `clients` threads, each logged in as its own user, for
+    `duration` seconds after `warmup` seconds. Returns a report dict.
+    """
+    scenarios = scenarios or SCENARIOS
+    names = list(scenarios)
+    weights = [scenarios[name] for name in names]
+
+    # One logged-in user per client
+    with app.app_context():
+        tokens = [
+            app.extensions['token_auth'].issue(User.query.get(data['user_ids'][i % len(data['user_ids'])]))
+            for i in range(clients)
+        ]
+
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    conflicts = {name: 0 for name in names}
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client_loop(client_index):
+        rng = random.Random(seed * 1000 + client_index)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['token'] = tokens[client_index]
+
+        while True:
+            name = rng.choices(names, weights)[0]
+            request_started = time.monotonic()
+            if request_started >= stop_at:
+                return
+            try:
+                status = HANDLERS[name](client, rng, data).status_code
+            except Exception:
+                status = 599
+            elapsed = time.monotonic() - request_started
+
+            if request_started < measure_from:
+                continue
+            with lock:
+                samples[name].append(elapsed)
+                if status >= 500 and status != 503:
+                    errors[name] += 1
+                elif status in (409, 503):
+                    conflicts[name] += 1
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {'clients': clients, 'duration': duration, 'scenarios': {}}
+    for name in names:
+        latencies = sorted(samples[name])
+        entry = {
+            'requests': len(latencies),
+            'errors': errors[name],
+            'conflicts': conflicts[name],
+            'throughput': round(len(latencies) / duration, 1)
+        }
+        for p in PERCENTILES:
+            value = percentile(latencies, p)
+            entry[f'p{p}'] = round(value * 1000, 2) if value is not None else None
+        report['scenarios'][name] = entry
+
+    total = sum(entry['requests'] for entry in report['scenarios'].values())
+    report['throughput'] = round(total / duration, 1)
+    return report
+
+def parse_mix(text):
+    """Scenario weights from 'name=weight,...', e.g. 'login=1,nearby=4'."""
+    scenarios = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in HANDLERS:
+            raise ValueError(f"Unknown scenario: {name}")
+        scenarios[name] = float(weight or 1)
+    return scenarios
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    Compare a report against a baseline report. Returns a list of
+    regression messages: throughput lower or p95 higher than the baseline
+    by more than `tolerance`.
+    """
+    regressions = []
+    for name, entry in report['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if base['throughput'] and entry['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {entry['throughput']}/s < baseline {base['throughput']}/s"
+            )
+        if base['p95'] and entry['p95'] and entry['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {entry['p95']}ms > baseline {base['p95']}ms")
+    return regressions
+
+def format_report(report, baseline=None):
+    lines = [f"{'scenario':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'409/503':>8}"]
+    for name, entry in report['scenarios'].items():
+        line = (f"{name:<10} {entry['throughput']:>8} {entry['p50'] or '-':>8} {entry['p95'] or '-':>8} "
+                f"{entry['p99'] or '-':>8} {entry['errors']:>7} {entry['conflicts']:>8}")
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        if base and base['p95'] and entry['p95']:
+            line += f"  p95 {(entry['p95'] / base['p95'] - 1) * 100:+.1f}% vs baseline"
+        lines.append(line)
+    lines.append(f"total      {report['throughput']:>8}")
+    return '\n'.join(lines)
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
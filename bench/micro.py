@@ -0,0 +1,75 @@
+import math
+import random
+import timeit
+from array import array
+from datetime import datetime
+from app.distance import haversine_distances, np
+from app.models import Booking, ParkingLocation, ParkingSlot
+from app.spatial import calculate_distance
+from bench.dataset import CENTER, SPREAD_DEGREES
+
+def _points(count, rng):
+    return [
+        (CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+         CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES))
+        for _ in range(count)
+    ]
+
+def _objects():
+    # Transient model instances; none of these touch the database
+    now = datetime.utcnow()
+    location = ParkingLocation(
+        id=1, name='Bench Parking', address='1 Bench Road', latitude=CENTER[0], longitude=CENTER[1],
+        price_per_hour=5000, image_url=None, facilities='CCTV,Covered'
+    )
+    slots = [
+        ParkingSlot(id=n, location_id=1, slot_number=f'A{n}', is_available=n % 3 != 0,
+                    vehicle_type='four-wheeler', last_updated=now)
+        for n in range(1, 41)
+    ]
+    booking = Booking(
+        id=1, user_id=1, location_id=1, slot_id=1, start_date=now, end_date=now, duration=60,
+        amount=5000, status='active', payment_status='paid', vehicle_type='four-wheeler', created_at=now
+    )
+    booking.location = location
+    booking.parking_slot = slots[0]
+    return location, slots, booking
+
+def benchmarks(points=1000, seed=0):
+    """Return {name: zero-argument callable} for every micro-benchmark."""
+    rng = random.Random(seed)
+    origin = _points(1, rng)[0]
+    targets = _points(points, rng)
+    lats = array('d', (math.radians(lat) for lat, _ in targets))
+    lngs = array('d', (math.radians(lng) for _, lng in targets))
+    cos_lats = array('d', (math.cos(lat) for lat in lats))
+    if np is not None:
+        lats, lngs, cos_lats = np.asarray(lats), np.asarray(lngs), np.asarray(cos_lats)
+
+    location, slots, booking = _objects()
+
+    return {
+        f'calculate_distance x{points}': lambda: [
+            calculate_distance(origin[0], origin[1], lat, lng) for lat, lng in targets
+        ],
+        f'haversine_distances x{points}': lambda: haversine_distances(origin[0], origin[1], lats, lngs, cos_lats),
+        'ParkingLocation.to_dict': location.to_dict,
+        f'ParkingLocation.to_dict slots={len(slots)}': lambda: location.to_dict(include_slots=True, slots=slots),
+        'ParkingSlot.to_dict': slots[0].to_dict,
+        'Booking.to_dict': booking.to_dict,
+        'Booking.serialize': lambda: Booking.serialize(booking, 'Bench Parking', 'A1')
+    }
+
+def run(repeat=5, min_time=0.2, points=1000):
+    """
+    Time every micro-benchmark, returning {name: best microseconds per call}
+    over `repeat` runs of at least `min_time` seconds each
+    """
+    results = {}
+    for name, func in benchmarks(points).items():
+        timer = timeit.Timer(func)
+        number, elapsed = timer.autorange()
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = round(best * 1e6, 3)
+    return results
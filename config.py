@@ -6,4 +6,96 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-find-my-slot'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Read replicas for GET requests, e.g. 'sqlite:///replica.db' (comma separated)
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    REPLICA_STALENESS = 5  # Seconds a client reads from the primary after writing
+    
+    # Async driver URI for ASGI serving (asgi.py); derived from the primary when unset
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+    
+    # Signed auth tokens: trusted without a user lookup for TOKEN_MAX_AGE,
+    # renewable from the database until TOKEN_RENEW_MAX_AGE
+    TOKEN_MAX_AGE = 900  # Seconds
+    TOKEN_RENEW_MAX_AGE = 7 * 24 * 3600  # Seconds
+    TOKEN_RENEW_GRACE = 30  # Seconds an auto-renewed session token still renews
+    # 'local' revocations (logout) only reach the worker that served them;
+    # use 'redis' whenever more than one worker serves the app
+    TOKEN_REVOCATION_BACKEND = os.environ.get('TOKEN_REVOCATION_BACKEND') or 'local'
+    TOKEN_REVOCATION_URL = os.environ.get('TOKEN_REVOCATION_URL')
+    
+    # Password hashing runs in a process pool; 0 workers hashes inline
+    PASSWORD_METHOD = 'scrypt:32768:8:1'
+    PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_MAX_PENDING = 32  # Hashes in flight before login/register return 503
+    PASSWORD_TIMEOUT = 10  # Seconds
+    
+    # Keyset pagination for list endpoints
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    
+    # Largest batch accepted by the bulk slot endpoints
+    BULK_MAX_ROWS = 5000
+    
+    # Slot auto-assignment
+    SLOT_POOL_MAX_AGE = 30  # Seconds
+    AUTO_BOOKING_MAX_LOCATIONS = 5
+    
+    # Notifications are written in batches by a background thread
+    NOTIFICATION_DEFERRED = True
+    NOTIFICATION_FLUSH_INTERVAL = 1.0  # Seconds
+    NOTIFICATION_BATCH_SIZE = 500
+    NOTIFICATION_RETENTION_DAYS = 90  # Read notifications
+    NOTIFICATION_UNREAD_RETENTION_DAYS = 365
+    NOTIFICATION_PRUNE_BATCH_SIZE = 1000
+    
+    # Response compression of large bodies, brotli if installed, else gzip
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024  # Bytes
+    
+    # Location metadata cache: 'local' (per process) or 'redis' (shared)
+    LOCATION_CACHE_BACKEND = os.environ.get('LOCATION_CACHE_BACKEND') or 'local'
+    LOCATION_CACHE_URL = os.environ.get('LOCATION_CACHE_URL')
+    LOCATION_CACHE_TTL = 300  # Seconds
+    LOCATION_CACHE_SIZE = 1024
+    
+    # Slot availability events: 'local' (per process) or 'redis' (pub/sub)
+    SLOT_EVENTS_BACKEND = os.environ.get('SLOT_EVENTS_BACKEND') or 'local'
+    SLOT_EVENTS_URL = os.environ.get('SLOT_EVENTS_URL')
+    SLOT_EVENTS_KEEPALIVE = 15  # Seconds
+    
+    # Background completion of bookings past their end date
+    EXPIRY_SCHEDULER_ENABLED = os.environ.get('EXPIRY_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    EXPIRY_INTERVAL = 30  # Seconds
+    EXPIRY_BATCH_SIZE = 500
+    
+    # Bay sensor ingestion
+    SENSOR_API_KEY = os.environ.get('SENSOR_API_KEY')
+    SENSOR_FLUSH_INTERVAL = 1.0  # Seconds
+    
+    # Request timing, SQL accounting, /metrics and the sampling profiler
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'false').lower() == 'true'
+    N1_THRESHOLD = 5  # Repeats of one statement in a request
+    PROFILER_INTERVAL = 0.005  # Seconds between stack samples
+
+class ProductionConfig(Config):
+    # Connection pool per worker process
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 10,  # Seconds to wait for a connection
+        'pool_pre_ping': True,
+        'pool_recycle': 1800  # Seconds
+    }
+    
+    # SQLite only: readers do not block the writer and writers wait for the lock
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000  # Milliseconds
+
+# Profiles selectable with the APP_CONFIG environment variable
+config_profiles = {
+    'development': Config,
+    'production': ProductionConfig
+}
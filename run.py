@@ -1,9 +1,9 @@
-from app import create_app, db
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app import create_app as build_app, db
 from app.models import User, ParkingLocation, ParkingSlot, Booking, Payment, Notification
 
-app = create_app()
-
-@app.shell_context_processor
 def make_shell_context():
     return {
         'db': db, 
@@ -15,5 +15,123 @@ def make_shell_context():
         'Notification': Notification
     }
 
+@click.command('index-locations')
+@with_appcontext
+def index_locations():
+    """Backfill the spatial grid cell of existing parking locations."""
+    from app.spatial import grid_cell
+    
+    locations = ParkingLocation.query.filter(ParkingLocation.grid_cell.is_(None)).all()
+    for location in locations:
+        location.grid_cell = grid_cell(location.latitude, location.longitude)
+    
+    db.session.commit()
+    print(f"Indexed {len(locations)} locations")
+
+@click.command('expire-bookings')
+@with_appcontext
+def expire_bookings():
+    """Complete bookings past their end date and free their slots."""
+    expired = current_app.extensions['expiry_scheduler'].run_once()
+    print(f"Completed {len(expired)} expired bookings")
+
+@click.command('prune-notifications')
+@with_appcontext
+@click.option('--batch', default=None, type=int, help='Rows deleted per transaction.')
+def prune_notifications(batch):
+    """Delete notifications past their retention period, in batches."""
+    from app.notifications import prune_notifications
+    
+    deleted = prune_notifications(batch_size=batch)
+    print(f"Deleted {deleted} old notifications")
+
+@click.command('recount-notifications')
+@with_appcontext
+def recount_notifications():
+    """Rebuild every user's unread notification counter."""
+    from app.notifications import recount_unread
+    
+    recount_unread()
+    print("Recounted unread notifications")
+
+@click.command('sync-replicas')
+@with_appcontext
+def sync_replicas():
+    """Copy a SQLite primary onto its SQLite replicas, for local testing."""
+    import sqlite3
+    
+    primary = db.engines[None].url
+    if primary.get_backend_name() != 'sqlite':
+        print("Only SQLite databases can be synced locally")
+        return
+    
+    source = sqlite3.connect(primary.database)
+    for bind in current_app.extensions['replica_router'].binds:
+        replica = db.engines[bind].url
+        db.engines[bind].dispose()
+        target = sqlite3.connect(replica.database)
+        source.backup(target)
+        target.close()
+        print(f"Copied {primary.database} to {replica.database}")
+    source.close()
+
+@click.command('fake-sensors')
+@with_appcontext
+@click.option('--url', default='http://localhost:5000', help='Base URL of the API.')
+@click.option('--rate', default=1000, help='Readings per second.')
+@click.option('--duration', default=10, help='Seconds to run for.')
+@click.option('--batch', default=200, help='Readings per request.')
+def fake_sensors(url, rate, duration, batch):
+    """Send fake bay sensor readings to a running server for load testing."""
+    import json
+    import time
+    import urllib.request
+    from itertools import islice
+    from app.sensors import fake_readings
+    
+    slot_ids = [slot_id for (slot_id,) in db.session.query(ParkingSlot.id)]
+    if not slot_ids:
+        print("No slots to report on")
+        return
+    
+    headers = {'Content-Type': 'application/x-ndjson'}
+    if current_app.config['SENSOR_API_KEY']:
+        headers['X-Sensor-Key'] = current_app.config['SENSOR_API_KEY']
+    
+    readings = fake_readings(slot_ids)
+    sent = 0
+    started = time.monotonic()
+    while time.monotonic() - started < duration:
+        body = '\n'.join(json.dumps(reading) for reading in islice(readings, batch))
+        urllib.request.urlopen(urllib.request.Request(
+            f'{url}/api/parking/sensors/readings', data=body.encode(), headers=headers
+        )).read()
+        sent += batch
+        
+        # Hold the requested rate
+        delay = sent / rate - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
+    
+    elapsed = time.monotonic() - started
+    print(f"Sent {sent} readings in {elapsed:.1f}s ({sent / elapsed:.0f}/s)")
+
+def create_app():
+    """
+    The app with the management commands, also served as the WSGI entry point
+    `run:app` (e.g. `gunicorn run:app`)
+    """
+    app = build_app()
+    app.shell_context_processor(make_shell_context)
+    for command in (index_locations, expire_bookings, prune_notifications, recount_notifications,
+                    sync_replicas, fake_sensors):
+        app.cli.add_command(command)
+    return app
+
+# Password hashing workers re-import the main module as __mp_main__ when they
+# start, and must not build another app
+if __name__ != '__mp_main__':
+    app = create_app()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
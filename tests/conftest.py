@@ -0,0 +1,129 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from config import Config
+from app import create_app, db
+from app.distance import location_index
+from app.models import User, ParkingLocation, ParkingSlot, Booking
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test-secret'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_REPLICA_URIS = []
+    ASYNC_DATABASE_URI = None
+    PASSWORD_METHOD = 'pbkdf2:sha256:1000'  # Fast hashes for tests
+    PASSWORD_WORKERS = 0
+    NOTIFICATION_DEFERRED = False
+    EXPIRY_SCHEDULER_ENABLED = False
+    INSTRUMENTATION_ENABLED = False
+    LOCATION_CACHE_BACKEND = 'local'
+    SLOT_EVENTS_BACKEND = 'local'
+    TOKEN_REVOCATION_BACKEND = 'local'
+    SENSOR_API_KEY = None
+
+@pytest.fixture
+def app_factory():
+    """Build an app from TestConfig with overrides, its tables created."""
+    def factory(**overrides):
+        config_class = type('Config', (TestConfig,), overrides)
+        app = create_app(config_class)
+        with app.app_context():
+            db.create_all(bind_key=None)
+        return app
+    yield factory
+    location_index.invalidate()
+
+@pytest.fixture
+def app(app_factory):
+    return app_factory()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements run on the primary."""
+    @contextmanager
+    def count():
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return count
+
+@pytest.fixture
+def make_user(app):
+    """Create a user and return (user_id, auth headers)."""
+    counter = iter(range(1, 10000))
+
+    def make(admin=False, password='secret123'):
+        n = next(counter)
+        with app.app_context():
+            user = User(email=f'user{n}@test.local', username=f'user{n}', is_admin=admin)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            token = app.extensions['token_auth'].issue(user)
+            return user.id, {'Authorization': f'Bearer {token}'}
+    return make
+
+@pytest.fixture
+def make_location(app):
+    """Create a location with `slots` free four-wheeler slots and return its id."""
+    def make(slots=4, latitude=12.9716, longitude=77.5946, price_per_hour=5000, vehicle_type='four-wheeler'):
+        with app.app_context():
+            location = ParkingLocation(
+                name='Test Parking',
+                address='1 Test Road',
+                latitude=latitude,
+                longitude=longitude,
+                price_per_hour=price_per_hour,
+                facilities='CCTV'
+            )
+            db.session.add(location)
+            db.session.flush()
+            for n in range(slots):
+                db.session.add(ParkingSlot(
+                    location_id=location.id,
+                    slot_number=f'A{n + 1}',
+                    vehicle_type=vehicle_type
+                ))
+            db.session.commit()
+            location_index.invalidate()
+            return location.id
+    return make
+
+def slot_ids(app, location_id):
+    with app.app_context():
+        return [slot_id for (slot_id,) in db.session.query(ParkingSlot.id)
+                .filter_by(location_id=location_id).order_by(ParkingSlot.id)]
+
+def add_bookings(app, user_id, location_id, count, status='completed', created_at=None):
+    """Insert `count` past bookings of the location's first slot and return their ids."""
+    slot_id = slot_ids(app, location_id)[0]
+    start = datetime.utcnow() - timedelta(days=1)
+    with app.app_context():
+        bookings = [Booking(
+            user_id=user_id,
+            location_id=location_id,
+            slot_id=slot_id,
+            start_date=start,
+            end_date=start + timedelta(hours=1),
+            duration=60,
+            amount=5000,
+            status=status,
+            vehicle_type='four-wheeler',
+            created_at=created_at or datetime.utcnow()
+        ) for _ in range(count)]
+        db.session.add_all(bookings)
+        db.session.commit()
+        return [booking.id for booking in bookings]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Booking, ParkingSlot
+from tests.conftest import slot_ids
+
+def auto(client, headers, location_id, duration=60, **extra):
+    return client.post('/api/bookings/auto', headers=headers,
+                       json=dict({'locationId': location_id, 'duration': duration}, **extra))
+
+def fill(client, headers, location_id, count):
+    for _ in range(count):
+        assert auto(client, headers, location_id).status_code == 201
+
+def test_auto_booking_fills_slots_in_order(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=3)
+
+    booked = [auto(client, headers, location_id).json['booking']['slotId'] for _ in range(3)]
+
+    assert booked == slot_ids(app, location_id)
+    assert auto(client, headers, location_id).status_code == 409
+
+def test_spread_policy_rotates_through_the_lot(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=3)
+    first = auto(client, headers, location_id, policy='spread').json['booking']
+    client.put(f"/api/bookings/{first['id']}/status", json={'status': 'completed'}, headers=headers)
+
+    second = auto(client, headers, location_id, policy='spread').json['booking']
+
+    assert second['slotId'] == slot_ids(app, location_id)[1]
+
+def test_slot_created_after_the_pool_is_loaded(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=1)
+    fill(client, admin, location_id, 1)
+
+    created = client.post(f'/api/parking/locations/{location_id}/slots', headers=admin,
+                          json={'slotNumber': 'Z1'}).json['slot']['id']
+
+    response = auto(client, admin, location_id)
+    assert response.status_code == 201
+    assert response.json['booking']['slotId'] == created
+
+def test_slots_bulk_created_after_the_pool_is_loaded(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=1)
+    fill(client, admin, location_id, 1)
+
+    client.post(f'/api/parking/locations/{location_id}/slots/bulk', headers=admin,
+                json={'slots': [{'slotNumber': f'Z{n}'} for n in range(4)]})
+
+    fill(client, admin, location_id, 4)
+
+def test_slot_freed_without_an_event(app, client, make_user, make_location):
+    # Another worker freeing a slot does not reach this process's bitmap
+    _, headers = make_user()
+    location_id = make_location(slots=2)
+    fill(client, headers, location_id, 2)
+    with app.app_context():
+        db.session.execute(db.update(Booking).values(status='completed'))
+        db.session.execute(db.update(ParkingSlot).values(is_available=True))
+        db.session.commit()
+
+    fill(client, headers, location_id, 2)
+
+def test_future_overlap_does_not_hide_the_slot(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    start = datetime.utcnow() + timedelta(minutes=30)
+    assert auto(client, headers, location_id, startDate=start.isoformat()).status_code == 201
+
+    # Overlaps the advance booking, so it fails without marking the slot taken
+    assert auto(client, headers, location_id, duration=60).status_code == 409
+
+    response = auto(client, headers, location_id, duration=15)
+    assert response.status_code == 201
+    assert response.json['booking']['slotId'] == slot_id
+
+def test_auto_booking_by_coordinates(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+
+    response = client.post('/api/bookings/auto', headers=headers,
+                           json={'lat': 12.9716, 'lng': 77.5946, 'radius': 2, 'duration': 60})
+
+    assert response.status_code == 201
+    assert response.json['booking']['locationId'] == location_id
+    assert client.post('/api/bookings/auto', headers=headers,
+                       json={'lat': 'nan', 'lng': 77, 'duration': 60}).status_code == 400
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import pytest
+from app import db
+
+pytest.importorskip('asgiref')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+
+from app.asgi import AsgiApp
+
+@pytest.fixture
+def asgi(app_factory, tmp_path):
+    def build(**overrides):
+        flask_app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'asgi.db'}", **overrides)
+        return AsgiApp(flask_app)
+    return build
+
+def call(app, path, query='', headers=None):
+    """Run one GET through the ASGI app; returns (status, headers, body)."""
+    messages = []
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'root_path': '',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        'client': ('127.0.0.1', 50000)
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        await app.engine.dispose()
+
+    asyncio.run(run())
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], {key.decode(): value.decode() for key, value in start['headers']}, body
+
+def add_location(app):
+    from app.models import ParkingLocation, ParkingSlot
+    with app.app_context():
+        location = ParkingLocation(name='Async', address='a', latitude=12.97, longitude=77.59, price_per_hour=100)
+        db.session.add(location)
+        db.session.flush()
+        db.session.add(ParkingSlot(location_id=location.id, slot_number='A1'))
+        db.session.commit()
+        return location.id
+
+def test_nearby_reads_the_query_string(asgi):
+    app = asgi()
+    location_id = add_location(app.flask_app)
+
+    status, _, body = call(app, '/api/parking/nearby', 'lat=12.97&lng=77.59&radius=2&limit=5')
+
+    assert status == 200
+    assert [location['id'] for location in json.loads(body)['locations']] == [location_id]
+
+def test_invalid_query_is_a_400(asgi):
+    status, _, _ = call(asgi(), '/api/parking/nearby', 'lat=nan&lng=1')
+    assert status == 400
+
+def test_location_etag(asgi):
+    app = asgi()
+    location_id = add_location(app.flask_app)
+
+    status, headers, body = call(app, f'/api/parking/locations/{location_id}')
+    assert status == 200
+    assert json.loads(body)['totalSlots'] == 1
+
+    status, _, body = call(app, f'/api/parking/locations/{location_id}', headers={'If-None-Match': headers['etag']})
+    assert status == 304
+    assert body == b''
+    # Same tag as the WSGI view
+    assert app.flask_app.test_client().get(f'/api/parking/locations/{location_id}').headers['ETag'] == headers['etag']
+
+def test_history_needs_a_token(asgi):
+    app = asgi()
+    from app.models import User
+    with app.flask_app.app_context():
+        user = User(email='a@test.local', username='a')
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.commit()
+        token = app.flask_app.extensions['token_auth'].issue(user)
+
+    assert call(app, '/api/bookings/history')[0] == 401
+    status, _, body = call(app, '/api/bookings/history', 'limit=5', headers={'Authorization': f'Bearer {token}'})
+    assert status == 200
+    assert json.loads(body) == {'bookings': [], 'nextCursor': None}
+
+def test_native_views_are_instrumented(asgi):
+    app = asgi(INSTRUMENTATION_ENABLED=True)
+    location_id = add_location(app.flask_app)
+
+    _, headers, _ = call(app, f'/api/parking/locations/{location_id}')
+
+    assert '0 queries' not in headers['server-timing']
+
+def test_other_routes_go_through_wsgi(asgi):
+    status, _, body = call(asgi(), '/api/parking/locations')
+    assert status == 200
+    assert json.loads(body) == {'locations': []}
+
+def test_session_renewal_runs_off_the_event_loop(asgi):
+    import threading
+    app = asgi(TOKEN_MAX_AGE=-1)  # Every token needs renewal
+    client = app.flask_app.test_client()
+    with client.session_transaction() as session:
+        session['token'] = 'expired-token'
+    cookie = client.get_cookie('session')
+
+    threads = []
+    token_auth = app.flask_app.extensions['token_auth']
+    token_auth.renew = lambda token, grace=False: threads.append(threading.current_thread()) or None
+
+    status, _, _ = call(app, '/api/bookings/history', headers={'Cookie': f'session={cookie.value}'})
+
+    assert status == 401
+    assert threads and threads[0] is not threading.main_thread()
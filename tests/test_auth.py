@@ -0,0 +1,36 @@
+import pytest
+from app import db
+from app.models import BootstrapFlag, User
+
+def register(client, email, username, password='secret123'):
+    return client.post('/api/auth/register', json={'email': email, 'username': username, 'password': password})
+
+def test_only_the_first_user_is_admin(client):
+    first = register(client, 'a@test.local', 'a')
+    second = register(client, 'b@test.local', 'b')
+
+    assert first.status_code == second.status_code == 201
+    assert first.json['user']['isAdmin']
+    assert not second.json['user']['isAdmin']
+
+def test_duplicates_are_rejected(client):
+    register(client, 'a@test.local', 'a')
+
+    assert register(client, 'a@test.local', 'other').json['message'] == "Email already registered"
+    assert register(client, 'other@test.local', 'a').json['message'] == "Username already taken"
+
+def test_missing_fields_are_rejected(client):
+    assert client.post('/api/auth/register', json={'email': 'a@test.local'}).status_code == 400
+
+def test_failed_first_registration_releases_the_admin_flag(app, client, monkeypatch):
+    def fail(user):
+        raise RuntimeError('token backend down')
+    monkeypatch.setattr(app.extensions['token_auth'], 'issue', fail)
+
+    with pytest.raises(RuntimeError):
+        register(client, 'a@test.local', 'a')
+
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(BootstrapFlag)) == 0
+    monkeypatch.undo()
+    assert register(client, 'b@test.local', 'b').json['user']['isAdmin']
@@ -0,0 +1,52 @@
+from app import db
+from app.availability import count_slots
+from app.models import ParkingSlot
+from tests.conftest import slot_ids
+
+def test_counts_are_split_by_vehicle_type(app, make_location):
+    location_id = make_location(slots=3)
+    empty_id = make_location(slots=0)
+    with app.app_context():
+        db.session.add(ParkingSlot(location_id=location_id, slot_number='B1', vehicle_type='two-wheeler', is_available=False))
+        db.session.commit()
+
+        counts = count_slots([location_id, empty_id])
+
+    assert counts[location_id] == {
+        'availableSlots': 3,
+        'totalSlots': 4,
+        'byVehicleType': {
+            'two-wheeler': {'availableSlots': 0, 'totalSlots': 1},
+            'four-wheeler': {'availableSlots': 3, 'totalSlots': 3}
+        }
+    }
+    assert counts[empty_id]['totalSlots'] == 0
+    with app.app_context():
+        assert count_slots([]) == {}
+
+def test_nearby_query_count_does_not_grow_with_results(client, make_location, count_queries):
+    make_location()
+    client.get('/api/parking/nearby?lat=12.97&lng=77.59')
+    with count_queries() as one:
+        client.get('/api/parking/nearby?lat=12.97&lng=77.59')
+
+    for _ in range(5):
+        make_location()
+    client.get('/api/parking/nearby?lat=12.97&lng=77.59')
+    with count_queries() as six:
+        response = client.get('/api/parking/nearby?lat=12.97&lng=77.59')
+
+    assert len(response.json['locations']) == 6
+    assert 0 < len(six) == len(one)
+
+def test_location_detail_counts(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=3)
+    client.put('/api/parking/slots/availability', headers=admin, json={'occupied': slot_ids(app, location_id)[:1]})
+
+    body = client.get(f'/api/parking/locations/{location_id}').json
+
+    assert (body['availableSlots'], body['totalSlots']) == (2, 3)
+    assert (body['location']['availableSlots'], body['location']['totalSlots']) == (2, 3)
+    assert body['slotsByVehicleType']['four-wheeler'] == {'availableSlots': 2, 'totalSlots': 3}
+    assert len(body['slots']) == 3
@@ -0,0 +1,37 @@
+import pytest
+from bench import dataset, load
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+
+    assert load.percentile(values, 50) == 50
+    assert load.percentile(values, 99) == 99
+    assert load.percentile([7], 95) == 7
+    assert load.percentile([], 50) is None
+
+def test_parse_mix():
+    assert load.parse_mix('login=1,nearby=4,history') == {'login': 1.0, 'nearby': 4.0, 'history': 1.0}
+    with pytest.raises(ValueError):
+        load.parse_mix('nearby=1,everything=2')
+
+def test_compare_flags_regressions():
+    baseline = {'scenarios': {'nearby': {'throughput': 100, 'p95': 10}}}
+
+    assert load.compare({'scenarios': {'nearby': {'throughput': 95, 'p95': 10.5}}}, baseline) == []
+    assert load.compare({'scenarios': {'nearby': {'throughput': 80, 'p95': 12}}}, baseline) == [
+        'nearby: throughput 80/s < baseline 100/s',
+        'nearby: p95 12ms > baseline 10ms'
+    ]
+
+def test_load_run_against_a_seeded_app(app_factory, tmp_path):
+    # Concurrent clients need a database file rather than one shared in-memory connection
+    app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'bench.db'}")
+    with app.app_context():
+        data = dataset.seed(users=4, locations=3, slots_per_location=3, bookings=10)
+
+    report = load.run(app, data, clients=2, duration=0.3, warmup=0)
+
+    assert set(report['scenarios']) == set(load.SCENARIOS)
+    assert sum(entry['requests'] for entry in report['scenarios'].values()) > 0
+    assert all(entry['errors'] == 0 for entry in report['scenarios'].values())
+    assert load.format_report(report, report).splitlines()[-1].startswith('total')
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Booking, ParkingSlot
+from app.routes import bookings
+from tests.conftest import slot_ids
+
+def book(client, headers, location_id, slot_id, duration=60, start=None, **extra):
+    body = dict({'locationId': location_id, 'slotId': slot_id, 'duration': duration}, **extra)
+    if start is not None:
+        body['startDate'] = start.isoformat()
+    return client.post('/api/bookings', json=body, headers=headers)
+
+def slot_available(app, slot_id):
+    with app.app_context():
+        return db.session.get(ParkingSlot, slot_id).is_available
+
+def test_booking_claims_the_slot(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+
+    response = book(client, headers, location_id, slot_id)
+
+    assert response.status_code == 201
+    assert response.json['booking']['amount'] == 5000
+    assert not slot_available(app, slot_id)
+    assert book(client, headers, location_id, slot_id).status_code == 409
+
+def test_advance_bookings_only_conflict_when_windows_overlap(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    start = datetime.utcnow() + timedelta(days=1)
+
+    assert book(client, headers, location_id, slot_id, start=start).status_code == 201
+    assert book(client, headers, location_id, slot_id, start=start + timedelta(minutes=30)).status_code == 409
+    assert book(client, headers, location_id, slot_id, start=start + timedelta(minutes=60)).status_code == 201
+    # Advance bookings leave the slot free right now
+    assert slot_available(app, slot_id)
+    assert book(client, headers, location_id, slot_id).status_code == 201
+
+def test_cancelled_booking_cannot_be_reopened(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    booking_id = book(client, headers, location_id, slot_id).json['booking']['id']
+
+    assert client.put(f'/api/bookings/{booking_id}/status', json={'status': 'cancelled'},
+                      headers=headers).status_code == 200
+    assert slot_available(app, slot_id)
+
+    response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'active'}, headers=headers)
+    assert response.status_code == 400
+
+def test_closing_a_closed_booking_keeps_the_slot_taken(app, client, make_user, make_location):
+    _, first = make_user()
+    _, second = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    booking_id = book(client, first, location_id, slot_id).json['booking']['id']
+    client.put(f'/api/bookings/{booking_id}/status', json={'status': 'cancelled'}, headers=first)
+
+    # Someone else takes the freed slot
+    assert book(client, second, location_id, slot_id).status_code == 201
+
+    response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'completed'}, headers=first)
+    assert response.status_code == 400
+    assert response.json['message'] == "A cancelled booking cannot be changed"
+    assert not slot_available(app, slot_id)
+
+def test_booking_closed_after_it_was_read_is_left_alone(app, client, make_user, make_location, monkeypatch):
+    _, first = make_user()
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    booking_id = book(client, first, location_id, slot_id).json['booking']['id']
+    claims = bookings.current_claims
+
+    def expire_then_claims():
+        # Expiry completes the booking and someone else takes the slot between
+        # the route loading the booking and updating it
+        db.session.execute(db.update(Booking).where(Booking.id == booking_id).values(status='completed'))
+        db.session.execute(db.update(ParkingSlot).where(ParkingSlot.id == slot_id).values(is_available=False))
+        db.session.commit()
+        return claims()
+
+    monkeypatch.setattr(bookings, 'current_claims', expire_then_claims)
+    response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'cancelled'}, headers=admin)
+
+    assert response.status_code == 400
+    assert response.json['message'] == "A completed booking cannot be changed"
+    assert not slot_available(app, slot_id)
+
+def test_auto_assign_falls_back_to_another_slot(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=2)
+    first, second = slot_ids(app, location_id)
+    book(client, headers, location_id, first)
+
+    response = book(client, headers, location_id, first, autoAssign=True)
+
+    assert response.status_code == 201
+    assert response.json['booking']['slotId'] == second
+
+def test_other_users_cannot_change_a_booking(app, client, make_user, make_location):
+    _, owner = make_user()
+    _, other = make_user()
+    location_id = make_location(slots=1)
+    booking_id = book(client, owner, location_id, slot_ids(app, location_id)[0]).json['booking']['id']
+
+    response = client.put(f'/api/bookings/{booking_id}/status', json={'status': 'cancelled'}, headers=other)
+
+    assert response.status_code == 403
+
+def test_non_string_start_date_is_rejected(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+
+    response = client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60, 'startDate': 123
+    })
+
+    assert response.status_code == 400
+    assert response.json['message'] == "Invalid startDate"
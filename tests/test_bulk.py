@@ -0,0 +1,70 @@
+from app import db
+from app.events import slot_events
+from app.models import ParkingSlot
+from tests.conftest import slot_ids
+
+def test_bulk_create_publishes_new_slots(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=0)
+    with app.app_context():
+        subscription = slot_events().subscribe(location_ids=[location_id])
+
+    response = client.post(f'/api/parking/locations/{location_id}/slots/bulk', headers=admin, json={
+        'slots': [{'slotNumber': f'B{n}'} for n in range(3)]
+    })
+
+    assert response.status_code == 201
+    events = [subscription.get(timeout=1) for _ in range(3)]
+    assert sorted(event['id'] for event in events) == slot_ids(app, location_id)
+
+def test_bulk_create_rejects_the_whole_batch_on_one_bad_row(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=0)
+
+    response = client.post(f'/api/parking/locations/{location_id}/slots/bulk', headers=admin, json={
+        'slots': [{'slotNumber': 'B1'}, {'slotNumber': 'B2', 'vehicleType': 'bus'}]
+    })
+
+    assert response.status_code == 400
+    assert response.json['errors'] == [{'index': 1, 'message': 'Invalid vehicle type'}]
+    assert slot_ids(app, location_id) == []
+
+def test_bulk_update_rejects_boolean_ids(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    make_location(slots=1)
+
+    response = client.put('/api/parking/slots/bulk', headers=admin, json={'slots': [{'id': True, 'isAvailable': False}]})
+
+    assert response.status_code == 400
+
+def test_bulk_availability_only_reports_changed_slots(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(slots=2)
+    first, second = slot_ids(app, location_id)
+
+    response = client.put('/api/parking/slots/availability', headers=admin,
+                          json={'available': [first], 'occupied': [second]})
+
+    assert response.status_code == 200
+    assert response.json['changed'] == 1
+    with app.app_context():
+        assert not db.session.get(ParkingSlot, second).is_available
+
+def test_bulk_endpoints_require_admin(client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=0)
+
+    response = client.post(f'/api/parking/locations/{location_id}/slots/bulk', headers=headers,
+                           json={'slots': [{'slotNumber': 'B1'}]})
+
+    assert response.status_code == 403
+
+def test_bulk_availability_rejects_boolean_ids(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    slot_id = slot_ids(app, make_location(slots=1))[0]
+
+    response = client.put('/api/parking/slots/availability', headers=admin, json={'occupied': [True]})
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert db.session.get(ParkingSlot, slot_id).is_available
@@ -0,0 +1,56 @@
+from app.cache import LocalCache, location_cache
+from app.pricing import QuoteTables
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+def test_local_cache_entries_expire():
+    cache = LocalCache(ttl=-1)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+    assert cache.size() == 0
+
+def test_locations_are_read_through(app, client, make_location):
+    location_id = make_location()
+
+    client.get(f'/api/parking/locations/{location_id}')
+    client.get(f'/api/parking/locations/{location_id}')
+
+    with app.app_context():
+        stats = location_cache().stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+def test_admin_writes_invalidate_the_cache(client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location(price_per_hour=5000)
+    client.get('/api/parking/locations')
+    client.get(f'/api/parking/locations/{location_id}')
+
+    client.put(f'/api/parking/locations/{location_id}', headers=admin, json={'name': 'Renamed', 'pricePerHour': 6000})
+
+    location = client.get(f'/api/parking/locations/{location_id}').json['location']
+    assert (location['name'], location['pricePerHour']) == ('Renamed', 6000)
+    assert client.get('/api/parking/locations').json['locations'][0]['name'] == 'Renamed'
+    nearby = client.get('/api/parking/nearby?lat=12.9716&lng=77.5946').json['locations'][0]
+    assert nearby['prices']['four-wheeler']['60'] == 6000
+
+    client.delete(f'/api/parking/locations/{location_id}', headers=admin)
+    assert client.get(f'/api/parking/locations/{location_id}').status_code == 404
+    assert client.get('/api/parking/locations').json['locations'] == []
+
+def test_quote_tables_follow_the_price():
+    tables = QuoteTables()
+    location = {'id': 1, 'pricePerHour': 5000}
+
+    assert tables.get(location)['two-wheeler'] == {30: 1500, 60: 3000, 120: 6000}
+    assert tables.quote(location, 'four-wheeler', 45) == 3750
+
+    assert tables.get(dict(location, pricePerHour=1000))['four-wheeler'][60] == 1000
@@ -0,0 +1,139 @@
+import gzip
+from datetime import datetime, timedelta
+from app import db
+from app.availability import slot_revision
+from app.bulk import set_availability
+from app.models import ParkingSlot, SlotRevision
+from tests.conftest import slot_ids
+
+def etag_of(client, path, **headers):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+def test_unchanged_location_is_not_modified(client, make_location):
+    location_id = make_location()
+    path = f'/api/parking/locations/{location_id}'
+    etag = etag_of(client, path)
+
+    response = client.get(path, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+def test_booking_a_slot_changes_the_etags(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location()
+    paths = [f'/api/parking/locations/{location_id}', f'/api/parking/locations/{location_id}/slots']
+    etags = [etag_of(client, path) for path in paths]
+
+    client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    })
+
+    for path, etag in zip(paths, etags):
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
+
+def test_slot_writes_change_the_etag(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location()
+    path = f'/api/parking/locations/{location_id}'
+    first, second = slot_ids(app, location_id)[:2]
+
+    writes = [
+        lambda: client.put(f'/api/parking/slots/{first}', headers=admin, json={'vehicleType': 'two-wheeler'}),
+        lambda: client.put(f'/api/parking/slots/{first}', headers=admin, json={'vehicleType': 'four-wheeler'}),
+        lambda: client.put('/api/parking/slots/availability', headers=admin, json={'occupied': [second]}),
+        lambda: client.post(f'/api/parking/locations/{location_id}/slots/bulk', headers=admin,
+                            json={'slots': [{'slotNumber': 'B1'}]}),
+        lambda: client.delete(f'/api/parking/slots/{second}', headers=admin),
+    ]
+    etags = {etag_of(client, path)}
+    for write in writes:
+        assert write().status_code in (200, 201)
+        etags.add(etag_of(client, path))
+
+    assert len(etags) == len(writes) + 1
+
+def test_write_stamped_before_the_newest_slot_changes_the_etag(app, client, make_location):
+    # Another worker's clock may be behind the one that wrote last
+    location_id = make_location()
+    path = f'/api/parking/locations/{location_id}'
+    etag = etag_of(client, path)
+
+    with app.app_context():
+        set_availability(occupied_ids=slot_ids(app, location_id)[:1], now=datetime.utcnow() - timedelta(hours=1))
+        db.session.commit()
+
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
+
+def test_other_locations_keep_their_etag(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id, other_id = make_location(), make_location()
+    path = f'/api/parking/locations/{other_id}'
+    etag = etag_of(client, path)
+
+    client.put('/api/parking/slots/availability', headers=admin, json={'occupied': slot_ids(app, location_id)})
+
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+def test_slot_writes_leave_the_location_row_alone(app, client, make_user, make_location, count_queries):
+    _, headers = make_user()
+    location_id = make_location(slots=2)
+    first, second = slot_ids(app, location_id)
+    with app.app_context():
+        before = slot_revision(location_id)
+
+    with count_queries() as statements:
+        with app.app_context():
+            # Several slot writes, ORM and Core, in one transaction
+            db.session.get(ParkingSlot, first).vehicle_type = 'two-wheeler'
+            db.session.flush()
+            set_availability(occupied_ids=[first, second])
+            db.session.commit()
+
+    assert not [statement for statement in statements if statement.startswith('UPDATE parking_locations')]
+    with app.app_context():
+        assert slot_revision(location_id) == before + 1
+
+def test_rolled_back_slot_writes_keep_the_revision(app, make_location):
+    location_id = make_location(slots=1)
+    with app.app_context():
+        before = slot_revision(location_id)
+        set_availability(occupied_ids=slot_ids(app, location_id))
+        db.session.rollback()
+        db.session.commit()
+
+        assert slot_revision(location_id) == before
+
+def test_deleting_a_location_deletes_its_revision(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location()
+
+    assert client.delete(f'/api/parking/locations/{location_id}', headers=admin).status_code == 200
+    with app.app_context():
+        assert db.session.get(SlotRevision, location_id) is None
+
+def test_large_responses_are_compressed(client, make_location):
+    location_id = make_location(slots=40)
+    path = f'/api/parking/locations/{location_id}'
+    plain = client.get(path)
+
+    response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    # The compressed variant's tag revalidates too
+    assert client.get(path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_location_list_etag(app, client, make_user, make_location):
+    _, admin = make_user(admin=True)
+    location_id = make_location()
+    etag = etag_of(client, '/api/parking/locations')
+
+    assert client.get('/api/parking/locations', headers={'If-None-Match': etag}).status_code == 304
+    client.put(f'/api/parking/locations/{location_id}', headers=admin, json={'name': 'Renamed'})
+    assert client.get('/api/parking/locations', headers={'If-None-Match': etag}).status_code == 200
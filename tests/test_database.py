@@ -0,0 +1,41 @@
+from config import ProductionConfig
+from app import create_app, db
+from app.database import pool_stats
+from tests.conftest import TestConfig
+
+def production_app(database_uri):
+    config_class = type('Config', (TestConfig, ProductionConfig), {'SQLALCHEMY_DATABASE_URI': database_uri})
+    return create_app(config_class)
+
+def test_production_profile_tunes_sqlite(tmp_path):
+    app = production_app(f"sqlite:///{tmp_path / 'app.db'}")
+
+    with app.app_context():
+        pragmas = [db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+                   for name in ('journal_mode', 'synchronous', 'busy_timeout')]
+        stats = pool_stats()['default']
+        db.session.remove()
+
+    assert pragmas == ['wal', 1, 5000]
+    assert (stats['pool'], stats['size']) == ('QueuePool', 10)
+
+def test_in_memory_database_drops_pool_sizing():
+    app = production_app('sqlite://')
+
+    assert 'pool_size' not in app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping']
+    with app.app_context():
+        assert pool_stats()['default']['pool'] == 'StaticPool'
+
+def test_profile_by_name(monkeypatch):
+    # Building the app opens no connection
+    assert create_app('production').config['SQLITE_JOURNAL_MODE'] == 'WAL'
+    monkeypatch.setenv('APP_CONFIG', 'development')
+    assert create_app().config['SQLITE_JOURNAL_MODE'] is None
+
+def test_pool_stats_are_admin_only(client, make_user):
+    _, headers = make_user()
+    _, admin = make_user(admin=True)
+
+    assert client.get('/api/parking/db/stats', headers=headers).status_code == 403
+    assert 'default' in client.get('/api/parking/db/stats', headers=admin).json['pools']
@@ -0,0 +1,31 @@
+import random
+import pytest
+from app.distance import LocationIndex
+from app.spatial import calculate_distance
+
+def test_nearest_matches_haversine_scan(app, make_location):
+    rng = random.Random(1)
+    points = {}
+    for _ in range(40):
+        lat, lng = 12.9 + rng.uniform(-0.2, 0.2), 77.5 + rng.uniform(-0.2, 0.2)
+        points[make_location(slots=0, latitude=lat, longitude=lng)] = (lat, lng)
+
+    with app.app_context():
+        results = LocationIndex().nearest(12.9, 77.5, 10)
+
+    expected = sorted(
+        (calculate_distance(12.9, 77.5, lat, lng), location_id)
+        for location_id, (lat, lng) in points.items()
+        if calculate_distance(12.9, 77.5, lat, lng) <= 10
+    )
+    assert [location_id for location_id, _ in results] == [location_id for _, location_id in expected]
+    for (_, distance), (expected_distance, _) in zip(results, expected):
+        assert distance == pytest.approx(expected_distance, abs=1e-6)
+
+def test_nearest_with_limit_keeps_the_closest(app, make_location):
+    ids = [make_location(slots=0, latitude=12.9 + i * 0.01, longitude=77.5) for i in range(5)]
+
+    with app.app_context():
+        results = LocationIndex().nearest(12.9, 77.5, 50, limit=2)
+
+    assert [location_id for location_id, _ in results] == ids[:2]
@@ -0,0 +1,73 @@
+import json
+import pytest
+from app.events import SlotEventBroker
+from tests.conftest import slot_ids
+
+@pytest.fixture
+def app(app_factory):
+    # Keepalives every 50ms so the stream test does not wait
+    return app_factory(SLOT_EVENTS_KEEPALIVE=0.05)
+
+def event(location_id, latitude=None, longitude=None, **fields):
+    return dict(fields, locationId=location_id, latitude=latitude, longitude=longitude)
+
+def test_subscribers_only_get_their_locations():
+    broker = SlotEventBroker()
+    subscription = broker.subscribe(location_ids=[1])
+
+    broker.publish(event(2))
+    broker.publish(event(1, id=10))
+
+    assert subscription.get(timeout=0)['id'] == 10
+    assert subscription.get(timeout=0) is None
+
+def test_bounding_box_subscriptions():
+    broker = SlotEventBroker()
+    subscription = broker.subscribe(bbox=(12.9, 77.5, 13.0, 77.6))
+
+    broker.publish(event(1, 12.95, 77.55, id=1))
+    broker.publish(event(2, 12.95, 77.65, id=2))
+    broker.publish(event(3, id=3))
+
+    assert subscription.get(timeout=0)['id'] == 1
+    assert subscription.get(timeout=0) is None
+
+def test_unsubscribed_queues_get_nothing():
+    broker = SlotEventBroker()
+    subscription = broker.subscribe(location_ids=[1], bbox=(12.9, 77.5, 13.0, 77.6))
+    assert broker.subscriber_count() == 1
+
+    broker.unsubscribe(subscription)
+    broker.publish(event(1, 12.95, 77.55))
+
+    assert broker.subscriber_count() == 0
+    assert subscription.get(timeout=0) is None
+
+def test_slow_subscribers_drop_events():
+    broker = SlotEventBroker()
+    subscription = broker.subscribe(location_ids=[1], maxsize=1)
+
+    broker.publish(event(1, id=1))
+    broker.publish(event(1, id=2))
+
+    assert subscription.dropped == 1
+    assert subscription.get(timeout=0)['id'] == 1
+
+def test_booking_streams_the_slot_change(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+
+    response = client.get(f'/api/parking/slots/stream?locations={location_id}', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 5000\n\n'
+    assert next(chunks) == b': keepalive\n\n'
+
+    client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    })
+
+    kind, data = next(chunks).decode().strip().split('\n')
+    assert kind == 'event: slot'
+    assert json.loads(data[len('data: '):])['isAvailable'] is False
+    response.close()
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from app import db
+from app.events import slot_events
+from app.expiry import expire_bookings, occupy_started_bookings
+from app.models import Booking, Notification, ParkingSlot
+from tests.conftest import add_bookings, slot_ids
+
+def take_slot(app, slot_id):
+    with app.app_context():
+        db.session.get(ParkingSlot, slot_id).is_available = False
+        db.session.commit()
+
+def statuses(app):
+    with app.app_context():
+        return [status for (status,) in db.session.query(Booking.status).order_by(Booking.id)]
+
+def test_ended_bookings_are_completed_in_batches(app, make_user, make_location):
+    user_id, _ = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    ids = add_bookings(app, user_id, location_id, 3, status='active')
+    add_bookings(app, user_id, location_id, 1, status='cancelled')
+    take_slot(app, slot_id)
+
+    with app.app_context():
+        expired = expire_bookings(batch_size=2)
+        assert expire_bookings() == []
+        assert db.session.get(ParkingSlot, slot_id).is_available
+
+    assert sorted(booking_id for booking_id, _, _ in expired) == ids
+    assert statuses(app) == ['completed'] * 3 + ['cancelled']
+
+def test_running_bookings_are_left_alone(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    })
+
+    with app.app_context():
+        assert expire_bookings() == []
+    assert statuses(app) == ['pending']
+
+def test_started_advance_bookings_take_their_slot(app, client, make_user, make_location):
+    _, headers = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    start = datetime.utcnow() + timedelta(minutes=30)
+    client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_id, 'duration': 60, 'startDate': start.isoformat()
+    })
+
+    with app.app_context():
+        assert occupy_started_bookings() == []
+        assert occupy_started_bookings(now=start + timedelta(minutes=1)) == [slot_id]
+        assert not db.session.get(ParkingSlot, slot_id).is_available
+
+def test_scheduler_run_notifies_and_publishes(app, make_user, make_location):
+    user_id, _ = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    add_bookings(app, user_id, location_id, 1, status='active')
+    take_slot(app, slot_id)
+    with app.app_context():
+        subscription = slot_events().subscribe(location_ids=[location_id])
+
+    assert len(app.extensions['expiry_scheduler'].run_once()) == 1
+
+    assert subscription.get(timeout=1)['isAvailable'] is True
+    with app.app_context():
+        assert Notification.query.filter_by(user_id=user_id, title="Booking Completed").count() == 1
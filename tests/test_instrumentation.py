@@ -0,0 +1,55 @@
+import pytest
+from app import db
+from app.instrumentation import Histogram
+
+@pytest.fixture
+def app(app_factory):
+    return app_factory(INSTRUMENTATION_ENABLED=True, N1_THRESHOLD=3)
+
+def test_histogram_is_cumulative():
+    histogram = Histogram('latency', 'Latency.', (0.1, 1.0))
+    histogram.observe((('route', '/a'),), 0.5)
+    histogram.observe((('route', '/a'),), 0.05)
+
+    assert histogram.render()[2:] == [
+        'latency_bucket{route="/a",le="0.1"} 1',
+        'latency_bucket{route="/a",le="1.0"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 2',
+        'latency_sum{route="/a"} 0.55',
+        'latency_count{route="/a"} 2',
+    ]
+
+def test_disabled_by_default(app_factory):
+    client = app_factory().test_client()
+
+    assert 'Server-Timing' not in client.get('/api/parking/locations').headers
+    assert client.get('/metrics').status_code == 404
+
+def test_requests_are_timed_and_counted(client, make_location):
+    make_location()
+
+    response = client.get('/api/parking/locations')
+
+    assert response.headers['Server-Timing'].endswith('desc="1 queries"')
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/parking/locations",status="200"} 1' in metrics
+    assert 'sql_statements_per_request_count{method="GET",route="/api/parking/locations"} 1' in metrics
+
+def test_repeated_statements_are_flagged(app, client):
+    def repeat():
+        for n in range(3):
+            db.session.execute(db.text('SELECT :n'), {'n': n})
+        return 'ok'
+    app.add_url_rule('/repeat', 'repeat', repeat)
+
+    client.get('/repeat')
+
+    assert 'n_plus_one_requests_total{route="/repeat",statement="SELECT ?"} 1' in client.get('/metrics').get_data(as_text=True)
+
+def test_profiler_is_admin_only(client, make_user):
+    _, headers = make_user()
+    _, admin = make_user(admin=True)
+
+    assert client.post('/api/debug/profiler', headers=headers).status_code == 403
+    assert client.post('/api/debug/profiler', headers=admin).json == {"message": "Profiler started"}
+    assert client.post('/api/debug/profiler', headers=admin).mimetype == 'text/plain'
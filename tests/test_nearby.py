@@ -0,0 +1,50 @@
+from app.spatial import bounding_box, cells_for_box, grid_cell
+
+def test_nearby_returns_locations_in_radius(client, make_location):
+    near = make_location(latitude=12.9716, longitude=77.5946)
+    make_location(latitude=13.5, longitude=78.5)
+
+    response = client.get('/api/parking/nearby?lat=12.97&lng=77.59&radius=3')
+
+    assert response.status_code == 200
+    assert [location['id'] for location in response.json['locations']] == [near]
+
+def test_nearby_orders_by_distance_and_limits(client, make_location):
+    far = make_location(latitude=12.99, longitude=77.5946)
+    near = make_location(latitude=12.972, longitude=77.5946)
+    make_location(latitude=13.0, longitude=77.5946)
+
+    response = client.get('/api/parking/nearby?lat=12.9716&lng=77.5946&radius=10&limit=2')
+
+    assert [location['id'] for location in response.json['locations']] == [near, far]
+
+def test_nearby_reports_slot_counts(client, make_location):
+    make_location(slots=3)
+
+    location = client.get('/api/parking/nearby?lat=12.9716&lng=77.5946&radius=1').json['locations'][0]
+
+    assert location['availableSlots'] == 3
+    assert location['totalSlots'] == 3
+
+def test_nearby_rejects_invalid_arguments(client):
+    assert client.get('/api/parking/nearby?lat=abc&lng=1').status_code == 400
+    assert client.get('/api/parking/nearby?lat=1&lng=1&limit=0').status_code == 400
+
+def test_bounding_box_cells_contain_the_point():
+    box = bounding_box(12.97, 77.59, 5)
+    assert grid_cell(12.97, 77.59) in cells_for_box(*box)
+
+def test_wide_box_scans_everything():
+    assert cells_for_box(*bounding_box(0, 0, 5000)) is None
+
+def test_nearby_rejects_non_finite_and_out_of_range_values(client, make_location):
+    make_location()
+
+    for query in ('lat=nan&lng=77', 'lat=inf&lng=77', 'lat=12&lng=-inf', 'lat=12&lng=77&radius=nan',
+                  'lat=12&lng=77&radius=inf', 'lat=12&lng=77&radius=-1', 'lat=91&lng=77', 'lat=12&lng=181'):
+        response = client.get(f'/api/parking/nearby?{query}')
+        assert response.status_code == 400, query
+
+def test_slot_stream_rejects_non_finite_bbox(client):
+    assert client.get('/api/parking/slots/stream?bbox=nan,0,1,1').status_code == 400
+    assert client.get('/api/parking/slots/stream?bbox=0,0,100,1').status_code == 400
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from app import db
+from app.notifications import notify, prune_notifications, recount_unread
+from app.models import Notification, User
+from tests.conftest import slot_ids
+
+def notification_titles(app, user_id):
+    with app.app_context():
+        return [title for (title,) in db.session.query(Notification.title).filter_by(user_id=user_id)]
+
+def unread_counter(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).unread_notifications
+
+def book(client, headers, app, location_id):
+    return client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    })
+
+def test_booking_notifies_the_user(app, client, make_user, make_location):
+    user_id, headers = make_user()
+
+    assert book(client, headers, app, make_location()).status_code == 201
+
+    assert len(notification_titles(app, user_id)) == 1
+    assert unread_counter(app, user_id) == 1
+
+def test_rejected_booking_does_not_notify(app, client, make_user, make_location):
+    user_id, headers = make_user()
+    location_id = make_location(slots=1)
+    book(client, headers, app, location_id)
+
+    assert book(client, headers, app, location_id).status_code == 409
+
+    assert len(notification_titles(app, user_id)) == 1
+
+def test_deferred_notifications_are_written_outside_the_request(app_factory, count_queries):
+    app = app_factory(NOTIFICATION_DEFERRED=True, NOTIFICATION_FLUSH_INTERVAL=60)
+    with app.app_context():
+        user = User(email='a@test.local', username='a')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    queue = app.extensions['notification_queue']
+
+    with count_queries() as statements:
+        with app.app_context():
+            for n in range(3):
+                queue.push(user_id, f'Title {n}', 'Message')
+
+    assert not any('notifications' in statement for statement in statements)
+    queue.flush()
+    assert sorted(notification_titles(app, user_id)) == ['Title 0', 'Title 1', 'Title 2']
+    assert unread_counter(app, user_id) == 3
+
+def add_notifications(app, user_id, count, **fields):
+    """Insert notifications directly and rebuild the unread counters; returns their ids."""
+    with app.app_context():
+        notifications = [Notification(user_id=user_id, title=f'Title {n}', message='Message', **fields)
+                         for n in range(count)]
+        db.session.add_all(notifications)
+        db.session.commit()
+        recount_unread()
+        return [notification.id for notification in notifications]
+
+def test_feed_pages_newest_first(app, client, make_user):
+    user_id, headers = make_user()
+    with app.app_context():
+        for n in range(3):
+            notify(user_id, f'Title {n}', 'Message')
+
+    first = client.get('/api/notifications?limit=2', headers=headers).json
+    second = client.get(f"/api/notifications?limit=2&cursor={first['nextCursor']}", headers=headers).json
+
+    assert [n['title'] for n in first['notifications'] + second['notifications']] == ['Title 2', 'Title 1', 'Title 0']
+    assert second['nextCursor'] is None
+    assert first['unreadCount'] == 3
+
+def test_mark_read_by_id_and_all(app, client, make_user):
+    user_id, headers = make_user()
+    other_id, _ = make_user()
+    ids = add_notifications(app, user_id, 3)
+    other_ids = add_notifications(app, other_id, 1)
+
+    response = client.post('/api/notifications/read', headers=headers, json={'ids': ids[:1] + other_ids})
+    assert response.json == {'updated': 1, 'unreadCount': 2}
+    assert client.get('/api/notifications?unread=true', headers=headers).json['notifications'][-1]['id'] == ids[1]
+
+    assert client.post('/api/notifications/read', headers=headers).json == {'updated': 2, 'unreadCount': 0}
+    assert client.post('/api/notifications/read', headers=headers).json['updated'] == 0
+    assert unread_counter(app, other_id) == 1
+
+def test_mark_read_rejects_bad_ids(client, make_user):
+    _, headers = make_user()
+
+    assert client.post('/api/notifications/read', headers=headers, json={'ids': [True]}).status_code == 400
+    assert client.post('/api/notifications/read', headers=headers, json={'ids': '1'}).status_code == 400
+
+def test_prune_keeps_unread_notifications_longer(app, make_user):
+    user_id, _ = make_user()
+    now = datetime.utcnow()
+    add_notifications(app, user_id, 2, is_read=True, created_at=now - timedelta(days=100))
+    add_notifications(app, user_id, 2, is_read=False, created_at=now - timedelta(days=100))
+    add_notifications(app, user_id, 1, is_read=False, created_at=now - timedelta(days=400))
+    add_notifications(app, user_id, 1, is_read=True, created_at=now)
+
+    with app.app_context():
+        assert prune_notifications(batch_size=2) == 3
+
+    assert len(notification_titles(app, user_id)) == 3
+    assert unread_counter(app, user_id) == 2
@@ -0,0 +1,58 @@
+from datetime import datetime
+import pytest
+from app.pagination import decode_cursor, encode_cursor
+from tests.conftest import add_bookings
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+def pages(client, path, headers):
+    ids = []
+    cursor = ''
+    while cursor is not None:
+        body = client.get(f'{path}?limit=2&cursor={cursor}', headers=headers).json
+        assert len(body['bookings']) <= 2
+        ids.extend(booking['id'] for booking in body['bookings'])
+        cursor = body['nextCursor']
+    return ids
+
+def test_admin_listing_pages_through_ties(client, make_user, make_location):
+    user_id, _ = make_user()
+    _, admin = make_user(admin=True)
+    location_id = make_location()
+    # Rows created in the same instant are ordered by id
+    ids = add_bookings(client.application, user_id, location_id, 5, created_at=datetime(2024, 5, 1))
+    ids += add_bookings(client.application, user_id, location_id, 2, created_at=datetime(2024, 6, 1))
+
+    assert pages(client, '/api/bookings', admin) == ids[5:][::-1] + ids[:5][::-1]
+
+def test_history_lists_only_the_users_closed_bookings(client, make_user, make_location):
+    user_id, headers = make_user()
+    other_id, _ = make_user()
+    location_id = make_location()
+    completed = add_bookings(client.application, user_id, location_id, 2)
+    cancelled = add_bookings(client.application, user_id, location_id, 1, status='cancelled')
+    add_bookings(client.application, user_id, location_id, 1, status='pending')
+    add_bookings(client.application, other_id, location_id, 1)
+
+    assert sorted(pages(client, '/api/bookings/history', headers)) == completed + cancelled
+
+def test_invalid_page_arguments(client, make_user):
+    _, headers = make_user()
+
+    assert client.get('/api/bookings/history?limit=0', headers=headers).status_code == 400
+    assert client.get('/api/bookings/history?cursor=xyz', headers=headers).status_code == 400
+
+def test_limit_is_capped(app, client, make_user, make_location):
+    user_id, headers = make_user()
+    add_bookings(app, user_id, make_location(), 3)
+    app.config['MAX_PAGE_SIZE'] = 2
+
+    body = client.get('/api/bookings/history?limit=50', headers=headers).json
+
+    assert len(body['bookings']) == 2
+    assert body['nextCursor'] is not None
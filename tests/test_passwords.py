@@ -0,0 +1,59 @@
+import runpy
+import time
+import pytest
+from flask import Flask
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+def make_hasher(**config):
+    app = Flask(__name__)
+    app.config.update({'PASSWORD_METHOD': 'pbkdf2:sha256:1000', **config})
+    return PasswordHasher(app)
+
+def test_inline_hashing():
+    hasher = make_hasher(PASSWORD_WORKERS=0)
+
+    password_hash = hasher.hash('secret')
+
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+    assert not hasher.needs_rehash(password_hash)
+    assert make_hasher(PASSWORD_METHOD='scrypt:16384:8:1').needs_rehash(password_hash)
+
+def test_pool_hashing_counts_completed_calls():
+    hasher = make_hasher(PASSWORD_WORKERS=1)
+
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+    assert hasher.stats() == {'workers': 1, 'pending': 0, 'completed': 2, 'rejected': 0}
+
+def test_timed_out_calls_are_not_counted_as_completed():
+    hasher = make_hasher(PASSWORD_WORKERS=1, PASSWORD_TIMEOUT=0.2)
+    hasher.hash('warm up the pool')
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run(time.sleep, 2)
+
+    assert hasher.stats()['completed'] == 1
+    assert hasher.stats()['pending'] == 0
+
+def test_calls_beyond_the_pending_limit_are_rejected():
+    hasher = make_hasher(PASSWORD_WORKERS=1, PASSWORD_MAX_PENDING=0)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret')
+
+    assert hasher.stats()['rejected'] == 1
+
+def test_run_serves_the_app_except_in_pool_workers():
+    # Pool workers re-import the main module as __mp_main__ when they start
+    import run
+
+    assert 'expire-bookings' in run.app.cli.commands
+    assert 'app' not in runpy.run_path(run.__file__, run_name='__mp_main__')
+
+def test_login_checks_the_password(client, make_user):
+    make_user(password='secret123')
+
+    response = client.post('/api/auth/login', json={'email': 'user1@test.local', 'password': 'wrong'})
+
+    assert response.status_code == 401
@@ -0,0 +1,45 @@
+import pytest
+from app.pricing import hourly_price, quote
+from tests.conftest import slot_ids
+
+def test_quotes_are_whole_cents():
+    assert hourly_price(999, 'two-wheeler') == 599
+    assert quote(999, 'four-wheeler', 45) == 749
+    assert quote(999, 'two-wheeler', 30) == 299
+
+@pytest.mark.parametrize('vehicle_type, duration, amount', [
+    ('four-wheeler', 60, 5000),
+    ('four-wheeler', 45, 3750),
+    ('two-wheeler', 120, 6000),
+])
+def test_booking_amount_uses_the_quote(app, client, make_user, make_location, vehicle_type, duration, amount):
+    _, headers = make_user()
+    location_id = make_location(vehicle_type=vehicle_type)
+
+    response = client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0],
+        'duration': duration, 'vehicleType': vehicle_type
+    })
+
+    assert response.json['booking']['amount'] == amount
+
+@pytest.mark.parametrize('duration', [0, -30, 1.5, '60', True])
+def test_invalid_durations_are_rejected(app, client, make_user, make_location, duration):
+    _, headers = make_user()
+    location_id = make_location()
+
+    response = client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': duration
+    })
+
+    assert response.status_code == 400
+
+def test_nearby_prices_every_duration(client, make_location):
+    make_location(price_per_hour=999)
+
+    prices = client.get('/api/parking/nearby?lat=12.9716&lng=77.5946').json['locations'][0]['prices']
+
+    assert prices == {
+        'two-wheeler': {'30': 299, '60': 599, '120': 1198},
+        'four-wheeler': {'30': 499, '60': 999, '120': 1998}
+    }
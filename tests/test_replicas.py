@@ -0,0 +1,97 @@
+import sqlite3
+import pytest
+from app import db
+from tests.conftest import slot_ids
+
+@pytest.fixture
+def replicated(app_factory, tmp_path):
+    """Build an app with a file primary and one replica, and a way to sync them."""
+    primary = tmp_path / 'primary.db'
+    replica = tmp_path / 'replica.db'
+
+    def build(**overrides):
+        app = app_factory(SQLALCHEMY_DATABASE_URI=f'sqlite:///{primary}',
+                          SQLALCHEMY_REPLICA_URIS=[f'sqlite:///{replica}'], **overrides)
+        sync(app)
+        return app
+
+    def sync(app):
+        with app.app_context():
+            db.engines['replica_0'].dispose()
+        source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+        source.backup(target)
+        source.close()
+        target.close()
+
+    build.sync = sync
+    return build
+
+def add_user(app, admin=False):
+    from app.models import User
+    with app.app_context():
+        user = User(email='u@test.local', username='u', is_admin=admin)
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.commit()
+        return {'Authorization': f"Bearer {app.extensions['token_auth'].issue(user)}"}
+
+def add_location(app):
+    from app.models import ParkingLocation, ParkingSlot
+    with app.app_context():
+        location = ParkingLocation(name='Old', address='a', latitude=1, longitude=1, price_per_hour=100)
+        db.session.add(location)
+        db.session.flush()
+        db.session.add(ParkingSlot(location_id=location.id, slot_number='A1'))
+        db.session.commit()
+        return location.id
+
+def test_bearer_client_reads_its_own_writes(replicated):
+    app = replicated()
+    headers = add_user(app)
+    location_id = add_location(app)
+    replicated.sync(app)
+    client = app.test_client(use_cookies=False)
+
+    booking_id = client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    }).json['booking']['id']
+
+    assert client.get(f'/api/bookings/{booking_id}', headers=headers).status_code == 200
+
+def test_unpinned_reads_go_to_the_replica(replicated):
+    app = replicated(REPLICA_STALENESS=0)
+    headers = add_user(app)
+    location_id = add_location(app)
+    replicated.sync(app)
+    client = app.test_client(use_cookies=False)
+
+    booking_id = client.post('/api/bookings', headers=headers, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    }).json['booking']['id']
+
+    # The replica has not caught up yet
+    assert client.get(f'/api/bookings/{booking_id}', headers=headers).status_code == 404
+
+def test_location_cache_is_refilled_from_the_primary(replicated):
+    app = replicated(REPLICA_STALENESS=0)
+    headers = add_user(app, admin=True)
+    location_id = add_location(app)
+    replicated.sync(app)
+    client = app.test_client(use_cookies=False)
+    assert client.get(f'/api/parking/locations/{location_id}').json['location']['name'] == 'Old'
+
+    client.put(f'/api/parking/locations/{location_id}', headers=headers, json={'name': 'New'})
+
+    anonymous = app.test_client(use_cookies=False)
+    assert anonymous.get(f'/api/parking/locations/{location_id}').json['location']['name'] == 'New'
+    assert anonymous.get('/api/parking/locations').json['locations'][0]['name'] == 'New'
+
+def test_replica_queries_are_instrumented(replicated):
+    app = replicated(REPLICA_STALENESS=0, INSTRUMENTATION_ENABLED=True)
+    add_location(app)
+    replicated.sync(app)
+
+    response = app.test_client(use_cookies=False).get('/api/parking/nearby?lat=1&lng=1&radius=5')
+
+    assert response.json['locations']
+    assert '0 queries' not in response.headers['Server-Timing']
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import Booking, ParkingLocation, ParkingSlot, User
+from app.reservations import claim_slot, free_slots, has_overlap
+from tests.conftest import slot_ids
+
+def add_user_and_slot(app):
+    """Return (location id, auth headers) on a database the fixtures did not fill."""
+    with app.app_context():
+        user = User(email='a@test.local', username='a')
+        location = ParkingLocation(name='P', address='a', latitude=12.97, longitude=77.59, price_per_hour=100)
+        db.session.add_all([user, location])
+        db.session.flush()
+        db.session.add(ParkingSlot(location_id=location.id, slot_number='A1'))
+        db.session.commit()
+        token = app.extensions['token_auth'].issue(user)
+        return location.id, {'Authorization': f'Bearer {token}'}
+
+def test_a_slot_is_claimed_once(app, make_location):
+    slot_id = slot_ids(app, make_location(slots=1))[0]
+
+    with app.app_context():
+        assert claim_slot(slot_id)
+        assert not claim_slot(slot_id)
+
+def test_rolled_back_claims_release_the_slot(app, make_location):
+    slot_id = slot_ids(app, make_location(slots=1))[0]
+
+    with app.app_context():
+        assert claim_slot(slot_id)
+        db.session.rollback()
+        assert claim_slot(slot_id)
+
+def test_concurrent_bookings_of_one_slot(app_factory, tmp_path):
+    app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'bookings.db'}")
+    location_id, headers = add_user_and_slot(app)
+    slot_id = slot_ids(app, location_id)[0]
+    statuses = []
+    barrier = threading.Barrier(8)
+
+    def book():
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(client.post('/api/bookings', headers=headers, json={
+            'locationId': location_id, 'slotId': slot_id, 'duration': 60
+        }).status_code)
+
+    threads = [threading.Thread(target=book) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [409] * 7
+
+def query_plans(app, check):
+    """Run check() in an app context and return the SQLite plan of each statement it ran."""
+    executed = []
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            check()
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        with engine.connect() as connection:
+            return [detail for statement, parameters in executed
+                    for (_, _, _, detail) in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+def test_closed_bookings_are_not_scanned(app, make_user, make_location):
+    user_id, _ = make_user()
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    now = datetime.utcnow()
+    start = now - timedelta(days=365)
+    with app.app_context():
+        db.session.execute(db.insert(Booking), [{
+            'user_id': user_id, 'location_id': location_id, 'slot_id': slot_id,
+            'start_date': start + timedelta(hours=n), 'end_date': start + timedelta(hours=n, minutes=30),
+            'duration': 30, 'amount': 100, 'status': 'completed', 'vehicle_type': 'four-wheeler'
+        } for n in range(5000)])
+        db.session.add(Booking(user_id=user_id, location_id=location_id, slot_id=slot_id,
+                               start_date=now + timedelta(hours=1), end_date=now + timedelta(hours=2),
+                               duration=60, amount=100, status='pending', vehicle_type='four-wheeler'))
+        db.session.commit()
+
+    def check():
+        assert not has_overlap(slot_id, now, now + timedelta(hours=1))
+        assert has_overlap(slot_id, now + timedelta(minutes=90), now + timedelta(hours=3))
+        assert free_slots(location_id, 'four-wheeler', now, now + timedelta(hours=1)) == [slot_id]
+        assert free_slots(location_id, 'four-wheeler', now, now + timedelta(hours=2)) == []
+
+    searches = [detail for detail in query_plans(app, check) if 'bookings' in detail]
+    # Every lookup seeks straight to the slot's open bookings
+    assert searches and all('status=?' in detail for detail in searches)
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from app import db
+from app.events import slot_events
+from app.models import ParkingSlot
+from app.sensors import fake_readings
+import pytest
+from tests.conftest import slot_ids
+
+KEY = {'X-Sensor-Key': 'key'}
+
+@pytest.fixture
+def app(app_factory):
+    # Flushed by hand, so the writer thread never beats a test to it
+    return app_factory(SENSOR_API_KEY='key', SENSOR_FLUSH_INTERVAL=60)
+
+def test_readings_are_coalesced_to_the_latest_per_slot(app, client, make_location):
+    location_id = make_location(slots=1)
+    slot_id = slot_ids(app, location_id)[0]
+    now = datetime.utcnow()
+
+    response = client.post('/api/parking/sensors/readings', headers=KEY, json={'readings': [
+        {'slotId': slot_id, 'occupied': True, 'observedAt': now.isoformat()},
+        {'slotId': slot_id, 'occupied': False, 'observedAt': (now - timedelta(seconds=5)).isoformat()}
+    ]})
+    assert response.status_code == 202
+    assert response.json['accepted'] == 2
+
+    ingestor = app.extensions['occupancy_ingestor']
+    assert ingestor.pending_count() == 1
+    assert ingestor.flush() == [slot_id]
+    with app.app_context():
+        assert not db.session.get(ParkingSlot, slot_id).is_available
+
+def test_ndjson_readings(app, client, make_location):
+    slot_id = slot_ids(app, make_location(slots=1))[0]
+    body = '\n'.join(json.dumps({'slotId': slot_id, 'occupied': True}) for _ in range(3))
+
+    response = client.post('/api/parking/sensors/readings', data=body,
+                           headers=dict(KEY, **{'Content-Type': 'application/x-ndjson'}))
+
+    assert response.status_code == 202
+    assert response.json['accepted'] == 3
+    app.extensions['occupancy_ingestor'].flush()
+
+def test_boolean_slot_ids_are_rejected(client):
+    response = client.post('/api/parking/sensors/readings', headers=KEY, json={'readings': [
+        {'slotId': True, 'occupied': True}
+    ]})
+
+    assert response.json['accepted'] == 0
+    assert response.json['errors'] == [{'index': 0, 'message': 'Invalid reading'}]
+
+def test_batches_are_capped(app_factory):
+    client = app_factory(SENSOR_API_KEY='key', BULK_MAX_ROWS=2).test_client()
+    readings = [{'slotId': n, 'occupied': True} for n in range(3)]
+
+    assert client.post('/api/parking/sensors/readings', headers=KEY,
+                       json={'readings': readings}).status_code == 400
+    body = '\n'.join(json.dumps(reading) for reading in readings)
+    response = client.post('/api/parking/sensors/readings', data=body,
+                           headers=dict(KEY, **{'Content-Type': 'application/x-ndjson'}))
+    assert response.status_code == 400
+
+def test_sensor_key_is_enforced(client):
+    reading = {'readings': [{'slotId': 1, 'occupied': True}]}
+
+    assert client.post('/api/parking/sensors/readings', json=reading).status_code == 401
+    assert client.post('/api/parking/sensors/readings', json=reading,
+                       headers=KEY).status_code == 202
+
+def test_flush_only_writes_and_publishes_real_changes(app, client, make_location):
+    location_id = make_location(slots=2)
+    first, second = slot_ids(app, location_id)
+    with app.app_context():
+        subscription = slot_events().subscribe(location_ids=[location_id])
+
+    client.post('/api/parking/sensors/readings', headers=KEY, json={'readings': [
+        {'slotId': first, 'occupied': True},
+        {'slotId': second, 'occupied': False}
+    ]})
+    ingestor = app.extensions['occupancy_ingestor']
+
+    assert ingestor.flush() == [first]
+    assert subscription.get(timeout=1)['id'] == first
+    assert subscription.get(timeout=0) is None
+    assert ingestor.stats() == {'received': 2, 'written': 2, 'pending': 0}
+    assert ingestor.flush() == []
+
+def test_fake_readings_are_valid(client):
+    readings = fake_readings([1, 2, 3], seed=1)
+
+    response = client.post('/api/parking/sensors/readings', headers=KEY,
+                           json={'readings': [next(readings) for _ in range(50)]})
+
+    assert response.json['accepted'] == 50
+
+def test_non_string_observed_at_is_rejected(client):
+    response = client.post('/api/parking/sensors/readings', headers=KEY, json={'readings': [
+        {'slotId': 1, 'occupied': True, 'observedAt': 123}
+    ]})
+
+    assert response.status_code == 202
+    assert response.json['errors'] == [{'index': 0, 'message': 'Invalid reading'}]
+
+def test_failed_write_keeps_the_readings(app, make_location, monkeypatch):
+    slot_id = slot_ids(app, make_location(slots=1))[0]
+    now = datetime.utcnow()
+    ingestor = app.extensions['occupancy_ingestor']
+
+    def fail(available, occupied):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr('app.sensors.set_availability', fail)
+    ingestor.report([(slot_id, True, now)])
+    assert ingestor.flush() == []
+    assert ingestor.pending_count() == 1
+
+    # A reading older than the failed one does not replace it
+    ingestor.report([(slot_id, False, now - timedelta(seconds=5))])
+    monkeypatch.undo()
+
+    assert ingestor.flush() == [slot_id]
+    with app.app_context():
+        assert not db.session.get(ParkingSlot, slot_id).is_available
+
+def test_writer_survives_errors_and_is_restarted(app, make_location, monkeypatch):
+    app.config['SENSOR_FLUSH_INTERVAL'] = 0.01
+    first, second = slot_ids(app, make_location(slots=2))
+    ingestor = app.extensions['occupancy_ingestor']
+
+    def fail(slot_ids):
+        raise RuntimeError('broker down')
+
+    monkeypatch.setattr('app.events.publish_slot_changes', fail)
+    ingestor.report([(first, False, datetime.utcnow()), (second, True, datetime.utcnow())])
+    wait_for(lambda: ingestor.written == 2)
+    thread = ingestor._thread
+    assert thread.is_alive()
+
+    # A writer that died anyway is replaced on the next report
+    ingestor._thread = threading.Thread(target=lambda: None)
+    ingestor._thread.start()
+    ingestor._thread.join()
+    ingestor.report([(second, False, datetime.utcnow())])
+    assert ingestor._thread.is_alive()
+    wait_for(lambda: ingestor.written == 3)
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
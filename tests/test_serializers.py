@@ -0,0 +1,43 @@
+from app import db
+from app.models import Booking
+from app.serializers import booking_query, serialize_bookings
+from tests.conftest import add_bookings
+
+def test_rows_serialize_like_the_model(app, make_user, make_location):
+    user_id, _ = make_user()
+    add_bookings(app, user_id, make_location(), 2)
+
+    with app.app_context():
+        rows = serialize_bookings(booking_query().order_by(Booking.id).all())
+        models = [booking.to_dict() for booking in Booking.query.order_by(Booking.id)]
+
+    assert rows == models
+    assert rows[0]['locationName'] == 'Test Parking'
+    assert rows[0]['slotNumber'] == 'A1'
+
+def test_listing_is_one_query_per_page(client, make_user, make_location, count_queries):
+    user_id, _ = make_user()
+    _, admin = make_user(admin=True)
+    add_bookings(client.application, user_id, make_location(), 1)
+    client.get('/api/bookings', headers=admin)
+    with count_queries() as one:
+        client.get('/api/bookings', headers=admin)
+
+    for _ in range(3):
+        add_bookings(client.application, user_id, make_location(), 3)
+    with count_queries() as ten:
+        response = client.get('/api/bookings', headers=admin)
+
+    assert len(response.json['bookings']) == 10
+    assert len(ten) == len(one) == 1
+
+def test_rows_of_deleted_slots_still_serialize(app, make_user, make_location):
+    user_id, _ = make_user()
+    add_bookings(app, user_id, make_location(), 1)
+    with app.app_context():
+        db.session.execute(db.text('DELETE FROM parking_slots'))
+        db.session.commit()
+
+        row, = serialize_bookings(booking_query().all())
+
+    assert row['slotNumber'] is None
@@ -0,0 +1,111 @@
+import time
+import pytest
+from app import db
+from app.models import User
+from tests.conftest import slot_ids
+
+@pytest.fixture
+def issued_in_the_past(app, monkeypatch):
+    """Issue a session token for a user as if 120 seconds ago."""
+    def issue(user_id):
+        now = time.time()
+        with monkeypatch.context() as patch:
+            patch.setattr(time, 'time', lambda: now - 120)
+            with app.app_context():
+                return app.extensions['token_auth'].issue(db.session.get(User, user_id))
+    return issue
+
+def session_client(app, token):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['token'] = token
+    return client
+
+def test_login_returns_a_token_for_bearer_requests(client, make_user):
+    make_user(password='secret123')
+
+    token = client.post('/api/auth/login', json={'email': 'user1@test.local', 'password': 'secret123'}).json['token']
+
+    anonymous = client.application.test_client()
+    response = anonymous.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.json['user']['username'] == 'user1'
+
+def test_authorized_requests_load_no_user(app_factory):
+    app = app_factory(INSTRUMENTATION_ENABLED=True)
+    with app.app_context():
+        user = User(email='a@test.local', username='a')
+        db.session.add(user)
+        db.session.commit()
+        token = app.extensions['token_auth'].issue(user)
+
+    response = app.test_client().get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert '"0 queries"' in response.headers['Server-Timing']
+
+def test_expired_session_token_is_renewed(app, make_user, issued_in_the_past):
+    app.config['TOKEN_MAX_AGE'] = 60
+    user_id, _ = make_user()
+    client = session_client(app, issued_in_the_past(user_id))
+
+    assert client.get('/api/auth/me').status_code == 200
+    with client.session_transaction() as session:
+        assert app.extensions['token_auth'].verify(session['token'])['sub'] == user_id
+
+def test_concurrent_requests_survive_renewal(app, make_user, issued_in_the_past):
+    app.config['TOKEN_MAX_AGE'] = 60
+    user_id, _ = make_user()
+    token = issued_in_the_past(user_id)
+    first, second = session_client(app, token), session_client(app, token)
+
+    assert first.get('/api/auth/me').status_code == 200
+    # Still carries the old cookie, as a request sent before the first one returned
+    assert second.get('/api/auth/me').status_code == 200
+
+    with first.session_transaction() as a, second.session_transaction() as b:
+        assert a['token'] == b['token'] != token
+
+def test_expired_bearer_token_is_not_renewed_implicitly(app, make_user, issued_in_the_past):
+    app.config['TOKEN_MAX_AGE'] = 60
+    user_id, _ = make_user()
+    token = issued_in_the_past(user_id)
+    client = app.test_client()
+
+    assert client.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+
+    new_token = client.post('/api/auth/token', headers={'Authorization': f'Bearer {token}'}).json['token']
+    assert client.get('/api/auth/me', headers={'Authorization': f'Bearer {new_token}'}).status_code == 200
+    # The old token was revoked by the exchange
+    assert client.post('/api/auth/token', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+
+def test_logout_revokes_the_token(client, make_user):
+    _, headers = make_user()
+
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+    assert client.post('/api/auth/token', headers=headers).status_code == 401
+
+def test_tampered_token_is_rejected(client, make_user):
+    _, headers = make_user()
+    headers = {'Authorization': headers['Authorization'][:-2] + 'xx'}
+
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+
+def test_booking_access_uses_the_admin_claim(app, client, make_user, make_location):
+    _, owner = make_user()
+    admin_id, admin = make_user(admin=True)
+    location_id = make_location(slots=1)
+    booking_id = client.post('/api/bookings', headers=owner, json={
+        'locationId': location_id, 'slotId': slot_ids(app, location_id)[0], 'duration': 60
+    }).json['booking']['id']
+
+    # The role in a token is trusted until it expires, without a user lookup
+    with app.app_context():
+        db.session.get(User, admin_id).is_admin = False
+        db.session.commit()
+
+    assert client.get(f'/api/bookings/{booking_id}', headers=admin).status_code == 200
+    assert client.put(f'/api/bookings/{booking_id}/status', headers=admin,
+                      json={'status': 'cancelled'}).status_code == 200